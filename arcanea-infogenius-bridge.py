@@ -4,10 +4,28 @@
 
 import json
 import asyncio
-from typing import Dict, List, Any, Optional
+import hashlib
+import heapq
+import mmap
+import os
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping, MutableMapping
+from types import MappingProxyType
+from urllib.parse import quote, unquote
+from typing import Dict, List, Any, Callable, Optional, Iterable, Iterator, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from enum import Enum
+from functools import partial
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; recall falls back to pure Python scoring
+    np = None
 
 class KnowledgeType(Enum):
     """Types of knowledge Arcanea can process"""
@@ -19,7 +37,7 @@ class KnowledgeType(Enum):
     INSIGHT = "insight"
     PATTERN = "pattern"
 
-@dataclass
+@dataclass(slots=True)
 class KnowledgeNode:
     """Represents a piece of knowledge in the system"""
     id: str
@@ -27,7 +45,7 @@ class KnowledgeNode:
     content: str
     tags: List[str]
     source: str
-    created_at: str
+    created_at: str = None
     connections: List[str] = None
     metadata: Dict[str, Any] = None
     
@@ -39,18 +57,866 @@ class KnowledgeNode:
         if self.created_at is None:
             self.created_at = datetime.now().isoformat()
 
+_EMPTY_MAPPING = MappingProxyType({})
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only deep copy of a metadata value: dicts become mappingproxies, lists tuples."""
+    if isinstance(value, Mapping):
+        if not value:
+            return _EMPTY_MAPPING
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def to_plain(value: Any) -> Any:
+    """Mutable deep copy of a frozen node field (mappings to dicts, tuples to lists)."""
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def _lower(text: str) -> str:
+    """Lowercase text, reusing the original object when nothing changes."""
+    lowered = text.lower()
+    return text if lowered == text else lowered
+
+class AgentMemoryStore:
+    """
+    Columnar storage for one agent's memories.
+    
+    Instead of one KnowledgeNode (plus tag list and metadata dict) per
+    memory, fields live in parallel columns: KnowledgeType as a one-byte
+    code, interned tag tuples and sources shared between memories, and
+    metadata as a values tuple against an interned key tuple, and
+    created_at as a float timestamp when it round-trips through
+    isoformat(). Empty connections and empty nested dicts cost nothing.
+    Lowercased content is kept once here for the recall and search
+    indexes to share (it is the content itself when already lowercase).
+    
+    Behaves like a list of KnowledgeNode: indexing, slicing and iteration
+    build nodes on demand. Those nodes are read-only snapshots (tags and
+    connections are tuples, metadata is frozen all the way down), so an
+    in-place edit fails instead of being silently lost; `to_plain` gives
+    an editable copy. Replace a memory with `store[i] = node`; `revision`
+    then changes and `replaced_since` names the rows indexes must re-read,
+    and `on_replace` (when set) is called so the edit can be persisted.
+    Writes and `snapshot()` are serialized by a lock, so a snapshot is a
+    consistent copy even while the store keeps changing.
+    """
+    
+    _TYPES = list(KnowledgeType)
+    _TYPE_CODES = {t: code for code, t in enumerate(_TYPES)}
+    _COLUMNS = ("_ids", "_types", "_contents", "_contents_lower", "_tags", "_sources",
+                "_created_ts", "_connections", "_meta_keys", "_meta_values")
+    
+    def __init__(self, nodes: Iterable[KnowledgeNode] = ()):
+        # Tag and metadata key tuples shared between this agent's memories
+        self._interned_tags: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._interned_keys: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        # Row replaced by each revision, oldest first
+        self._replaced = array("L")
+        self._lock = threading.Lock()
+        # Called as on_replace(row, node, store) after an in-place replacement
+        self.on_replace: Optional[Callable[[int, KnowledgeNode, "AgentMemoryStore"], None]] = None
+        self._ids: List[str] = []
+        self._types = array("B")
+        self._contents: List[str] = []
+        self._contents_lower: List[str] = []
+        self._tags: List[Tuple[str, ...]] = []
+        self._sources: List[str] = []
+        self._created_ts = array("d")
+        self._created_text: Dict[int, str] = {}  # timestamps that don't round-trip
+        self._connections: List[Optional[Tuple[str, ...]]] = []
+        self._meta_keys: List[Tuple[str, ...]] = []
+        self._meta_values: List[Tuple[Any, ...]] = []
+        self._rows: Dict[str, int] = {}
+        for node in nodes:
+            self.append(node)
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._node(row) for row in range(*index.indices(len(self._ids)))]
+        if index < 0:
+            index += len(self._ids)
+        if not 0 <= index < len(self._ids):
+            raise IndexError("memory index out of range")
+        return self._node(index)
+    
+    def __setitem__(self, index: int, node: KnowledgeNode):
+        if index < 0:
+            index += len(self._ids)
+        with self._lock:
+            if self._ids[index] != node.id:
+                if self._rows.get(self._ids[index]) == index:
+                    del self._rows[self._ids[index]]
+                self._rows.setdefault(node.id, index)
+            self._write(index, node)
+            self._replaced.append(index)
+        if self.on_replace is not None:
+            self.on_replace(index, node, self)
+    
+    def __iter__(self) -> Iterator[KnowledgeNode]:
+        for row in range(len(self._ids)):
+            yield self._node(row)
+    
+    def append(self, node: KnowledgeNode) -> int:
+        """Store a node and return its row."""
+        with self._lock:
+            row = len(self._ids)
+            self._ids.append(None)
+            self._types.append(0)
+            self._created_ts.append(0.0)
+            for column in (self._contents, self._contents_lower, self._tags, self._sources,
+                           self._connections, self._meta_keys, self._meta_values):
+                column.append(None)
+            self._write(row, node)
+            # First occurrence wins, like a linear scan by id
+            self._rows.setdefault(node.id, row)
+        return row
+    
+    @property
+    def revision(self) -> int:
+        """Number of in-place replacements so far."""
+        return len(self._replaced)
+    
+    def replaced_since(self, revision: int) -> List[int]:
+        """Rows replaced after `revision`, each once, in row order."""
+        return sorted(set(self._replaced[revision:]))
+    
+    def snapshot(self) -> Tuple["AgentMemoryStore", int]:
+        """Detached copy of the current rows, and the revision it reflects."""
+        copy = AgentMemoryStore()
+        with self._lock:
+            for name in self._COLUMNS:
+                setattr(copy, name, getattr(self, name)[:])
+            copy._created_text = dict(self._created_text)
+            copy._rows = dict(self._rows)
+            revision = self.revision
+        return copy, revision
+    
+    def get(self, node_id: str) -> Optional[KnowledgeNode]:
+        """Look up a memory by id."""
+        row = self._rows.get(node_id)
+        return None if row is None else self._node(row)
+    
+    def row_of(self, node_id: str) -> Optional[int]:
+        """Row of the first memory with this id."""
+        return self._rows.get(node_id)
+    
+    def type_at(self, row: int) -> KnowledgeType:
+        return self._TYPES[self._types[row]]
+    
+    def tags_at(self, row: int) -> Tuple[str, ...]:
+        return self._tags[row]
+    
+    def content_lower_at(self, row: int) -> str:
+        return self._contents_lower[row]
+    
+    def created_at(self, row: int) -> str:
+        text = self._created_text.get(row)
+        if text is None:
+            text = datetime.fromtimestamp(self._created_ts[row]).isoformat()
+        return text
+    
+    def _write(self, row: int, node: KnowledgeNode):
+        self._ids[row] = node.id
+        self._types[row] = self._TYPE_CODES[node.type]
+        self._contents[row] = node.content
+        self._contents_lower[row] = _lower(node.content)
+        self._tags[row] = self._intern(self._interned_tags, tuple(sys.intern(t) for t in node.tags))
+        self._sources[row] = sys.intern(node.source)
+        self._created_text.pop(row, None)
+        try:
+            ts = datetime.fromisoformat(node.created_at).timestamp()
+            if datetime.fromtimestamp(ts).isoformat() != node.created_at:
+                raise ValueError(node.created_at)
+            self._created_ts[row] = ts
+        except (TypeError, ValueError, OverflowError, OSError):
+            self._created_text[row] = node.created_at
+        self._connections[row] = tuple(node.connections) if node.connections else None
+        
+        metadata = node.metadata or {}
+        self._meta_keys[row] = self._intern(self._interned_keys, tuple(sys.intern(k) for k in metadata))
+        self._meta_values[row] = tuple(_freeze(v) for v in metadata.values())
+    
+    def _node(self, row: int) -> KnowledgeNode:
+        return KnowledgeNode(
+            id=self._ids[row],
+            type=self._TYPES[self._types[row]],
+            content=self._contents[row],
+            tags=self._tags[row],
+            source=self._sources[row],
+            created_at=self.created_at(row),
+            connections=self._connections[row] or (),
+            metadata=MappingProxyType(dict(zip(self._meta_keys[row], self._meta_values[row])))
+        )
+    
+    @staticmethod
+    def _intern(table: Dict[Tuple[str, ...], Tuple[str, ...]], value: Tuple[str, ...]) -> Tuple[str, ...]:
+        return table.setdefault(value, value)
+
+def _node_to_record(node: KnowledgeNode) -> Dict[str, Any]:
+    return {
+        "id": node.id,
+        "type": node.type.value,
+        "content": node.content,
+        "tags": list(node.tags),
+        "source": node.source,
+        "created_at": node.created_at,
+        "connections": list(node.connections or ()),
+        "metadata": to_plain(node.metadata or {})
+    }
+
+
+def _node_from_record(record: Dict[str, Any]) -> KnowledgeNode:
+    return KnowledgeNode(
+        id=record["id"],
+        type=KnowledgeType(record["type"]),
+        content=record["content"],
+        tags=record.get("tags") or [],
+        source=record["source"],
+        created_at=record.get("created_at"),
+        connections=record.get("connections"),
+        metadata=record.get("metadata")
+    )
+
+
+def _read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records from a JSONL file through mmap, skipping a torn last line."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b""):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Only the tail can be partial (crash mid-append)
+                    continue
+
+
+class MemoryLog:
+    """
+    Log-structured, per-agent persistence for InfoGeniusArcaneaBridge.
+    
+    Layout under `storage_path`:
+        
+        agents/<quoted agent id>/snapshot.jsonl   compacted nodes, header first
+        agents/<quoted agent id>/log.<gen>.jsonl  nodes appended since that snapshot
+        patterns.jsonl, insights.jsonl            append-only
+    
+    Every learned or shared node is appended to the agent's current log,
+    and every in-place replacement is logged as a record naming its row.
+    Once the log outgrows `compact_min_entries` and the snapshot, the
+    agent is compacted: a new snapshot tagged with the next generation is
+    written and atomically renamed into place, then the old log is
+    removed. Loading reads the snapshot and only the log of its
+    generation, so a crash at any point neither loses nor duplicates
+    nodes. Files are read through mmap and agents are only loaded when
+    first accessed.
+    
+    Compaction writes from a consistent copy of the store
+    (`AgentMemoryStore.snapshot`); inside an event loop it writes and
+    fsyncs the snapshot on the default executor. Appends and replacements
+    keep going to the old log meanwhile; they are copied into the new
+    generation's log, which is fsynced, just before the snapshot is
+    renamed into place.
+    """
+    
+    def __init__(self, storage_path: str, compact_min_entries: int = 1000):
+        self.storage_path = storage_path
+        self.compact_min_entries = compact_min_entries
+        self._agents_dir = os.path.join(storage_path, "agents")
+        self._generations: Dict[str, int] = {}
+        self._snapshot_sizes: Dict[str, int] = {}
+        self._log_sizes: Dict[str, int] = {}
+        self._handles: Dict[str, Any] = {}
+        self._compactions: Dict[str, asyncio.Task] = {}
+        self._compaction_locks: Dict[str, asyncio.Lock] = {}
+    
+    def agent_ids(self) -> List[str]:
+        """Agents with state on disk (directory listing only; nothing is read)."""
+        try:
+            names = os.listdir(self._agents_dir)
+        except FileNotFoundError:
+            return []
+        return [unquote(name) for name in names]
+    
+    def _agent_dir(self, agent_id: str) -> str:
+        return os.path.join(self._agents_dir, quote(agent_id, safe=""))
+    
+    def _log_path(self, agent_id: str, generation: int) -> str:
+        return os.path.join(self._agent_dir(agent_id), f"log.{generation}.jsonl")
+    
+    def load(self, agent_id: str) -> AgentMemoryStore:
+        """Rebuild an agent's store from its snapshot and current log."""
+        store = AgentMemoryStore()
+        generation = 0
+        snapshot_count = 0
+        
+        records = _read_jsonl(os.path.join(self._agent_dir(agent_id), "snapshot.jsonl"))
+        header = next(records, None)
+        if header is not None:
+            generation = header["generation"]
+            for record in records:
+                store.append(_node_from_record(record))
+                snapshot_count += 1
+        
+        log_count = 0
+        for record in _read_jsonl(self._log_path(agent_id, generation)):
+            row = record.get("replace")
+            if row is None:
+                store.append(_node_from_record(record))
+            elif row < len(store):
+                store[row] = _node_from_record(record)
+            log_count += 1
+        
+        self._generations[agent_id] = generation
+        self._snapshot_sizes[agent_id] = snapshot_count
+        self._log_sizes[agent_id] = log_count
+        return store
+    
+    def append(self, agent_id: str, node: KnowledgeNode, store: AgentMemoryStore):
+        """Append a node to the agent's log, compacting when it has grown enough."""
+        self._write_record(agent_id, _node_to_record(node), store)
+    
+    def replace(self, agent_id: str, row: int, node: KnowledgeNode, store: AgentMemoryStore):
+        """Log that `row` of the agent's store was replaced by `node`."""
+        self._write_record(agent_id, {"replace": row, **_node_to_record(node)}, store)
+    
+    def _write_record(self, agent_id: str, record: Dict[str, Any], store: AgentMemoryStore):
+        handle = self._handles.get(agent_id)
+        if handle is None:
+            os.makedirs(self._agent_dir(agent_id), exist_ok=True)
+            generation = self._generations.setdefault(agent_id, 0)
+            path = self._log_path(agent_id, generation)
+            handle = self._handles[agent_id] = open(path, "a", encoding="utf-8")
+            if handle.tell() > 0:
+                with open(path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        # Seal a torn line so the next record starts cleanly
+                        handle.write("\n")
+        
+        handle.write(json.dumps(record, default=str) + "\n")
+        handle.flush()
+        
+        log_count = self._log_sizes.get(agent_id, 0) + 1
+        self._log_sizes[agent_id] = log_count
+        if (
+            log_count >= max(self.compact_min_entries, self._snapshot_sizes.get(agent_id, 0))
+            and agent_id not in self._compactions
+        ):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.compact(agent_id, store)
+                return
+            self._compactions[agent_id] = loop.create_task(self._background_compact(agent_id, store))
+    
+    def compact(self, agent_id: str, store: AgentMemoryStore):
+        """Write a snapshot of the whole store and start a fresh log generation."""
+        generation = self._generations.get(agent_id, 0) + 1
+        copy, revision = store.snapshot()
+        tmp = self._write_snapshot(agent_id, copy, generation)
+        self._install_snapshot(agent_id, store, len(copy), revision, generation, tmp)
+    
+    async def compact_async(self, agent_id: str, store: AgentMemoryStore):
+        """Like compact(), with the snapshot written and fsynced off the event loop."""
+        lock = self._compaction_locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            generation = self._generations.get(agent_id, 0) + 1
+            copy, revision = store.snapshot()
+            tmp = await asyncio.get_running_loop().run_in_executor(
+                None, self._write_snapshot, agent_id, copy, generation
+            )
+            self._install_snapshot(agent_id, store, len(copy), revision, generation, tmp)
+    
+    async def _background_compact(self, agent_id: str, store: AgentMemoryStore):
+        try:
+            await self.compact_async(agent_id, store)
+        except OSError as e:
+            # The log is still intact; the next append retries
+            print(f"   ⚠️ Compaction of {agent_id} failed: {e}")
+        finally:
+            self._compactions.pop(agent_id, None)
+    
+    def _write_snapshot(self, agent_id: str, copy: AgentMemoryStore, generation: int) -> str:
+        """Write a detached copy of a store to a temporary snapshot; returns its path."""
+        os.makedirs(self._agent_dir(agent_id), exist_ok=True)
+        tmp = os.path.join(self._agent_dir(agent_id), "snapshot.jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"generation": generation}) + "\n")
+            for node in copy:
+                f.write(json.dumps(_node_to_record(node), default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp
+    
+    def _install_snapshot(
+        self,
+        agent_id: str,
+        store: AgentMemoryStore,
+        count: int,
+        revision: int,
+        generation: int,
+        tmp: str
+    ):
+        """Start the new generation's log with changes made since the snapshot copy, then swap it in."""
+        old_generation = self._generations.get(agent_id, 0)
+        handle = self._handles.pop(agent_id, None)
+        if handle is not None:
+            handle.close()
+        
+        # Until the rename, loading still reads the old snapshot and log
+        newer = store[count:]
+        replaced = [row for row in store.replaced_since(revision) if row < count]
+        if newer or replaced:
+            with open(self._log_path(agent_id, generation), "w", encoding="utf-8") as f:
+                for node in newer:
+                    f.write(json.dumps(_node_to_record(node), default=str) + "\n")
+                for row in replaced:
+                    f.write(json.dumps({"replace": row, **_node_to_record(store[row])}, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self._agent_dir(agent_id), "snapshot.jsonl"))
+        try:
+            os.remove(self._log_path(agent_id, old_generation))
+        except FileNotFoundError:
+            pass
+        
+        self._generations[agent_id] = generation
+        self._snapshot_sizes[agent_id] = count
+        self._log_sizes[agent_id] = len(newer) + len(replaced)
+    
+    def load_list(self, name: str) -> List[Dict[str, Any]]:
+        """Read an append-only list (patterns or insights)."""
+        return list(_read_jsonl(os.path.join(self.storage_path, f"{name}.jsonl")))
+    
+    def append_list(self, name: str, item: Dict[str, Any]):
+        """Append one item to an append-only list."""
+        os.makedirs(self.storage_path, exist_ok=True)
+        with open(os.path.join(self.storage_path, f"{name}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(item, default=str) + "\n")
+    
+    async def drain(self):
+        """Wait for background compactions to finish."""
+        while self._compactions:
+            await asyncio.gather(*list(self._compactions.values()))
+    
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+
+class AgentMemoryMap(MutableMapping):
+    """
+    agent_id -> AgentMemoryStore mapping that loads agents from a MemoryLog on first access.
+    
+    Membership and iteration cover agents on disk without reading them.
+    Stores held here log their in-place replacements to the MemoryLog.
+    """
+    
+    def __init__(self, log: Optional[MemoryLog] = None):
+        self._log = log
+        self._stores: Dict[str, AgentMemoryStore] = {}
+        self._unloaded = set(log.agent_ids()) if log else set()
+    
+    def __getitem__(self, agent_id: str) -> AgentMemoryStore:
+        store = self._stores.get(agent_id)
+        if store is None:
+            if agent_id not in self._unloaded:
+                raise KeyError(agent_id)
+            store = self._stores[agent_id] = self._watch(agent_id, self._log.load(agent_id))
+            self._unloaded.discard(agent_id)
+        return store
+    
+    def __setitem__(self, agent_id: str, store: AgentMemoryStore):
+        self._unloaded.discard(agent_id)
+        self._stores[agent_id] = self._watch(agent_id, store)
+    
+    def _watch(self, agent_id: str, store: AgentMemoryStore) -> AgentMemoryStore:
+        if self._log is not None:
+            store.on_replace = partial(self._log.replace, agent_id)
+        return store
+    
+    def __delitem__(self, agent_id: str):
+        if agent_id in self._unloaded:
+            self._unloaded.discard(agent_id)
+        else:
+            del self._stores[agent_id]
+    
+    def __contains__(self, agent_id: object) -> bool:
+        return agent_id in self._stores or agent_id in self._unloaded
+    
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._stores)
+        yield from list(self._unloaded)
+    
+    def __len__(self) -> int:
+        return len(self._stores) + len(self._unloaded)
+    
+    def loaded_agents(self) -> List[str]:
+        return list(self._stores)
+
+
+class AgentRecallIndex:
+    """
+    Precomputed recall structures for one agent's memories.
+    
+    Keeps lowercased contents joined into a single corpus string (so each
+    query term is located with C-level `str.find` instead of per-memory
+    checks), tag postings keyed by lowercased tag, and an optional
+    contiguous float32 matrix of normalized embeddings. Scoring matches
+    the original rules: +1 when a term occurs in the content, +2 when a
+    term equals a tag.
+    """
+    
+    def __init__(self):
+        self._contents: List[str] = []
+        self._tag_postings: Dict[str, List[int]] = {}
+        self._corpus: Optional[str] = None
+        self._starts: List[int] = []
+        self._embeddings = None
+        self._has_embeddings = False
+    
+    def __len__(self) -> int:
+        return len(self._contents)
+    
+    def replace(self, row: int, node: KnowledgeNode, content_lower: Optional[str] = None):
+        """Re-read one memory replaced in place; its embedding is kept."""
+        self._contents[row] = content_lower if content_lower is not None else node.content.lower()
+        self._corpus = None
+        for tag, postings in list(self._tag_postings.items()):
+            i = bisect_left(postings, row)
+            if i < len(postings) and postings[i] == row:
+                del postings[i]
+                if not postings:
+                    del self._tag_postings[tag]
+        for tag in {t.lower() for t in node.tags}:
+            insort(self._tag_postings.setdefault(tag, []), row)
+    
+    def add(
+        self,
+        node: KnowledgeNode,
+        embedding: Optional[List[float]] = None,
+        content_lower: Optional[str] = None
+    ):
+        """Index a memory appended to the agent's list."""
+        row = len(self._contents)
+        self._contents.append(content_lower if content_lower is not None else node.content.lower())
+        for tag in {t.lower() for t in node.tags}:
+            self._tag_postings.setdefault(tag, []).append(row)
+        self._corpus = None
+        
+        if np is not None and (embedding is not None or self._has_embeddings):
+            self._store_embedding(row, embedding)
+    
+    def _store_embedding(self, row: int, embedding: Optional[List[float]]):
+        """Write a normalized embedding row, growing the matrix as needed."""
+        if embedding is None:
+            if self._embeddings is not None and row >= self._embeddings.shape[0]:
+                self._grow(row + 1)
+            return
+        
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self._embeddings is None:
+            self._embeddings = np.zeros((max(64, row + 1), vector.shape[0]), dtype=np.float32)
+            self._has_embeddings = True
+        elif vector.shape[0] != self._embeddings.shape[1]:
+            return
+        if row >= self._embeddings.shape[0]:
+            self._grow(row + 1)
+        
+        norm = float(np.linalg.norm(vector))
+        self._embeddings[row] = vector / norm if norm > 0 else vector
+    
+    def _grow(self, minimum_rows: int):
+        rows = max(minimum_rows, self._embeddings.shape[0] * 2)
+        grown = np.zeros((rows, self._embeddings.shape[1]), dtype=np.float32)
+        grown[:self._embeddings.shape[0]] = self._embeddings
+        self._embeddings = grown
+    
+    def _content_hits(self, term: str) -> List[int]:
+        """Rows whose content contains term, each reported once."""
+        if self._corpus is None:
+            # "\x00" never appears in a split() term, so matches cannot span rows
+            self._corpus = "\x00".join(self._contents)
+            self._starts = []
+            offset = 0
+            for content in self._contents:
+                self._starts.append(offset)
+                offset += len(content) + 1
+        
+        corpus, starts, count = self._corpus, self._starts, len(self._contents)
+        hits = []
+        pos = corpus.find(term)
+        while pos != -1:
+            row = bisect_right(starts, pos) - 1
+            hits.append(row)
+            if row + 1 >= count:
+                break
+            pos = corpus.find(term, starts[row + 1])
+        return hits
+    
+    def top_k(
+        self,
+        query: str,
+        limit: int,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[int]:
+        """
+        Score every memory in one pass and return the best rows.
+        
+        Ties keep insertion order, like the original stable sort. When a
+        query embedding is given and embeddings are indexed, cosine
+        similarity is added to the lexical score.
+        """
+        count = len(self._contents)
+        if count == 0 or limit <= 0:
+            return []
+        terms = query.lower().split()
+        
+        if np is None:
+            scores = [0.0] * count
+            for term in terms:
+                for row in self._content_hits(term):
+                    scores[row] += 1
+                for row in self._tag_postings.get(term, ()):
+                    scores[row] += 2
+            return heapq.nsmallest(limit, range(count), key=lambda r: (-scores[r], r))
+        
+        scores = np.zeros(count, dtype=np.float32)
+        for term in terms:
+            hits = self._content_hits(term)
+            if hits:
+                scores[hits] += 1
+            postings = self._tag_postings.get(term)
+            if postings:
+                scores[postings] += 2
+        
+        if query_embedding is not None and self._has_embeddings:
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            if query_vector.shape[0] == self._embeddings.shape[1]:
+                norm = float(np.linalg.norm(query_vector))
+                if norm > 0:
+                    scores += self._embeddings[:count] @ (query_vector / norm)
+        
+        if limit >= count:
+            return np.argsort(-scores, kind="stable").tolist()
+        
+        # Take everything strictly above the k-th score, then the earliest
+        # rows tied with it, so boundary ties resolve like a stable sort
+        kth = np.partition(scores, count - limit)[count - limit]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:limit - len(above)]
+        rows = np.concatenate([above, tied])
+        return rows[np.lexsort((rows, -scores[rows]))].tolist()
+
+
+class KnowledgeSearchIndex:
+    """
+    Incrementally maintained inverted index over every agent's memories.
+    
+    Postings map content tokens, lowercased tags, lowercased sources and
+    KnowledgeType to node positions. `semantic_search` keeps substring
+    semantics: a query can only occur in content if each of its word runs
+    occurs inside some content token, so candidates come from the (much
+    smaller) vocabularies and only matching nodes are scored.
+    
+    A replaced memory gets a fresh position and its old one is retired;
+    retired positions are compacted away once they outnumber live ones.
+    """
+    
+    _TOKEN_RE = re.compile(r"\w+")
+    
+    def __init__(self):
+        # (memories, row) per position; nodes are built only for results
+        self._owners: List[Any] = []
+        self._rows = array("L")
+        self._content_lower: List[str] = []
+        self._tags_lower: List[List[str]] = []
+        self._source_lower: List[str] = []
+        self._content_postings: Dict[str, List[int]] = {}
+        self._tag_postings: Dict[str, List[int]] = {}
+        self._source_postings: Dict[str, List[int]] = {}
+        self._type_postings: Dict[KnowledgeType, List[int]] = {}
+        self._vocab_matches: Dict[str, List[str]] = {}
+        # Per agent: the store and revision indexed, and its position per row
+        self._synced: Dict[str, Tuple[Any, int]] = {}
+        self._agent_positions: Dict[str, List[int]] = {}
+        self._dead: set = set()
+    
+    def __len__(self) -> int:
+        return len(self._owners) - len(self._dead)
+    
+    def sync(self, agent_id: str, memories: AgentMemoryStore):
+        """Index memories appended to or replaced in an agent's store since the last sync."""
+        revision = getattr(memories, "revision", 0)
+        synced = self._synced.get(agent_id)
+        positions = self._agent_positions.setdefault(agent_id, [])
+        if synced is not None and synced[0] is not memories:
+            # A different store: retire the agent's positions, index afresh
+            self._dead.update(positions)
+            positions.clear()
+        elif synced is not None and synced[1] != revision:
+            for row in memories.replaced_since(synced[1]):
+                if row < len(positions):
+                    self._dead.add(positions[row])
+                    positions[row] = self._add(memories[row], memories, row)
+        self._synced[agent_id] = (memories, revision)
+        
+        for row, node in enumerate(memories[len(positions):], start=len(positions)):
+            positions.append(self._add(node, memories, row))
+        
+        if len(self._dead) > len(self):
+            self._compact()
+    
+    def _compact(self):
+        """Drop retired positions, renumbering live ones in their original order."""
+        live = [position for position in range(len(self._owners)) if position not in self._dead]
+        renumber = {old: new for new, old in enumerate(live)}
+        
+        self._owners = [self._owners[position] for position in live]
+        self._rows = array("L", (self._rows[position] for position in live))
+        self._content_lower = [self._content_lower[position] for position in live]
+        self._tags_lower = [self._tags_lower[position] for position in live]
+        self._source_lower = [self._source_lower[position] for position in live]
+        for index in (self._content_postings, self._tag_postings, self._source_postings, self._type_postings):
+            for key, postings in list(index.items()):
+                kept = [renumber[position] for position in postings if position in renumber]
+                if kept:
+                    index[key] = kept
+                else:
+                    del index[key]
+        for agent_id, positions in self._agent_positions.items():
+            positions[:] = [renumber[position] for position in positions]
+        self._dead = set()
+        self._vocab_matches.clear()
+    
+    def _add(self, node: KnowledgeNode, memories: AgentMemoryStore, row: int) -> int:
+        position = len(self._owners)
+        content = memories.content_lower_at(row)
+        tags = [sys.intern(t.lower()) for t in node.tags]
+        source = sys.intern(node.source.lower())
+        
+        self._owners.append(memories)
+        self._rows.append(row)
+        self._content_lower.append(content)
+        self._tags_lower.append(tags)
+        self._source_lower.append(source)
+        
+        for token in set(self._TOKEN_RE.findall(content)):
+            postings = self._content_postings.get(token)
+            if postings is None:
+                postings = self._content_postings[token] = []
+                self._vocab_matches.clear()
+            postings.append(position)
+        for tag in set(tags):
+            self._tag_postings.setdefault(tag, []).append(position)
+        self._source_postings.setdefault(source, []).append(position)
+        self._type_postings.setdefault(node.type, []).append(position)
+        return position
+    
+    def _content_candidates(self, query_lower: str) -> Optional[set]:
+        """Positions whose content may contain the query (None = no word runs to index on)."""
+        tokens = self._TOKEN_RE.findall(query_lower)
+        if not tokens:
+            return None
+        
+        candidates = None
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matches = self._vocab_matches.get(token)
+            if matches is None:
+                matches = [term for term in self._content_postings if token in term]
+                self._vocab_matches[token] = matches
+            
+            positions = set()
+            for term in matches:
+                positions.update(self._content_postings[term])
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                break
+        return candidates
+    
+    def search(
+        self,
+        query: str,
+        type_filter: Optional[KnowledgeType] = None,
+        limit: int = 10
+    ) -> List[KnowledgeNode]:
+        """
+        Score matching nodes (+3 content, +2 tag, +1 source) and return the top hits.
+        """
+        query_lower = query.lower()
+        
+        candidates = self._content_candidates(query_lower)
+        if candidates is None:
+            candidates = set(range(len(self._owners)))
+        for tag, positions in self._tag_postings.items():
+            if query_lower in tag:
+                candidates.update(positions)
+        for source, positions in self._source_postings.items():
+            if query_lower in source:
+                candidates.update(positions)
+        if type_filter:
+            candidates &= set(self._type_postings.get(type_filter, ()))
+        candidates -= self._dead
+        
+        scored = []
+        for position in candidates:
+            score = 0
+            if query_lower in self._content_lower[position]:
+                score += 3
+            if any(query_lower in tag for tag in self._tags_lower[position]):
+                score += 2
+            if query_lower in self._source_lower[position]:
+                score += 1
+            if score > 0:
+                scored.append((score, -position))
+        
+        top = heapq.nlargest(limit, scored)
+        return [self._owners[-neg_position][self._rows[-neg_position]] for _, neg_position in top]
+
+
 class InfoGeniusArcaneaBridge:
     """
     Bridges InfoGenius knowledge management with Arcanea
     Enables agents to learn, remember, and reason
     """
     
-    def __init__(self, storage_path: str = "./arcanea-knowledge"):
+    def __init__(
+        self,
+        storage_path: str = "./arcanea-knowledge",
+        persist: bool = False,
+        compact_min_entries: int = 1000
+    ):
         self.storage_path = storage_path
         self.knowledge_graph = {}
-        self.agent_memories = {}
+        # With persist=True, memories, patterns and insights survive restarts under storage_path
+        self._log = MemoryLog(storage_path, compact_min_entries) if persist else None
+        self.agent_memories: Dict[str, AgentMemoryStore] = AgentMemoryMap(self._log)
         self.patterns = []
         self.insights = []
+        self._recall_indexes: Dict[str, AgentRecallIndex] = {}
+        # Store and revision each recall index was built from
+        self._recall_synced: Dict[str, Tuple[Any, int]] = {}
+        self._search_index = KnowledgeSearchIndex()
         
     async def initialize(self):
         """Initialize the knowledge system"""
@@ -70,6 +936,28 @@ class InfoGeniusArcaneaBridge:
         
         for domain in domains:
             self.knowledge_graph[domain] = []
+        
+        # Agents themselves load lazily on first access
+        if self._log:
+            self.patterns = self._log.load_list("patterns")
+            self.insights = self._log.load_list("insights")
+    
+    def _persist_memory(self, agent_id: str, node: KnowledgeNode):
+        """Append a newly stored node to the agent's on-disk log"""
+        if self._log:
+            self._log.append(agent_id, node, self.agent_memories[agent_id])
+    
+    async def compact(self):
+        """Snapshot every loaded agent and start fresh logs"""
+        if self._log:
+            for agent_id in self.agent_memories.loaded_agents():
+                await self._log.compact_async(agent_id, self.agent_memories[agent_id])
+    
+    async def close(self):
+        """Finish background compactions and close open log files"""
+        if self._log:
+            await self._log.drain()
+            self._log.close()
     
     # ===== AGENT KNOWLEDGE MANAGEMENT =====
     
@@ -89,39 +977,54 @@ class InfoGeniusArcaneaBridge:
         )
         
         if agent_id not in self.agent_memories:
-            self.agent_memories[agent_id] = []
+            self.agent_memories[agent_id] = AgentMemoryStore()
         
-        self.agent_memories[agent_id].append(node)
+        index = self._recall_index(agent_id)
+        memories = self.agent_memories[agent_id]
+        row = memories.append(node)
+        self._persist_memory(agent_id, node)
+        index.add(node, knowledge.get("embedding"), memories.content_lower_at(row))
+        self._search_index.sync(agent_id, self.agent_memories[agent_id])
         
         # Extract patterns
         await self._extract_pattern(node)
         
         return node
     
-    async def agent_recall(self, agent_id: str, query: str, limit: int = 5) -> List[KnowledgeNode]:
+    def _recall_index(self, agent_id: str) -> AgentRecallIndex:
+        """Get the agent's recall index, rebuilding it if memories changed behind its back"""
+        index = self._recall_indexes.get(agent_id)
+        memories = self.agent_memories.get(agent_id, [])
+        revision = getattr(memories, "revision", 0)
+        synced = self._recall_synced.get(agent_id)
+        if index is None or len(index) > len(memories) or (synced and synced[0] is not memories):
+            index = self._recall_indexes[agent_id] = AgentRecallIndex()
+        elif synced and synced[1] != revision:
+            # Rows were replaced in place; positions (and embeddings) still line up
+            for row in memories.replaced_since(synced[1]):
+                if row < len(index):
+                    index.replace(row, memories[row], memories.content_lower_at(row))
+        self._recall_synced[agent_id] = (memories, revision)
+        for row in range(len(index), len(memories)):
+            index.add(memories[row], content_lower=memories.content_lower_at(row))
+        return index
+    
+    async def agent_recall(
+        self,
+        agent_id: str,
+        query: str,
+        limit: int = 5,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[KnowledgeNode]:
         """Agent recalls relevant knowledge"""
         if agent_id not in self.agent_memories:
             return []
         
         memories = self.agent_memories[agent_id]
         
-        # Simple relevance scoring
-        scored = []
-        for memory in memories:
-            score = 0
-            query_terms = query.lower().split()
-            content_lower = memory.content.lower()
-            
-            for term in query_terms:
-                if term in content_lower:
-                    score += 1
-                if term in [t.lower() for t in memory.tags]:
-                    score += 2
-            
-            scored.append((score, memory))
-        
-        scored.sort(reverse=True, key=lambda x: x[0])
-        return [m for _, m in scored[:limit]]
+        # Term hits +1, tag hits +2, scored in one vectorized pass
+        rows = self._recall_index(agent_id).top_k(query, limit, query_embedding)
+        return [memories[row] for row in rows]
     
     async def agent_reason(self, agent_id: str, question: str) -> Dict[str, Any]:
         """Agent reasons through knowledge to answer question"""
@@ -156,12 +1059,15 @@ class InfoGeniusArcaneaBridge:
         if len(self.patterns) < 100:  # Limit storage
             pattern = {
                 "type": node.type.value,
-                "signature": hash(node.content[:50]),
+                # Stable across processes, unlike hash() on str
+                "signature": hashlib.sha256(node.content[:50].encode("utf-8")).hexdigest()[:16],
                 "frequency": 1,
                 "sources": [node.source],
                 "first_seen": node.created_at
             }
             self.patterns.append(pattern)
+            if self._log:
+                self._log.append_list("patterns", pattern)
     
     async def recognize_patterns(self, domain: str = None) -> List[Dict]:
         """Recognize patterns across knowledge"""
@@ -199,6 +1105,8 @@ class InfoGeniusArcaneaBridge:
         }
         
         self.insights.append(insight)
+        if self._log:
+            self._log.append_list("insights", insight)
         return insight
     
     # ===== AGENT COORDINATION =====
@@ -208,25 +1116,21 @@ class InfoGeniusArcaneaBridge:
         if from_agent not in self.agent_memories:
             return False
         
-        source_memory = None
-        for memory in self.agent_memories[from_agent]:
-            if memory.id == knowledge_id:
-                source_memory = memory
-                break
+        source_memory = self.agent_memories[from_agent].get(knowledge_id)
         
         if not source_memory:
             return False
         
         for agent_id in to_agents:
             if agent_id not in self.agent_memories:
-                self.agent_memories[agent_id] = []
+                self.agent_memories[agent_id] = AgentMemoryStore()
             
             # Create copy
             shared = KnowledgeNode(
                 id=f"shared_{knowledge_id}",
                 type=source_memory.type,
                 content=f"[Shared from {from_agent}] {source_memory.content}",
-                tags=source_memory.tags + ["shared"],
+                tags=[*source_memory.tags, "shared"],
                 source=agent_id,
                 metadata={
                     **source_memory.metadata,
@@ -235,7 +1139,11 @@ class InfoGeniusArcaneaBridge:
                 }
             )
             
+            index = self._recall_index(agent_id)
             self.agent_memories[agent_id].append(shared)
+            self._persist_memory(agent_id, shared)
+            index.add(shared)
+            self._search_index.sync(agent_id, self.agent_memories[agent_id])
         
         return True
     
@@ -243,32 +1151,12 @@ class InfoGeniusArcaneaBridge:
     
     async def semantic_search(self, query: str, type_filter: KnowledgeType = None) -> List[KnowledgeNode]:
         """Search knowledge semantically"""
-        all_nodes = []
-        for memories in self.agent_memories.values():
-            all_nodes.extend(memories)
-        
-        # Filter by type if specified
-        if type_filter:
-            all_nodes = [n for n in all_nodes if n.type == type_filter]
-        
-        # Simple text matching
-        results = []
-        query_lower = query.lower()
-        
-        for node in all_nodes:
-            score = 0
-            if query_lower in node.content.lower():
-                score += 3
-            if any(query_lower in tag.lower() for tag in node.tags):
-                score += 2
-            if query_lower in node.source.lower():
-                score += 1
-            
-            if score > 0:
-                results.append((score, node))
+        # Pick up memories appended outside agent_learn/share_knowledge
+        for agent_id, memories in self.agent_memories.items():
+            self._search_index.sync(agent_id, memories)
         
-        results.sort(reverse=True, key=lambda x: x[0])
-        return [node for _, node in results[:10]]
+        # Only nodes in matching postings are scored; heap keeps the top 10
+        return self._search_index.search(query, type_filter, limit=10)
     
     async def get_agent_knowledge_stats(self, agent_id: str) -> Dict[str, Any]:
         """Get knowledge statistics for an agent"""
@@ -279,16 +1167,18 @@ class InfoGeniusArcaneaBridge:
         domains = set()
         type_counts = {}
         
-        for memory in memories:
-            domains.update(memory.tags)
-            type_counts[memory.type.value] = type_counts.get(memory.type.value, 0) + 1
+        # Read the columns directly rather than building a node per memory
+        for row in range(len(memories)):
+            domains.update(memories.tags_at(row))
+            type_value = memories.type_at(row).value
+            type_counts[type_value] = type_counts.get(type_value, 0) + 1
         
         return {
             "agent": agent_id,
             "memories": len(memories),
             "knowledge_domains": list(domains),
             "type_distribution": type_counts,
-            "latest_memory": memories[-1].created_at if memories else None
+            "latest_memory": memories.created_at(len(memories) - 1) if memories else None
         }
     
     # ===== EXPORT & INTEGRATION =====
@@ -11,7 +11,7 @@ Features vector embeddings, semantic search, pattern recognition, and knowledge
 Dependencies:
     - supabase-py: Supabase client for persistence
     - openai: For text-embedding-3-small embeddings
-    - scikit-learn: For DBSCAN clustering (pattern recognition)
+    - scikit-learn: For DBSCAN / MiniBatchKMeans clustering (pattern recognition)
     - numpy: For vector operations
 
 Database Schema (Supabase with pgvector):
@@ -21,25 +21,42 @@ Database Schema (Supabase with pgvector):
     - agent_id: varchar
     - content: text
     - embedding: vector(1536)
+    - embedding_ref: uuid (shared rows pointing at the original embedding)
     - metadata: jsonb
     - created_at: timestamp
+    
+    Table: agent_pattern_state
+    - scope: varchar (primary key; agent_id or '*')
+    - state: jsonb (incremental pattern state)
+    - updated_at: timestamp
 
 SQL Functions Required:
     - match_agent_memories(query_embedding, threshold, count, agent_id)
     - match_memories(query_embedding, threshold, count)
 """
 
+import abc
 import json
 import asyncio
+import base64
+import concurrent.futures
+import copy
+import hashlib
+import heapq
+import math
+import os
+import random
+import time
 import uuid
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from collections import Counter, OrderedDict
+from typing import Dict, List, Any, Optional, Set, Tuple
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
 from enum import Enum
 import logging
 
 import numpy as np
-from sklearn.cluster import DBSCAN
+from sklearn.cluster import DBSCAN, MiniBatchKMeans
 from supabase import Client as SupabaseClient
 from openai import AsyncOpenAI
 
@@ -59,7 +76,7 @@ class KnowledgeCategory(Enum):
     LEARNED_RULE = "learned_rule"
 
 
-@dataclass
+@dataclass(slots=True)
 class KnowledgeEntry:
     """
     Represents a single knowledge entry with vector embedding.
@@ -68,23 +85,37 @@ class KnowledgeEntry:
         id: Unique identifier (UUID)
         agent_id: Agent that owns/created this knowledge
         content: The actual knowledge content (text)
-        embedding: Vector embedding (1536 dimensions for text-embedding-3-small)
+        embedding: Vector embedding as a float32 array (1536 dimensions for text-embedding-3-small)
         metadata: Arbitrary metadata (category, confidence, tags, etc.)
         timestamp: ISO format timestamp
     """
     id: str
     agent_id: str
     content: str
-    embedding: List[float]
+    embedding: np.ndarray
     metadata: Dict[str, Any]
     timestamp: str
     
     def __post_init__(self):
-        """Validate embedding dimensions"""
+        """Store the embedding as float32 and validate its dimensions"""
+        self.embedding = np.asarray(self.embedding, dtype=np.float32)
         if len(self.embedding) != 1536:
             logger.warning(f"Embedding has {len(self.embedding)} dimensions, expected 1536")
 
 
+class PartialBatchError(Exception):
+    """
+    Raised when a multi-insert batch fails after earlier chunks were written.
+    
+    Attributes:
+        stored: Entries whose rows were inserted before the failure, in order
+    """
+    
+    def __init__(self, message: str, stored: List[KnowledgeEntry]):
+        super().__init__(message)
+        self.stored = stored
+
+
 @dataclass
 class Pattern:
     """
@@ -102,6 +133,1220 @@ class Pattern:
     data: Dict[str, Any]
 
 
+@dataclass
+class PatternInputs:
+    """Hour histogram, embedding matrix and light entries streamed for pattern analysis."""
+    hour_counts: Counter
+    matrix: np.ndarray
+    entries: List[Dict[str, Any]]
+    watermark: Optional[str] = None
+    watermark_ids: Set[str] = field(default_factory=set)
+    
+    def advance_watermark(self, rows: List[Dict[str, Any]]) -> None:
+        """Track the newest created_at seen and the ids sharing it."""
+        self.watermark, self.watermark_ids = _advance_watermark(
+            self.watermark, self.watermark_ids, rows
+        )
+
+
+@dataclass
+class PatternState:
+    """
+    Persisted, incrementally maintained pattern state for one agent.
+    
+    Attributes:
+        scope: Agent ID, or ALL_AGENTS for the whole corpus
+        hour_counts: Entries per creation hour
+        total_entries: Entries with a readable timestamp
+        centroids: Mean normalized embedding per topic cluster
+        member_counts: Members per cluster
+        tag_counts: Tag/category counts per cluster
+        representatives: Representative content per cluster
+        noise_count: Entries with an embedding not assigned to any cluster
+        watermark: Newest created_at folded into the state
+        watermark_ids: IDs at the watermark timestamp (already counted);
+            the largest one is the id half of the (created_at, id) keyset
+        last_full_recompute: ISO timestamp of the last full recompute
+        corpus_at_full: Clustered entries at the last full recompute
+        rows_since_full: Entries folded in incrementally since then
+    """
+    ALL_AGENTS = "*"
+    
+    scope: str
+    hour_counts: Dict[int, int] = field(default_factory=dict)
+    total_entries: int = 0
+    centroids: List[List[float]] = field(default_factory=list)
+    member_counts: List[int] = field(default_factory=list)
+    tag_counts: List[Dict[str, int]] = field(default_factory=list)
+    representatives: List[str] = field(default_factory=list)
+    noise_count: int = 0
+    watermark: Optional[str] = None
+    watermark_ids: List[str] = field(default_factory=list)
+    last_full_recompute: Optional[str] = None
+    corpus_at_full: int = 0
+    rows_since_full: int = 0
+    
+    def needs_full_recompute(self, drift_ratio: float, max_age_hours: float) -> bool:
+        """Whether incremental updates have drifted or aged enough to rebuild."""
+        if self.rows_since_full > drift_ratio * max(self.corpus_at_full, 1):
+            return True
+        if not self.last_full_recompute:
+            return True
+        age = datetime.now() - datetime.fromisoformat(self.last_full_recompute)
+        return age.total_seconds() > max_age_hours * 3600
+    
+    def advance_watermark(self, rows: List[Dict[str, Any]]) -> None:
+        """Track the newest created_at seen and the ids sharing it."""
+        watermark, ids = _advance_watermark(self.watermark, set(self.watermark_ids), rows)
+        self.watermark, self.watermark_ids = watermark, sorted(ids)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["centroids"] = [encode_embedding(c) for c in self.centroids]
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PatternState":
+        state = cls(**data)
+        # JSON object keys come back as strings
+        state.hour_counts = {int(h): c for h, c in state.hour_counts.items()}
+        state.centroids = [_parse_embedding(c).tolist() for c in state.centroids]
+        return state
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _advance_watermark(
+    watermark: Optional[str],
+    watermark_ids: Set[str],
+    rows: List[Dict[str, Any]]
+) -> Tuple[Optional[str], Set[str]]:
+    """Move a (created_at, ids) watermark forward over a batch of rows."""
+    current = _parse_timestamp(watermark) if watermark else None
+    for row in rows:
+        created_at = row.get("created_at")
+        if not created_at:
+            continue
+        try:
+            ts = _parse_timestamp(created_at)
+        except ValueError:
+            continue
+        if current is None or ts > current:
+            current, watermark, watermark_ids = ts, created_at, {row["id"]}
+        elif ts == current:
+            watermark_ids.add(row["id"])
+    return watermark, watermark_ids
+
+
+class EmbeddingBatcher:
+    """
+    Async micro-batcher for OpenAI embedding requests.
+    
+    Concurrent callers submit single strings; the batcher gathers them
+    for up to `linger_ms` (or until `max_batch_size` inputs are waiting)
+    and sends one multi-input `embeddings.create` request. Vectors come
+    back base64-packed and are decoded straight into float32 arrays. Each
+    caller gets its own future, resolved with its vector or the batch error.
+    
+    Args:
+        openai_client: AsyncOpenAI client
+        model: Embedding model name
+        dimensions: Embedding dimensions
+        max_batch_size: Maximum inputs per API request
+        linger_ms: How long to wait for more inputs before flushing
+    """
+    
+    def __init__(
+        self,
+        openai_client: AsyncOpenAI,
+        model: str,
+        dimensions: int,
+        max_batch_size: int = 256,
+        linger_ms: float = 10.0
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        
+        self.openai = openai_client
+        self.model = model
+        self.dimensions = dimensions
+        self.max_batch_size = max_batch_size
+        self.linger_seconds = max(linger_ms, 0.0) / 1000.0
+        
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self.requests_sent = 0
+        self.inputs_embedded = 0
+    
+    def submit(self, text: str) -> asyncio.Future:
+        """
+        Queue text for embedding.
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Future resolving to the embedding vector (float32 array)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.linger_seconds, self._flush)
+        
+        return future
+    
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed a single text through the batcher."""
+        return await self.submit(text)
+    
+    async def flush(self) -> None:
+        """Send everything queued so far and wait for in-flight batches."""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+    
+    def _flush(self) -> None:
+        """Split pending inputs into batches and dispatch them."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            
+            task = asyncio.ensure_future(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Embed one batch and resolve its futures."""
+        try:
+            response = await self.openai.embeddings.create(
+                model=self.model,
+                input=[text for text, _ in batch],
+                dimensions=self.dimensions,
+                encoding_format="base64"
+            )
+        except Exception as e:
+            logger.error(f"Failed to generate embeddings for batch of {len(batch)}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        self.requests_sent += 1
+        self.inputs_embedded += len(batch)
+        
+        # The API may return items out of order; `index` maps them back
+        items = sorted(response.data, key=lambda item: item.index)
+        if len(items) != len(batch):
+            error = Exception(f"Expected {len(batch)} embeddings, got {len(items)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        
+        for (_, future), item in zip(batch, items):
+            if not future.done():
+                future.set_result(_parse_embedding(item.embedding))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics for monitoring."""
+        return {
+            "requests_sent": self.requests_sent,
+            "inputs_embedded": self.inputs_embedded,
+            "avg_batch_size": round(self.inputs_embedded / self.requests_sent, 2)
+                if self.requests_sent else 0.0,
+            "pending": len(self._pending),
+            "max_batch_size": self.max_batch_size,
+            "linger_ms": self.linger_seconds * 1000.0
+        }
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache with an LRU memory tier and an
+    optional memory-mapped disk tier.
+    
+    Keys are SHA-256 digests of (model, dimensions, text), so the same text
+    embedded with a different model or size never collides. Vectors are kept
+    as packed float32 (or float16) rows in both tiers. The disk tier is a
+    pair of append-only files (fixed-width digests + raw rows) that
+    survives restarts and is read through `np.memmap`, so only rows that
+    are actually hit are paged in.
+    
+    Args:
+        dimensions: Embedding dimensions (fixes the disk row width)
+        max_entries: Maximum vectors held in the memory tier
+        disk_path: Optional directory for the persistent tier
+        storage: "float32" or "float16" (half the memory and disk, ~3 digits)
+    """
+    
+    KEY_BYTES = 32  # sha256 digest size
+    STORAGE = ("float32", "float16")
+    
+    def __init__(
+        self,
+        dimensions: int,
+        max_entries: int = 10000,
+        disk_path: Optional[str] = None,
+        storage: str = "float32"
+    ):
+        if storage not in self.STORAGE:
+            raise ValueError(f"Unknown embedding cache storage: {storage}")
+        
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.storage = storage
+        self._dtype = np.dtype(storage)
+        
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._disk_index: Dict[bytes, int] = {}
+        self._disk_map: Optional[np.memmap] = None
+        self._vectors_file: Optional[str] = None
+        self._keys_file: Optional[str] = None
+        
+        if disk_path:
+            self._open_disk_tier(disk_path)
+    
+    @staticmethod
+    def make_key(model: str, dimensions: int, text: str) -> bytes:
+        """Build the content address for an embedding request."""
+        return hashlib.sha256(f"{model}\x00{dimensions}\x00{text}".encode("utf-8")).digest()
+    
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """
+        Look up an embedding, promoting disk hits into the memory tier.
+        
+        Args:
+            key: Content address from `make_key`
+        
+        Returns:
+            Read-only float32 embedding vector, or None on a miss
+        """
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._as_float32(vector)
+        
+        slot = self._disk_index.get(key)
+        if slot is not None:
+            vector = np.array(self._disk_row(slot), dtype=self._dtype)
+            vector.flags.writeable = False
+            self._remember(key, vector)
+            self.hits += 1
+            self.disk_hits += 1
+            return self._as_float32(vector)
+        
+        self.misses += 1
+        return None
+    
+    def _as_float32(self, vector: np.ndarray) -> np.ndarray:
+        if vector.dtype == np.float32:
+            return vector
+        vector = vector.astype(np.float32)
+        vector.flags.writeable = False
+        return vector
+    
+    def put(self, key: bytes, embedding: Any) -> None:
+        """
+        Store an embedding in the memory tier and, if enabled, on disk.
+        
+        Args:
+            key: Content address from `make_key`
+            embedding: Embedding vector
+        """
+        vector = np.array(embedding, dtype=self._dtype)
+        vector.flags.writeable = False
+        self._remember(key, vector)
+        
+        if self._vectors_file and key not in self._disk_index and vector.shape == (self.dimensions,):
+            try:
+                self._append_to_disk(key, vector)
+            except OSError as e:
+                logger.warning(f"Embedding cache disk write failed: {e}")
+    
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        """Insert into the memory tier, evicting least-recently-used vectors."""
+        if self.max_entries <= 0:
+            return
+        
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+    
+    def _open_disk_tier(self, disk_path: str) -> None:
+        """Load the digest index and map existing vectors."""
+        os.makedirs(disk_path, exist_ok=True)
+        suffix = "f32" if self.storage == "float32" else "f16"
+        self._vectors_file = os.path.join(disk_path, f"embeddings-{self.dimensions}.{suffix}")
+        self._keys_file = os.path.join(disk_path, f"embeddings-{self.dimensions}.keys")
+        
+        for path in (self._vectors_file, self._keys_file):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+        
+        row_bytes = self.dimensions * self._dtype.itemsize
+        with open(self._keys_file, "rb") as f:
+            keys = f.read()
+        
+        # A crash between the two appends leaves the files uneven; keep the
+        # common prefix and trim the rest
+        rows = min(len(keys) // self.KEY_BYTES, os.path.getsize(self._vectors_file) // row_bytes)
+        if len(keys) != rows * self.KEY_BYTES:
+            os.truncate(self._keys_file, rows * self.KEY_BYTES)
+        if os.path.getsize(self._vectors_file) != rows * row_bytes:
+            os.truncate(self._vectors_file, rows * row_bytes)
+        
+        for slot in range(rows):
+            self._disk_index[keys[slot * self.KEY_BYTES:(slot + 1) * self.KEY_BYTES]] = slot
+        
+        logger.info(f"Embedding cache disk tier: {rows} vectors at {disk_path}")
+    
+    def _disk_row(self, slot: int) -> np.ndarray:
+        """Read a row from the memory-mapped vectors file, remapping if it grew."""
+        if self._disk_map is None or slot >= self._disk_map.shape[0]:
+            self._disk_map = np.memmap(
+                self._vectors_file,
+                dtype=self._dtype,
+                mode="r",
+                shape=(len(self._disk_index), self.dimensions)
+            )
+        return self._disk_map[slot]
+    
+    def _append_to_disk(self, key: bytes, vector: np.ndarray) -> None:
+        """Append one vector; the digest is written last so it is only visible once complete."""
+        with open(self._vectors_file, "ab") as f:
+            f.write(vector.tobytes())
+        with open(self._keys_file, "ab") as f:
+            f.write(key)
+        self._disk_index[key] = len(self._disk_index)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk_index),
+            "max_entries": self.max_entries,
+            "storage": self.storage,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate_percent": round(self.hits / lookups * 100, 2) if lookups else 0.0
+        }
+
+
+def encode_embedding(vector: Any, dtype: str = "float32") -> str:
+    """
+    Pack an embedding as base64 little-endian float32 (or float16).
+    
+    About a third the size of a JSON float array and decoded without
+    creating per-element Python objects.
+    """
+    return base64.b64encode(np.asarray(vector, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()).decode("ascii")
+
+
+def decode_embedding(data: str, dtype: str = "float32") -> np.ndarray:
+    """Unpack a base64 embedding produced by `encode_embedding` into float32."""
+    packed = np.frombuffer(base64.b64decode(data), dtype=np.dtype(dtype).newbyteorder("<"))
+    return packed.astype(np.float32)
+
+
+def to_pgvector(vector: Any) -> str:
+    """
+    Format an embedding as compact pgvector text.
+    
+    pgvector only accepts text input through PostgREST; seven significant
+    digits is float32 precision, roughly half the bytes of Python's
+    float repr.
+    """
+    return "[" + ",".join(map("{:.7g}".format, np.asarray(vector, dtype=np.float32).tolist())) + "]"
+
+
+def content_hash(content: str) -> str:
+    """Stable key for a memory's text, stored as metadata.content_hash."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _is_missing_function(error: Exception) -> bool:
+    """Whether a PostgREST error means the RPC does not exist (PGRST202 / 404)."""
+    code = getattr(error, "code", None)
+    if str(code) in ("PGRST202", "404"):
+        return True
+    return "PGRST202" in str(error)
+
+
+def _parse_embedding(value: Any) -> Optional[np.ndarray]:
+    """
+    Decode an embedding column value into a float32 vector.
+    
+    PostgREST returns pgvector columns as text ("[0.1,0.2,...]"), the
+    embeddings API and persisted state use base64 float32, and locally
+    built rows carry arrays or plain lists.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if value.startswith("["):
+            body = value.strip("[]")
+            return np.array(body.split(",") if body else [], dtype=np.float32)
+        return decode_embedding(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _normalize(vector: Any) -> np.ndarray:
+    """L2-normalize a vector so cosine similarity becomes a dot product."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+class VectorIndex(abc.ABC):
+    """
+    Base class for in-process vector indexes.
+    
+    Vectors are stored L2-normalized, so scores are cosine similarities
+    comparable with the `1 - (embedding <=> query)` values returned by
+    the pgvector RPCs.
+    
+    Args:
+        dimensions: Vector dimensions
+    """
+    
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+    
+    @abc.abstractmethod
+    def add(self, item_id: str, vector: Any) -> None:
+        """Insert or replace a vector."""
+    
+    @abc.abstractmethod
+    def remove(self, item_id: str) -> bool:
+        """Remove a vector. Returns True if it was present."""
+    
+    @abc.abstractmethod
+    def get_vector(self, item_id: str) -> Optional[np.ndarray]:
+        """Return the stored (normalized) vector for an id."""
+    
+    @abc.abstractmethod
+    def search(self, query: Any, k: int, threshold: float = -1.0) -> List[Tuple[str, float]]:
+        """Return up to k (id, similarity) pairs above threshold, best first."""
+    
+    @abc.abstractmethod
+    def items(self) -> List[Tuple[str, np.ndarray]]:
+        """Return all (id, vector) pairs."""
+    
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        """Number of live vectors."""
+
+
+class ExactVectorIndex(VectorIndex):
+    """
+    Brute-force index over a contiguous matrix.
+    
+    One matrix-vector product per query plus `argpartition` top-k; exact
+    results, and fast enough for agents with up to a few tens of thousands
+    of memories. Removal swaps the last row into the hole, so the matrix
+    stays dense.
+    
+    Rows are float32 by default. "float16" halves memory; "int8" quarters
+    it by storing each row scaled to [-127, 127] with a per-row float32
+    scale, and is scored in blocks so no full float32 copy is made.
+    
+    Args:
+        dimensions: Vector dimensions
+        initial_capacity: Preallocated rows
+        storage: "float32", "float16" or "int8"
+    """
+    
+    STORAGE = ("float32", "float16", "int8")
+    SCORE_BLOCK_ROWS = 4096
+    
+    def __init__(self, dimensions: int, initial_capacity: int = 256, storage: str = "float32"):
+        if storage not in self.STORAGE:
+            raise ValueError(f"Unknown vector storage: {storage}")
+        
+        super().__init__(dimensions)
+        self.storage = storage
+        self._matrix = np.zeros((initial_capacity, dimensions), dtype=storage)
+        self._scales = np.ones(initial_capacity, dtype=np.float32) if storage == "int8" else None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+    
+    def add(self, item_id: str, vector: Any) -> None:
+        vector = _normalize(vector)
+        row = self._rows.get(item_id)
+        if row is None:
+            row = len(self._ids)
+            if row >= self._matrix.shape[0]:
+                grown = np.zeros((self._matrix.shape[0] * 2, self.dimensions), dtype=self._matrix.dtype)
+                grown[:row] = self._matrix[:row]
+                self._matrix = grown
+                if self._scales is not None:
+                    self._scales = np.resize(self._scales, self._matrix.shape[0])
+            self._ids.append(item_id)
+            self._rows[item_id] = row
+        
+        if self._scales is not None:
+            scale = float(np.abs(vector).max()) / 127.0 or 1.0
+            self._matrix[row] = np.round(vector / scale)
+            self._scales[row] = scale
+        else:
+            self._matrix[row] = vector
+    
+    def remove(self, item_id: str) -> bool:
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return False
+        
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            if self._scales is not None:
+                self._scales[row] = self._scales[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._ids.pop()
+        return True
+    
+    def get_vector(self, item_id: str) -> Optional[np.ndarray]:
+        row = self._rows.get(item_id)
+        return None if row is None else self._row_vector(row)
+    
+    def _row_vector(self, row: int) -> np.ndarray:
+        if self._scales is not None:
+            return self._matrix[row].astype(np.float32) * self._scales[row]
+        return self._matrix[row]
+    
+    def _scores(self, query: np.ndarray, count: int) -> np.ndarray:
+        if self._matrix.dtype == np.float32:
+            return self._matrix[:count] @ query
+        
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.SCORE_BLOCK_ROWS):
+            stop = min(start + self.SCORE_BLOCK_ROWS, count)
+            scores[start:stop] = self._matrix[start:stop].astype(np.float32) @ query
+        if self._scales is not None:
+            scores *= self._scales[:count]
+        return scores
+    
+    def search(self, query: Any, k: int, threshold: float = -1.0) -> List[Tuple[str, float]]:
+        count = len(self._ids)
+        if count == 0 or k <= 0:
+            return []
+        
+        scores = self._scores(_normalize(query), count)
+        if k < count:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(-scores[top])]
+        
+        return [(self._ids[i], float(scores[i])) for i in top if scores[i] > threshold]
+    
+    def items(self) -> List[Tuple[str, np.ndarray]]:
+        return [(item_id, self._row_vector(row)) for row, item_id in enumerate(self._ids)]
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class HNSWVectorIndex(VectorIndex):
+    """
+    Hierarchical Navigable Small World graph for approximate search.
+    
+    Each node is assigned a random top layer; searches descend greedily
+    through the sparse upper layers and run a beam search of width
+    `ef_search` on layer 0. Neighbor distances are computed in one
+    vectorized product per expanded node. Deletes are tombstones that
+    stay navigable but never appear in results; the graph is rebuilt once
+    tombstones outnumber live nodes (unless `auto_rebuild` is off, in
+    which case the owner checks `tombstones` and rebuilds it elsewhere).
+    
+    Args:
+        dimensions: Vector dimensions
+        m: Neighbors per node on upper layers (2*m on layer 0)
+        ef_construction: Beam width while inserting
+        ef_search: Beam width while querying
+        seed: Optional RNG seed for reproducible layer assignment
+        storage: "float32" or "float16" vectors (graph traversal scores
+            every expanded neighbor, so int8 is not offered here)
+        auto_rebuild: Rebuild inline from `remove` once tombstones
+            outnumber live nodes
+    """
+    
+    def __init__(
+        self,
+        dimensions: int,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        seed: Optional[int] = None,
+        initial_capacity: int = 256,
+        storage: str = "float32",
+        auto_rebuild: bool = True
+    ):
+        if storage not in ("float32", "float16"):
+            raise ValueError(f"Unknown vector storage for HNSW: {storage}")
+        
+        super().__init__(dimensions)
+        self.storage = storage
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self.auto_rebuild = auto_rebuild
+        self._level_mult = 1.0 / math.log(max(m, 2))
+        self._rng = random.Random(seed)
+        
+        self._vectors = np.zeros((initial_capacity, dimensions), dtype=storage)
+        self._ids: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._neighbors: List[List[List[int]]] = []
+        self._deleted: Set[int] = set()
+        self._entry: Optional[int] = None
+        self._max_level = -1
+    
+    def add(self, item_id: str, vector: Any) -> None:
+        if item_id in self._slots:
+            self.remove(item_id)
+        
+        vector = _normalize(vector)
+        slot = len(self._ids)
+        if slot >= self._vectors.shape[0]:
+            grown = np.zeros((self._vectors.shape[0] * 2, self.dimensions), dtype=self._vectors.dtype)
+            grown[:slot] = self._vectors[:slot]
+            self._vectors = grown
+        self._vectors[slot] = vector
+        self._ids.append(item_id)
+        self._slots[item_id] = slot
+        
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        self._neighbors.append([[] for _ in range(level + 1)])
+        
+        if self._entry is None:
+            self._entry = slot
+            self._max_level = level
+            return
+        
+        entry = self._entry
+        for layer in range(self._max_level, level, -1):
+            entry = self._search_layer(vector, [entry], 1, layer)[0][1]
+        
+        for layer in range(min(level, self._max_level), -1, -1):
+            candidates = self._search_layer(vector, [entry], self.ef_construction, layer)
+            max_links = self.m0 if layer == 0 else self.m
+            neighbors = [node for _, node in candidates[:self.m]]
+            self._neighbors[slot][layer] = neighbors
+            
+            for node in neighbors:
+                links = self._neighbors[node][layer]
+                links.append(slot)
+                if len(links) > max_links:
+                    scores = self._vectors[links] @ self._vectors[node]
+                    keep = np.argsort(-scores)[:max_links]
+                    self._neighbors[node][layer] = [links[i] for i in keep]
+            
+            entry = candidates[0][1]
+        
+        if level > self._max_level:
+            self._entry = slot
+            self._max_level = level
+    
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        entry_points: List[int],
+        ef: int,
+        layer: int
+    ) -> List[Tuple[float, int]]:
+        """Beam search on one layer; returns (similarity, slot) best first."""
+        visited = set(entry_points)
+        entry_scores = self._vectors[entry_points] @ query
+        candidates = [(-float(s), node) for s, node in zip(entry_scores, entry_points)]
+        heapq.heapify(candidates)
+        results = [(float(s), node) for s, node in zip(entry_scores, entry_points)]
+        heapq.heapify(results)
+        
+        while candidates:
+            neg_score, node = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_score < results[0][0]:
+                break
+            
+            links = self._neighbors[node]
+            if layer >= len(links):
+                continue
+            fresh = [n for n in links[layer] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            
+            scores = self._vectors[fresh] @ query
+            for score, neighbor in zip(scores.tolist(), fresh):
+                if len(results) < ef or score > results[0][0]:
+                    heapq.heappush(candidates, (-score, neighbor))
+                    heapq.heappush(results, (score, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        
+        return sorted(results, reverse=True)
+    
+    def remove(self, item_id: str) -> bool:
+        slot = self._slots.pop(item_id, None)
+        if slot is None:
+            return False
+        
+        self._deleted.add(slot)
+        if self.auto_rebuild and len(self._deleted) > len(self._slots):
+            self._rebuild()
+        return True
+    
+    @property
+    def tombstones(self) -> int:
+        """Number of deleted nodes still held in the graph."""
+        return len(self._deleted)
+    
+    def _rebuild(self) -> None:
+        """Rebuild the graph from live nodes, dropping tombstones."""
+        live = self.items()
+        self.__init__(
+            self.dimensions,
+            m=self.m,
+            ef_construction=self.ef_construction,
+            ef_search=self.ef_search,
+            seed=self.seed,
+            initial_capacity=max(len(live), 1),
+            storage=self.storage,
+            auto_rebuild=self.auto_rebuild
+        )
+        for item_id, vector in live:
+            self.add(item_id, vector)
+    
+    def get_vector(self, item_id: str) -> Optional[np.ndarray]:
+        slot = self._slots.get(item_id)
+        return None if slot is None else self._vectors[slot]
+    
+    def search(self, query: Any, k: int, threshold: float = -1.0) -> List[Tuple[str, float]]:
+        if not self._slots or k <= 0:
+            return []
+        
+        query = _normalize(query)
+        entry = self._entry
+        for layer in range(self._max_level, 0, -1):
+            entry = self._search_layer(query, [entry], 1, layer)[0][1]
+        
+        candidates = self._search_layer(query, [entry], max(self.ef_search, k), 0)
+        results = []
+        for score, slot in candidates:
+            if slot in self._deleted or score <= threshold:
+                continue
+            results.append((self._ids[slot], score))
+            if len(results) == k:
+                break
+        return results
+    
+    def items(self) -> List[Tuple[str, np.ndarray]]:
+        return [(item_id, self._vectors[slot]) for item_id, slot in self._slots.items()]
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class PartitionedVectorIndex:
+    """
+    Local semantic search backend, partitioned per agent.
+    
+    Keeps one vector index per `agent_id` plus the row fields the match
+    RPCs return, so results have the same shape as `match_agent_memories`.
+    A partition only answers searches once it has been fully loaded from
+    Supabase (see `ArcaneaKnowledgeBase.load_vector_index`); until then the
+    RPC stays authoritative.
+    
+    Args:
+        dimensions: Vector dimensions
+        backend: "exact", "hnsw", or "auto" (exact until a partition
+            reaches `hnsw_threshold` entries, then converted to HNSW; the
+            graph is built on a worker thread while the exact partition
+            keeps serving, and swapped in once it has caught up; HNSW
+            partitions are rebuilt the same way once tombstones outnumber
+            live nodes)
+        hnsw_threshold: Partition size at which "auto" switches to HNSW
+        hnsw_options: Extra keyword arguments for HNSWVectorIndex
+        storage: Vector storage for partitions ("float32", "float16", "int8");
+            HNSW partitions store int8 requests as float16
+    """
+    
+    BACKENDS = ("exact", "hnsw", "auto")
+    
+    def __init__(
+        self,
+        dimensions: int,
+        backend: str = "auto",
+        hnsw_threshold: int = 10000,
+        hnsw_options: Optional[Dict[str, Any]] = None,
+        storage: str = "float32"
+    ):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown vector index backend: {backend}")
+        
+        self.dimensions = dimensions
+        self.backend = backend
+        self.hnsw_threshold = hnsw_threshold
+        self.hnsw_options = hnsw_options or {}
+        self.storage = storage
+        
+        self._partitions: Dict[str, VectorIndex] = {}
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._loaded_agents: Set[str] = set()
+        self._all_loaded = False
+        # Agents whose HNSW graph is being built or rebuilt, with the changes made
+        # since the snapshot: (item_id, vector) for adds, (item_id, None) for removes
+        self._upgrades: Dict[str, List[Tuple[str, Optional[np.ndarray]]]] = {}
+    
+    def _new_partition(self) -> VectorIndex:
+        if self.backend == "hnsw":
+            return self._new_hnsw()
+        return ExactVectorIndex(self.dimensions, storage=self.storage)
+    
+    def _new_hnsw(self) -> HNSWVectorIndex:
+        storage = "float32" if self.storage == "float32" else "float16"
+        return HNSWVectorIndex(self.dimensions, storage=storage, **{**self.hnsw_options, "auto_rebuild": False})
+    
+    def covers(self, agent_id: Optional[str]) -> bool:
+        """Whether local results are complete for this agent (None = all agents)."""
+        if agent_id is None:
+            return self._all_loaded
+        return self._all_loaded or agent_id in self._loaded_agents
+    
+    def has_vectors(self, agent_id: Optional[str]) -> bool:
+        """Whether any vectors are held for this agent (None = any agent)."""
+        if agent_id is None:
+            return bool(self._records)
+        partition = self._partitions.get(agent_id)
+        return partition is not None and len(partition) > 0
+    
+    def mark_loaded(self, agent_id: Optional[str]) -> None:
+        """Record that a partition (or every partition) mirrors the database."""
+        if agent_id is None:
+            self._all_loaded = True
+        else:
+            self._loaded_agents.add(agent_id)
+    
+    def add(self, record: Dict[str, Any], embedding: Any) -> None:
+        """
+        Add or replace a memory row.
+        
+        Args:
+            record: Row with id, agent_id, content, metadata, created_at
+            embedding: Embedding vector (list, array or pgvector text)
+        """
+        embedding = _parse_embedding(embedding)
+        item_id = record["id"]
+        agent_id = record["agent_id"]
+        
+        previous = self._records.get(item_id)
+        if previous and previous["agent_id"] != agent_id:
+            self.remove(item_id)
+        
+        partition = self._partitions.get(agent_id)
+        if partition is None:
+            partition = self._partitions[agent_id] = self._new_partition()
+        partition.add(item_id, embedding)
+        if agent_id in self._upgrades:
+            self._upgrades[agent_id].append((item_id, embedding))
+        
+        self._records[item_id] = {
+            "id": item_id,
+            "agent_id": agent_id,
+            "content": record.get("content"),
+            "metadata": record.get("metadata") or {},
+            "created_at": record.get("created_at")
+        }
+        
+        if (
+            self.backend == "auto"
+            and isinstance(partition, ExactVectorIndex)
+            and len(partition) >= self.hnsw_threshold
+            and agent_id not in self._upgrades
+        ):
+            self._start_upgrade(agent_id, partition)
+        else:
+            self._maybe_rebuild(agent_id, partition)
+    
+    def _maybe_rebuild(self, agent_id: str, partition: VectorIndex) -> None:
+        """Rebuild an HNSW partition in the background once tombstones outnumber live nodes."""
+        if (
+            isinstance(partition, HNSWVectorIndex)
+            and partition.tombstones > len(partition)
+            and agent_id not in self._upgrades
+        ):
+            self._start_upgrade(agent_id, partition)
+    
+    def _start_upgrade(self, agent_id: str, partition: VectorIndex) -> None:
+        """
+        Build a fresh HNSW graph for a partition without blocking the caller.
+        
+        Used both to convert an exact partition and to rebuild an HNSW one
+        without its tombstones. The graph is built from a snapshot on the
+        default executor; inside an event loop the current partition keeps
+        answering searches until the build finishes. Without a running loop
+        it is built inline.
+        """
+        snapshot = [(item_id, np.array(vector, dtype=np.float32)) for item_id, vector in partition.items()]
+        self._upgrades[agent_id] = []
+        
+        def build() -> HNSWVectorIndex:
+            upgraded = self._new_hnsw()
+            for item_id, vector in snapshot:
+                upgraded.add(item_id, vector)
+            return upgraded
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._finish_upgrade(agent_id, partition, build())
+            return
+        
+        future = loop.run_in_executor(None, build)
+        future.add_done_callback(lambda f: self._on_upgrade_built(agent_id, partition, f))
+    
+    def _on_upgrade_built(self, agent_id: str, partition: VectorIndex, future: "asyncio.Future") -> None:
+        if future.cancelled() or future.exception() is not None:
+            self._upgrades.pop(agent_id, None)
+            logger.error(f"HNSW upgrade for {agent_id} failed: {None if future.cancelled() else future.exception()}")
+            return
+        self._finish_upgrade(agent_id, partition, future.result())
+    
+    def _finish_upgrade(self, agent_id: str, partition: VectorIndex, upgraded: HNSWVectorIndex) -> None:
+        """Replay changes made during the build, then swap the graph in."""
+        changes = self._upgrades.pop(agent_id, [])
+        if self._partitions.get(agent_id) is not partition:
+            return
+        for item_id, vector in changes:
+            if vector is None:
+                upgraded.remove(item_id)
+            else:
+                upgraded.add(item_id, vector)
+        self._partitions[agent_id] = upgraded
+        action = "rebuilt" if isinstance(partition, HNSWVectorIndex) else "upgraded to HNSW"
+        logger.info(f"Vector index for {agent_id} {action} ({len(upgraded)} vectors)")
+    
+    def remove(self, item_id: str) -> bool:
+        """Remove a memory row from its partition."""
+        record = self._records.pop(item_id, None)
+        if record is None:
+            return False
+        partition = self._partitions.get(record["agent_id"])
+        if partition is not None:
+            partition.remove(item_id)
+        if record["agent_id"] in self._upgrades:
+            self._upgrades[record["agent_id"]].append((item_id, None))
+        elif partition is not None:
+            self._maybe_rebuild(record["agent_id"], partition)
+        return True
+    
+    def get_record(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored row fields for an id."""
+        return self._records.get(item_id)
+    
+    def get_vector(self, item_id: str) -> Optional[np.ndarray]:
+        """Return the stored (normalized) vector for an id."""
+        record = self._records.get(item_id)
+        if record is None:
+            return None
+        return self._partitions[record["agent_id"]].get_vector(item_id)
+    
+    def search(
+        self,
+        query_embedding: Any,
+        agent_id: Optional[str] = None,
+        limit: int = 5,
+        threshold: float = 0.7
+    ) -> List[Dict[str, Any]]:
+        """
+        Search one agent's partition, or all partitions when agent_id is None.
+        
+        Returns:
+            Rows shaped like the match RPC results, with a similarity score
+        """
+        if agent_id is not None:
+            partitions = [self._partitions[agent_id]] if agent_id in self._partitions else []
+        else:
+            partitions = list(self._partitions.values())
+        
+        query = _normalize(query_embedding)
+        hits: List[Tuple[str, float]] = []
+        for partition in partitions:
+            hits.extend(partition.search(query, limit, threshold))
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        
+        return [
+            {**self._records[item_id], "similarity": score}
+            for item_id, score in hits[:limit]
+        ]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics for monitoring."""
+        return {
+            "backend": self.backend,
+            "storage": self.storage,
+            "total_vectors": len(self._records),
+            "partitions": {
+                agent_id: {
+                    "type": type(partition).__name__,
+                    "vectors": len(partition),
+                    "loaded": self.covers(agent_id),
+                    "upgrading": agent_id in self._upgrades
+                }
+                for agent_id, partition in self._partitions.items()
+            }
+        }
+
+class TopicClusteringEngine:
+    """
+    Clusters embedding matrices into topic groups.
+    
+    Modes:
+    - "dbscan": exact DBSCAN with cosine distance. Quadratic in time and
+      memory, so only suitable for small corpora.
+    - "minibatch_kmeans": L2-normalizes vectors, fits MiniBatchKMeans on
+      at most `sample_size` rows, then assigns every row to its nearest
+      centroid in chunks. Rows farther than `eps` (cosine distance) from
+      every centroid, and clusters smaller than min_samples, become noise
+      (-1), mirroring DBSCAN's labelling.
+    - "auto": DBSCAN up to `dbscan_max_points` rows, k-means above.
+    
+    Labels are numbered in order of first appearance, like DBSCAN's.
+    
+    Args:
+        mode: Clustering mode ("auto", "dbscan", "minibatch_kmeans")
+        eps: Maximum cosine distance to belong to a cluster
+        dbscan_max_points: Largest corpus "auto" sends to DBSCAN
+        n_clusters: Fixed k for k-means (default: sqrt(n / 2), capped at max_clusters)
+        max_clusters: Upper bound for the automatic k
+        sample_size: Rows used to fit k-means before assigning the rest
+        batch_size: MiniBatchKMeans batch size
+        assign_chunk_size: Rows per chunk when assigning to centroids
+        random_state: Seed for sampling and k-means
+    """
+    
+    MODES = ("auto", "dbscan", "minibatch_kmeans")
+    
+    def __init__(
+        self,
+        mode: str = "auto",
+        eps: float = 0.5,
+        dbscan_max_points: int = 5000,
+        n_clusters: Optional[int] = None,
+        max_clusters: int = 256,
+        sample_size: int = 50000,
+        batch_size: int = 1024,
+        assign_chunk_size: int = 8192,
+        random_state: int = 0
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown clustering mode: {mode}")
+        
+        self.mode = mode
+        self.eps = eps
+        self.dbscan_max_points = dbscan_max_points
+        self.n_clusters = n_clusters
+        self.max_clusters = max_clusters
+        self.sample_size = sample_size
+        self.batch_size = batch_size
+        self.assign_chunk_size = assign_chunk_size
+        self.random_state = random_state
+    
+    def resolve_mode(self, n_points: int) -> str:
+        """Pick the concrete algorithm for a corpus size."""
+        if self.mode != "auto":
+            return self.mode
+        return "dbscan" if n_points <= self.dbscan_max_points else "minibatch_kmeans"
+    
+    def fit_predict(self, X: np.ndarray, min_samples: int) -> np.ndarray:
+        """
+        Cluster rows of X.
+        
+        Args:
+            X: Embedding matrix
+            min_samples: Minimum members for a cluster
+        
+        Returns:
+            Integer label per row, -1 for noise
+        """
+        if self.resolve_mode(len(X)) == "dbscan":
+            clustering = DBSCAN(eps=self.eps, min_samples=min_samples, metric="cosine")
+            return clustering.fit_predict(X)
+        return self._kmeans_labels(X, min_samples)
+    
+    def _kmeans_labels(self, X: np.ndarray, min_samples: int) -> np.ndarray:
+        n_points = len(X)
+        X = np.asarray(X, dtype=np.float32)
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        X = X / np.where(norms > 0, norms, 1.0)
+        
+        k = self.n_clusters or int(np.clip(np.sqrt(n_points / 2), 2, self.max_clusters))
+        k = min(k, n_points)
+        
+        rng = np.random.default_rng(self.random_state)
+        if n_points > self.sample_size:
+            sample = X[rng.choice(n_points, self.sample_size, replace=False)]
+        else:
+            sample = X
+        
+        kmeans = MiniBatchKMeans(
+            n_clusters=k,
+            batch_size=self.batch_size,
+            random_state=self.random_state,
+            n_init=3
+        ).fit(sample)
+        
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        centroid_norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(centroid_norms > 0, centroid_norms, 1.0)
+        
+        labels = np.empty(n_points, dtype=np.int64)
+        for start in range(0, n_points, self.assign_chunk_size):
+            sims = X[start:start + self.assign_chunk_size] @ centroids.T
+            best = sims.argmax(axis=1)
+            close = sims[np.arange(len(best)), best] >= 1.0 - self.eps
+            labels[start:start + len(best)] = np.where(close, best, -1)
+        
+        # Small clusters are noise, as with DBSCAN's core-point rule
+        counts = np.bincount(labels[labels >= 0], minlength=k)
+        labels[(labels >= 0) & (counts[np.maximum(labels, 0)] < min_samples)] = -1
+        
+        # Renumber clusters by first appearance
+        clustered = labels >= 0
+        kept, first_seen = np.unique(labels[clustered], return_index=True)
+        remap = np.full(k, -1, dtype=np.int64)
+        remap[kept[np.argsort(first_seen)]] = np.arange(len(kept))
+        labels[clustered] = remap[labels[clustered]]
+        return labels
+
+
 class ArcaneaKnowledgeBase:
     """
     Production-ready knowledge management system for Arcanea agents.
@@ -109,8 +1354,11 @@ class ArcaneaKnowledgeBase:
     Features:
     - Persistent storage via Supabase with pgvector
     - OpenAI embeddings for semantic search
-    - Vector similarity search
-    - Pattern extraction (temporal and topical)
+    - Micro-batched embedding requests for bulk ingest
+    - Content-addressed embedding cache (LRU memory + disk tiers)
+    - Compact embeddings (float32 arrays, base64 transport, optional float16/int8 storage)
+    - Vector similarity search (pgvector or a local exact/HNSW index)
+    - Pattern extraction (temporal and topical, DBSCAN or scalable k-means)
     - Knowledge sharing between agents
     - Async/await throughout
     
@@ -132,7 +1380,17 @@ class ArcaneaKnowledgeBase:
         supabase_client: SupabaseClient, 
         openai_api_key: str,
         embedding_model: str = "text-embedding-3-small",
-        embedding_dimensions: int = 1536
+        embedding_dimensions: int = 1536,
+        embedding_batch_size: int = 256,
+        embedding_linger_ms: float = 10.0,
+        embedding_cache_size: int = 10000,
+        embedding_cache_path: Optional[str] = None,
+        embedding_storage: str = "float32",
+        vector_index_backend: Optional[str] = None,
+        hnsw_threshold: int = 10000,
+        clustering_mode: str = "auto",
+        stats_cache_ttl: float = 30.0,
+        db_concurrency: int = 16
     ):
         """
         Initialize the knowledge base.
@@ -142,37 +1400,123 @@ class ArcaneaKnowledgeBase:
             openai_api_key: OpenAI API key for embeddings
             embedding_model: OpenAI embedding model to use
             embedding_dimensions: Expected embedding dimensions
+            embedding_batch_size: Maximum inputs per embeddings request
+            embedding_linger_ms: Time to wait for more inputs before sending a batch
+            embedding_cache_size: Embeddings kept in the in-memory LRU (0 disables it)
+            embedding_cache_path: Optional directory for the persistent embedding cache
+            embedding_storage: Local vector precision ("float32", "float16", "int8");
+                the cache keeps float16 for int8 since cached vectors are written back
+            vector_index_backend: Local search backend ("exact", "hnsw", "auto"),
+                or None to always search through the Supabase RPCs
+            hnsw_threshold: Partition size at which the "auto" backend switches to HNSW
+            clustering_mode: Topic clustering algorithm ("auto", "dbscan", "minibatch_kmeans")
+            stats_cache_ttl: Seconds to cache get_agent_stats results (0 disables caching)
+            db_concurrency: Maximum Supabase requests in flight at once
         """
         self.supabase = supabase_client
         self.openai = AsyncOpenAI(api_key=openai_api_key)
         self.embedding_model = embedding_model
         self.embedding_dimensions = embedding_dimensions
+        self._embedding_batcher = EmbeddingBatcher(
+            self.openai,
+            model=embedding_model,
+            dimensions=embedding_dimensions,
+            max_batch_size=embedding_batch_size,
+            linger_ms=embedding_linger_ms
+        )
+        self._embedding_cache: Optional[EmbeddingCache] = None
+        if embedding_cache_size > 0 or embedding_cache_path:
+            self._embedding_cache = EmbeddingCache(
+                dimensions=embedding_dimensions,
+                max_entries=embedding_cache_size,
+                disk_path=embedding_cache_path,
+                storage="float32" if embedding_storage == "float32" else "float16"
+            )
+        self._vector_index: Optional[PartitionedVectorIndex] = None
+        if vector_index_backend:
+            self._vector_index = PartitionedVectorIndex(
+                dimensions=embedding_dimensions,
+                backend=vector_index_backend,
+                hnsw_threshold=hnsw_threshold,
+                storage=embedding_storage
+            )
+        self._clustering = TopicClusteringEngine(mode=clustering_mode)
+        self._pattern_states: Dict[str, PatternState] = {}
+        self.stats_cache_ttl = stats_cache_ttl
+        self._stats_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._stats_rpc_available = True
+        # supabase-py is synchronous: run requests on a bounded pool of
+        # threads sharing the client's HTTP connection pool, so concurrent
+        # callers overlap their round trips instead of blocking the loop
+        self._db_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=db_concurrency,
+            thread_name_prefix="arcanea-db"
+        )
         
         logger.info("🔮 Arcanea Knowledge Base initialized")
     
-    async def _generate_embedding(self, text: str) -> List[float]:
+    async def _execute(self, query: Any) -> Any:
+        """
+        Execute a Supabase query or RPC builder without blocking the event loop.
+        
+        Args:
+            query: Any builder with a synchronous execute()
+        
+        Returns:
+            The builder's APIResponse
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, query.execute)
+    
+    def close(self) -> None:
+        """Shut down the database thread pool."""
+        self._db_executor.shutdown(wait=True)
+    
+    async def _generate_embedding(self, text: str) -> np.ndarray:
         """
         Generate vector embedding for text using OpenAI.
         
+        Identical (model, dimensions, text) requests are served from the
+        embedding cache; misses are coalesced by the embedding batcher into
+        multi-input requests.
+        
         Args:
             text: Text to embed
             
         Returns:
-            List of floats (embedding vector)
+            Embedding vector (float32 array)
             
         Raises:
             Exception: If OpenAI API call fails
         """
+        cache_key = None
+        if self._embedding_cache is not None:
+            cache_key = EmbeddingCache.make_key(self.embedding_model, self.embedding_dimensions, text)
+            cached = self._embedding_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            response = await self.openai.embeddings.create(
-                model=self.embedding_model,
-                input=text,
-                dimensions=self.embedding_dimensions
-            )
-            return response.data[0].embedding
+            embedding = await self._embedding_batcher.embed(text)
         except Exception as e:
             logger.error(f"Failed to generate embedding: {e}")
             raise
+        
+        if cache_key is not None:
+            self._embedding_cache.put(cache_key, embedding)
+        return embedding
+    
+    def get_embedding_stats(self) -> Dict[str, Any]:
+        """
+        Get embedding batcher and cache statistics.
+        
+        Returns:
+            Dict with batching and cache hit/miss/eviction counters
+        """
+        return {
+            "batcher": self._embedding_batcher.get_stats(),
+            "cache": self._embedding_cache.get_stats() if self._embedding_cache else None
+        }
     
     async def store_knowledge(
         self, 
@@ -187,7 +1531,7 @@ class ArcaneaKnowledgeBase:
         Args:
             agent_id: Agent identifier (e.g., "dragon-forge")
             content: Knowledge content text
-            metadata: Optional metadata dict
+            metadata: Optional metadata dict (`content_hash` is added)
             user_id: Optional user identifier for multi-tenant support
             
         Returns:
@@ -206,7 +1550,7 @@ class ArcaneaKnowledgeBase:
                 agent_id=agent_id,
                 content=content,
                 embedding=embedding,
-                metadata=metadata or {},
+                metadata={**(metadata or {}), "content_hash": content_hash(content)},
                 timestamp=datetime.now().isoformat()
             )
             
@@ -216,14 +1560,16 @@ class ArcaneaKnowledgeBase:
                 "user_id": user_id,
                 "agent_id": entry.agent_id,
                 "content": entry.content,
-                "embedding": embedding,
+                "embedding": to_pgvector(embedding),
                 "metadata": entry.metadata,
                 "created_at": entry.timestamp
             }
             
-            result = self.supabase.table("agent_memories").insert(data).execute()
+            result = await self._execute(self.supabase.table("agent_memories").insert(data))
             
             if result.data:
+                self._index_row(data, embedding)
+                self._invalidate_stats(agent_id)
                 logger.info(f"✓ Knowledge stored: {entry.id[:8]}... for agent {agent_id}")
                 return entry
             else:
@@ -233,6 +1579,153 @@ class ArcaneaKnowledgeBase:
             logger.error(f"Failed to store knowledge: {e}")
             raise
     
+    async def store_knowledge_batch(
+        self,
+        agent_id: str,
+        contents: List[str],
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+        user_id: Optional[str] = None,
+        insert_batch_size: int = 500
+    ) -> List[KnowledgeEntry]:
+        """
+        Store many knowledge entries with batched embeddings and inserts.
+        
+        All embeddings are requested concurrently so the embedding batcher
+        packs them into a handful of multi-input requests, and rows are
+        written with multi-row inserts of up to `insert_batch_size`.
+        
+        The batch is not atomic: chunks are inserted one after another, so
+        when a later chunk fails the earlier ones stay written and are
+        reported through `PartialBatchError.stored`.
+        
+        Args:
+            agent_id: Agent identifier (e.g., "dragon-forge")
+            contents: Knowledge content texts
+            metadata: Optional metadata dicts, aligned with `contents` (`content_hash` is added)
+            user_id: Optional user identifier for multi-tenant support
+            insert_batch_size: Maximum rows per insert request
+        
+        Returns:
+            KnowledgeEntry list in the same order as `contents`
+        
+        Raises:
+            ValueError: If `metadata` is not aligned with `contents`
+            PartialBatchError: If an insert fails after earlier chunks were stored
+            Exception: If embedding generation or the first insert fails
+        """
+        if metadata is not None and len(metadata) != len(contents):
+            raise ValueError("metadata must have the same length as contents")
+        
+        if not contents:
+            return []
+        
+        try:
+            # Fan out through the batcher; each call gets its own future
+            embeddings = await asyncio.gather(
+                *(self._generate_embedding(content) for content in contents)
+            )
+            
+            entries = []
+            rows = []
+            for i, (content, embedding) in enumerate(zip(contents, embeddings)):
+                entry = KnowledgeEntry(
+                    id=str(uuid.uuid4()),
+                    agent_id=agent_id,
+                    content=content,
+                    embedding=embedding,
+                    metadata={**((metadata[i] if metadata else None) or {}), "content_hash": content_hash(content)},
+                    timestamp=datetime.now().isoformat()
+                )
+                entries.append(entry)
+                rows.append({
+                    "id": entry.id,
+                    "user_id": user_id,
+                    "agent_id": entry.agent_id,
+                    "content": entry.content,
+                    "embedding": to_pgvector(embedding),
+                    "metadata": entry.metadata,
+                    "created_at": entry.timestamp
+                })
+            
+            for start in range(0, len(rows), insert_batch_size):
+                chunk = rows[start:start + insert_batch_size]
+                try:
+                    result = await self._execute(self.supabase.table("agent_memories").insert(chunk))
+                    if not result.data:
+                        raise Exception(f"Failed to insert knowledge batch at offset {start}")
+                except Exception as e:
+                    if start == 0:
+                        raise
+                    raise PartialBatchError(
+                        f"Knowledge batch stored {start} of {len(rows)} entries: {e}",
+                        stored=entries[:start]
+                    ) from e
+                self._invalidate_stats(agent_id)
+                for row, entry in zip(chunk, entries[start:start + insert_batch_size]):
+                    self._index_row(row, entry.embedding)
+            
+            logger.info(f"✓ Knowledge batch stored: {len(entries)} entries for agent {agent_id}")
+            return entries
+        
+        except Exception as e:
+            logger.error(f"Failed to store knowledge batch: {e}")
+            raise
+    
+    async def get_content_hashes(self, agent_id: str, page_size: int = 1000) -> Set[str]:
+        """
+        Collect the content hashes already stored for an agent.
+        
+        Args:
+            agent_id: Agent identifier
+            page_size: Rows per request
+        
+        Returns:
+            Set of hex digests (see `content_hash`)
+        """
+        rows = await self.get_metadata_values(agent_id, ["content_hash"], page_size)
+        return {row["content_hash"] for row in rows if row["content_hash"]}
+    
+    async def get_metadata_values(
+        self,
+        agent_id: str,
+        keys: List[str],
+        page_size: int = 1000
+    ) -> List[Dict[str, Optional[str]]]:
+        """
+        Read selected metadata fields of every row stored for an agent.
+        
+        Reads only `metadata->>key` for each key with keyset pagination,
+        so migrations can tell which memories are already persisted
+        without transferring content or embeddings.
+        
+        Args:
+            agent_id: Agent identifier
+            keys: Metadata keys to read (plain identifiers)
+            page_size: Rows per request
+        
+        Returns:
+            One dict per row mapping each key to its text value, or None
+        """
+        columns = ", ".join(f"{key}:metadata->>{key}" for key in keys)
+        values: List[Dict[str, Optional[str]]] = []
+        last_id = None
+        
+        while True:
+            query = self.supabase.table("agent_memories")\
+                .select(f"id, {columns}")\
+                .eq("agent_id", agent_id)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = (await self._execute(query.order("id").limit(page_size))).data or []
+            
+            values.extend({key: row.get(key) for key in keys} for row in rows)
+            
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1]["id"]
+        
+        return values
+    
     async def search_knowledge(
         self, 
         query: str, 
@@ -243,59 +1736,139 @@ class ArcaneaKnowledgeBase:
         """
         Search knowledge using semantic similarity.
         
-        Uses pgvector for efficient vector similarity search.
+        Uses pgvector for efficient vector similarity search, or the local
+        vector index when it has been loaded for the requested agent. If the
+        RPC fails, whatever the local index holds is returned instead.
+        
+        Args:
+            query: Search query text
+            agent_id: Optional agent filter
+            limit: Maximum results to return
+            threshold: Similarity threshold (0.0 to 1.0)
+            
+        Returns:
+            List of matching knowledge entries with similarity scores
+            
+        Raises:
+            Exception: If search fails
+        """
+        try:
+            # Generate query embedding
+            query_embedding = await self._generate_embedding(query)
+            
+            # Serve from the local index when it mirrors the database
+            if self._vector_index and self._vector_index.covers(agent_id):
+                return self._vector_index.search(query_embedding, agent_id, limit, threshold)
+            
+            try:
+                return await self._match_memories(query_embedding, agent_id, limit, threshold)
+            except Exception as e:
+                if self._vector_index and self._vector_index.has_vectors(agent_id):
+                    logger.warning(f"Vector search RPC failed ({e}), using partial local index")
+                    return self._vector_index.search(query_embedding, agent_id, limit, threshold)
+                raise
+                
+        except Exception as e:
+            logger.error(f"Failed to search knowledge: {e}")
+            raise
+    
+    async def _match_memories(
+        self,
+        query_embedding: np.ndarray,
+        agent_id: Optional[str],
+        limit: int,
+        threshold: float
+    ) -> List[Dict[str, Any]]:
+        """Run the pgvector match RPC for one agent or across all agents."""
+        if agent_id:
+            result = await self._execute(self.supabase.rpc(
+                "match_agent_memories",
+                {
+                    "query_embedding": to_pgvector(query_embedding),
+                    "match_threshold": threshold,
+                    "match_count": limit,
+                    "agent_filter": agent_id
+                }
+            ))
+        else:
+            result = await self._execute(self.supabase.rpc(
+                "match_memories",
+                {
+                    "query_embedding": to_pgvector(query_embedding),
+                    "match_threshold": threshold,
+                    "match_count": limit
+                }
+            ))
+        
+        if result.data:
+            logger.info(f"✓ Found {len(result.data)} matches for query")
+            return result.data
+        return []
+    
+    def _index_row(self, row: Dict[str, Any], embedding: Any) -> None:
+        """Mirror a stored row into the local vector index, if enabled."""
+        if self._vector_index is not None and embedding is not None:
+            self._vector_index.add(row, embedding)
+    
+    async def load_vector_index(
+        self,
+        agent_id: Optional[str] = None,
+        page_size: int = 1000
+    ) -> int:
+        """
+        Populate the local vector index from Supabase.
+        
+        Pages through `agent_memories` by id so each request stays small.
+        Once loaded, searches for that agent (or all agents when agent_id
+        is None) are answered locally; later stores and deletes keep the
+        index in sync.
         
         Args:
-            query: Search query text
-            agent_id: Optional agent filter
-            limit: Maximum results to return
-            threshold: Similarity threshold (0.0 to 1.0)
-            
+            agent_id: Agent partition to load, or None for every agent
+            page_size: Rows per request
+        
         Returns:
-            List of matching knowledge entries with similarity scores
-            
+            Number of vectors loaded
+        
         Raises:
-            Exception: If search fails
+            ValueError: If no vector index backend is configured
         """
-        try:
-            # Generate query embedding
-            query_embedding = await self._generate_embedding(query)
-            
-            # Call appropriate Supabase function
+        if self._vector_index is None:
+            raise ValueError("No vector index backend configured")
+        
+        loaded = 0
+        last_id = None
+        
+        while True:
+            query = self.supabase.table("agent_memories")\
+                .select("id, agent_id, content, metadata, created_at, embedding, embedding_ref")
             if agent_id:
-                result = self.supabase.rpc(
-                    "match_agent_memories",
-                    {
-                        "query_embedding": query_embedding,
-                        "match_threshold": threshold,
-                        "match_count": limit,
-                        "agent_filter": agent_id
-                    }
-                ).execute()
-            else:
-                result = self.supabase.rpc(
-                    "match_memories",
-                    {
-                        "query_embedding": query_embedding,
-                        "match_threshold": threshold,
-                        "match_count": limit
-                    }
-                ).execute()
-            
-            if result.data:
-                logger.info(f"✓ Found {len(result.data)} matches for query")
-                return result.data
-            else:
-                return []
-                
-        except Exception as e:
-            logger.error(f"Failed to search knowledge: {e}")
-            raise
+                query = query.eq("agent_id", agent_id)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            result = await self._execute(query.order("id").limit(page_size))
+            
+            rows = await self._resolve_embeddings(result.data or [])
+            for row in rows:
+                embedding = _parse_embedding(row.get("embedding"))
+                if embedding is not None and embedding.shape == (self.embedding_dimensions,):
+                    self._vector_index.add(row, embedding)
+                    loaded += 1
+            
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1]["id"]
+        
+        self._vector_index.mark_loaded(agent_id)
+        logger.info(f"✓ Vector index loaded: {loaded} vectors for {agent_id or 'all agents'}")
+        return loaded
     
     async def extract_patterns(
         self, 
         agent_id: Optional[str] = None,
-        min_samples: int = 3
+        min_samples: int = 3,
+        streaming: bool = False,
+        page_size: int = 1000
     ) -> List[Pattern]:
         """
         Extract patterns from knowledge using temporal and topical analysis.
@@ -307,23 +1880,28 @@ class ArcaneaKnowledgeBase:
         Args:
             agent_id: Optional agent to analyze (None for all agents)
             min_samples: Minimum samples for DBSCAN clustering
+            streaming: Page through the table instead of loading every row at once
+            page_size: Rows per page in streaming mode
             
         Returns:
             List of recognized Pattern objects
         """
+        if streaming:
+            return await self._extract_patterns_streaming(agent_id, min_samples, page_size)
+        
         patterns = []
         
         try:
             # Fetch knowledge entries
             if agent_id:
-                result = self.supabase.table("agent_memories")\
+                query = self.supabase.table("agent_memories")\
                     .select("*")\
-                    .eq("agent_id", agent_id)\
-                    .execute()
+                    .eq("agent_id", agent_id)
+                result = await self._execute(query)
             else:
-                result = self.supabase.table("agent_memories")\
-                    .select("*")\
-                    .execute()
+                query = self.supabase.table("agent_memories")\
+                    .select("*")
+                result = await self._execute(query)
             
             if not result.data or len(result.data) < min_samples:
                 logger.info("Insufficient data for pattern extraction")
@@ -346,6 +1924,373 @@ class ArcaneaKnowledgeBase:
             logger.error(f"Failed to extract patterns: {e}")
             return []
     
+    async def _extract_patterns_streaming(
+        self,
+        agent_id: Optional[str],
+        min_samples: int,
+        page_size: int
+    ) -> List[Pattern]:
+        """
+        Extract patterns with bounded memory.
+        
+        Args:
+            agent_id: Optional agent to analyze (None for all agents)
+            min_samples: Minimum samples for clustering
+            page_size: Rows per request
+        
+        Returns:
+            List of recognized Pattern objects
+        """
+        patterns = []
+        
+        try:
+            inputs = await self._stream_pattern_inputs(agent_id, page_size, min_samples)
+            if inputs is None:
+                logger.info("Insufficient data for pattern extraction")
+                return patterns
+            
+            patterns.extend(self._temporal_patterns_from_counts(inputs.hour_counts))
+            patterns.extend(self._topical_patterns_from_matrix(inputs.matrix, inputs.entries, min_samples))
+            
+            logger.info(f"✓ Extracted {len(patterns)} patterns (streamed)")
+            return patterns
+        
+        except Exception as e:
+            logger.error(f"Failed to extract patterns: {e}")
+            return []
+    
+    async def _stream_pattern_inputs(
+        self,
+        agent_id: Optional[str],
+        page_size: int,
+        min_samples: int = 0
+    ) -> Optional[PatternInputs]:
+        """
+        Stream the inputs for pattern analysis.
+        
+        Pages through `agent_memories` with keyset pagination on id and
+        selects only the fields the analyses use (tags and category are
+        projected out of metadata server-side). Hour counts are updated
+        per page, and embeddings are decoded straight into a preallocated
+        float32 matrix, so peak memory is one page of rows plus the matrix.
+        Rows shared by reference take the embedding of the row they point at.
+        
+        Args:
+            agent_id: Optional agent to analyze (None for all agents)
+            page_size: Rows per request
+            min_samples: Return None when fewer rows than this exist
+        
+        Returns:
+            PatternInputs, or None if there is too little data
+        """
+        # Size the embedding matrix up front from an exact count
+        count_query = self.supabase.table("agent_memories").select("id", count="exact")
+        if agent_id:
+            count_query = count_query.eq("agent_id", agent_id)
+        expected = (await self._execute(count_query.limit(1))).count or 0
+        
+        if expected < max(min_samples, 1):
+            return None
+        
+        inputs = PatternInputs(
+            hour_counts=Counter(),
+            matrix=np.empty((expected, self.embedding_dimensions), dtype=np.float32),
+            entries=[]
+        )
+        last_id = None
+        
+        while True:
+            query = self.supabase.table("agent_memories")\
+                .select("id, created_at, content, tags:metadata->tags, category:metadata->>category, embedding, embedding_ref")
+            if agent_id:
+                query = query.eq("agent_id", agent_id)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = (await self._execute(query.order("id").limit(page_size))).data or []
+            await self._resolve_embeddings(rows)
+            
+            inputs.hour_counts.update(self._hours_from_entries(rows))
+            inputs.advance_watermark(rows)
+            
+            for row in rows:
+                embedding = self._clusterable_embedding(row)
+                if embedding is None:
+                    continue
+                count = len(inputs.entries)
+                if count == inputs.matrix.shape[0]:
+                    # Rows were added since the count; grow rather than drop them
+                    inputs.matrix = np.resize(inputs.matrix, (max(16, count * 3 // 2), self.embedding_dimensions))
+                inputs.matrix[count] = embedding
+                inputs.entries.append({
+                    "content": (row.get("content") or "")[:100],
+                    "metadata": {"tags": row.get("tags") or [], "category": row.get("category") or ""}
+                })
+            
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1]["id"]
+        
+        inputs.matrix = inputs.matrix[:len(inputs.entries)]
+        return inputs
+    
+    # ===== INCREMENTAL PATTERN MAINTENANCE =====
+    
+    async def refresh_patterns(
+        self,
+        agent_id: Optional[str] = None,
+        min_samples: int = 3,
+        drift_ratio: float = 0.2,
+        max_state_age_hours: float = 24.0,
+        page_size: int = 1000
+    ) -> List[Pattern]:
+        """
+        Return patterns from persisted state, updated with rows added since the last run.
+        
+        The first call (and any call once the state drifts or ages out)
+        does a full streaming recompute. Other calls only fetch rows newer
+        than the stored watermark: hours go into the histogram, and each
+        embedding joins its nearest centroid (running mean) or is counted
+        as noise.
+        
+        Args:
+            agent_id: Optional agent to analyze (None for all agents)
+            min_samples: Minimum members for a topic cluster
+            drift_ratio: Recompute fully once incremental rows exceed this share of the corpus
+            max_state_age_hours: Recompute fully when the last full run is older than this
+            page_size: Rows per request
+        
+        Returns:
+            List of recognized Pattern objects
+        """
+        scope = agent_id or PatternState.ALL_AGENTS
+        
+        try:
+            state = self._pattern_states.get(scope) or await self._load_pattern_state(scope)
+            
+            if state is None or state.needs_full_recompute(drift_ratio, max_state_age_hours):
+                state = await self._recompute_pattern_state(agent_id, min_samples, page_size)
+                if state is None:
+                    logger.info("Insufficient data for pattern extraction")
+                    return []
+            else:
+                applied = await self._apply_new_rows(state, agent_id, page_size)
+                logger.info(f"✓ Pattern state for {scope} updated with {applied} new entries")
+            
+            self._pattern_states[scope] = state
+            await self._save_pattern_state(state)
+            return self._patterns_from_state(state, min_samples)
+        
+        except Exception as e:
+            logger.error(f"Failed to refresh patterns: {e}")
+            return []
+    
+    async def _recompute_pattern_state(
+        self,
+        agent_id: Optional[str],
+        min_samples: int,
+        page_size: int
+    ) -> Optional[PatternState]:
+        """Rebuild pattern state from a full streaming pass."""
+        inputs = await self._stream_pattern_inputs(agent_id, page_size, min_samples)
+        if inputs is None:
+            return None
+        
+        state = PatternState(
+            scope=agent_id or PatternState.ALL_AGENTS,
+            hour_counts=dict(inputs.hour_counts),
+            total_entries=sum(inputs.hour_counts.values()),
+            watermark=inputs.watermark,
+            watermark_ids=sorted(inputs.watermark_ids),
+            last_full_recompute=datetime.now().isoformat(),
+            corpus_at_full=len(inputs.entries)
+        )
+        
+        if len(inputs.entries) < min_samples:
+            # Too few to cluster: every clusterable entry is unassigned
+            state.noise_count = len(inputs.entries)
+        else:
+            X = inputs.matrix
+            norms = np.linalg.norm(X, axis=1, keepdims=True)
+            X = X / np.where(norms > 0, norms, 1.0)
+            labels = self._clustering.fit_predict(X, min_samples)
+            
+            state.noise_count = int(np.count_nonzero(labels == -1))
+            for cluster_id in range(int(labels.max()) + 1 if len(labels) else 0):
+                members = np.flatnonzero(labels == cluster_id)
+                tags: Counter = Counter()
+                for i in members:
+                    tags.update(self._entry_tags(inputs.entries[i]))
+                state.centroids.append(X[members].mean(axis=0).tolist())
+                state.member_counts.append(len(members))
+                state.tag_counts.append(dict(tags))
+                state.representatives.append(inputs.entries[members[0]]["content"][:100])
+        
+        logger.info(f"✓ Pattern state for {state.scope} recomputed ({len(inputs.entries)} entries)")
+        return state
+    
+    async def _apply_new_rows(
+        self,
+        state: PatternState,
+        agent_id: Optional[str],
+        page_size: int
+    ) -> int:
+        """
+        Fold rows newer than the watermark into the state.
+        
+        Pages on a (created_at, id) keyset so that any number of rows
+        sharing one timestamp are consumed in order instead of stalling
+        the cursor.
+        """
+        centroids = np.array(state.centroids, dtype=np.float32).reshape(-1, self.embedding_dimensions)
+        centroid_norms = np.linalg.norm(centroids, axis=1)
+        applied = 0
+        
+        while True:
+            query = self.supabase.table("agent_memories")\
+                .select("id, created_at, content, tags:metadata->tags, category:metadata->>category, embedding, embedding_ref")
+            if agent_id:
+                query = query.eq("agent_id", agent_id)
+            if state.watermark and state.watermark_ids:
+                last_id = max(state.watermark_ids)
+                query = query.or_(
+                    f'created_at.gt."{state.watermark}",'
+                    f'and(created_at.eq."{state.watermark}",id.gt.{last_id})'
+                )
+            elif state.watermark:
+                query = query.gt("created_at", state.watermark)
+            rows = (await self._execute(query.order("created_at").order("id").limit(page_size))).data or []
+            if not rows:
+                break
+            await self._resolve_embeddings(rows)
+            
+            for row in rows:
+                for hour in self._hours_from_entries([row]):
+                    state.hour_counts[hour] = state.hour_counts.get(hour, 0) + 1
+                    state.total_entries += 1
+                state.rows_since_full += 1
+                applied += 1
+                
+                embedding = self._clusterable_embedding(row)
+                if embedding is None:
+                    continue
+                if not len(centroids):
+                    state.noise_count += 1
+                    continue
+                
+                norm = float(np.linalg.norm(embedding))
+                vector = embedding / norm if norm > 0 else embedding
+                sims = (centroids @ vector) / np.where(centroid_norms > 0, centroid_norms, 1.0)
+                best = int(sims.argmax())
+                if sims[best] < 1.0 - self._clustering.eps:
+                    state.noise_count += 1
+                    continue
+                
+                # Running mean keeps the centroid exact for its members so far
+                state.member_counts[best] += 1
+                centroids[best] += (vector - centroids[best]) / state.member_counts[best]
+                centroid_norms[best] = np.linalg.norm(centroids[best])
+                tags = state.tag_counts[best]
+                for tag in self._entry_tags({"metadata": {"tags": row.get("tags") or [], "category": row.get("category") or ""}}):
+                    tags[tag] = tags.get(tag, 0) + 1
+            
+            state.advance_watermark(rows)
+            if len(rows) < page_size:
+                break
+        
+        state.centroids = centroids.tolist()
+        return applied
+    
+    def _clusterable_embedding(self, row: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        A row's embedding if it can take part in clustering, else None.
+        
+        Both the full and the incremental pattern paths use this, so rows
+        without a usable vector are left out of clustering and noise alike.
+        """
+        embedding = _parse_embedding(row.get("embedding"))
+        if embedding is None or embedding.shape != (self.embedding_dimensions,):
+            return None
+        return embedding
+    
+    def _entry_tags(self, entry: Dict[str, Any]) -> List[str]:
+        """Tags plus category, as used for topic labels."""
+        metadata = entry.get("metadata", {})
+        labels = []
+        if isinstance(metadata, dict):
+            tags = metadata.get("tags", [])
+            category = metadata.get("category", "")
+            if tags:
+                labels.extend(tags)
+            if category:
+                labels.append(category)
+        return labels
+    
+    def _patterns_from_state(self, state: PatternState, min_samples: int) -> List[Pattern]:
+        """Render persisted state in the same Pattern shape as extract_patterns."""
+        patterns = self._temporal_patterns_from_counts(Counter(state.hour_counts))
+        
+        for cluster_id, size in enumerate(state.member_counts):
+            if size < min_samples:
+                continue
+            top_tags = [t for t, c in Counter(state.tag_counts[cluster_id]).most_common(3)]
+            patterns.append(Pattern(
+                type="topical",
+                description=f"Topic cluster {cluster_id + 1}: {', '.join(top_tags) if top_tags else 'general knowledge'} ({size} items)",
+                confidence=min(0.6 + (size / 50), 0.95),
+                data={
+                    "cluster_id": cluster_id,
+                    "size": size,
+                    "top_tags": top_tags,
+                    "representative_content": state.representatives[cluster_id]
+                }
+            ))
+        
+        if state.noise_count > 0:
+            patterns.append(Pattern(
+                type="topical",
+                description=f"{state.noise_count} unique/isolated knowledge entries (no cluster)",
+                confidence=0.7,
+                data={"unclustered_count": state.noise_count}
+            ))
+        
+        return patterns
+    
+    async def _load_pattern_state(self, scope: str) -> Optional[PatternState]:
+        """Load persisted pattern state, if any."""
+        try:
+            query = self.supabase.table("agent_pattern_state")\
+                .select("state")\
+                .eq("scope", scope)\
+                .limit(1)
+            result = await self._execute(query)
+            if result.data:
+                return PatternState.from_dict(result.data[0]["state"])
+        except Exception as e:
+            logger.warning(f"Could not load pattern state for {scope}: {e}")
+        return None
+    
+    async def _save_pattern_state(self, state: PatternState) -> None:
+        """Persist pattern state; failures keep the in-memory copy only."""
+        try:
+            await self._execute(self.supabase.table("agent_pattern_state").upsert({
+                "scope": state.scope,
+                "state": state.to_dict(),
+                "updated_at": datetime.now().isoformat()
+            }, on_conflict="scope"))
+        except Exception as e:
+            logger.warning(f"Could not persist pattern state for {state.scope}: {e}")
+    
+    def _hours_from_entries(self, entries: List[Dict[str, Any]]) -> List[int]:
+        """Parse created_at hours, skipping rows with unreadable timestamps."""
+        hours = []
+        for entry in entries:
+            try:
+                ts = datetime.fromisoformat(entry["created_at"].replace("Z", "+00:00"))
+                hours.append(ts.hour)
+            except:
+                continue
+        return hours
+    
     async def _extract_temporal_patterns(
         self, 
         entries: List[Dict[str, Any]]
@@ -361,37 +2306,39 @@ class ArcaneaKnowledgeBase:
         Args:
             entries: Knowledge entries with created_at timestamps
             
+        Returns:
+            List of temporal Pattern objects
+        """
+        return self._temporal_patterns_from_counts(Counter(self._hours_from_entries(entries)))
+    
+    def _temporal_patterns_from_counts(self, hour_counts: Counter) -> List[Pattern]:
+        """
+        Build temporal patterns from an hour-of-day histogram.
+        
+        Args:
+            hour_counts: Counter of entries per creation hour
+        
         Returns:
             List of temporal Pattern objects
         """
         patterns = []
         
         try:
-            # Parse timestamps and extract hours
-            hours = []
-            for entry in entries:
-                try:
-                    ts = datetime.fromisoformat(entry["created_at"].replace("Z", "+00:00"))
-                    hours.append(ts.hour)
-                except:
-                    continue
-            
-            if not hours:
+            total = sum(hour_counts.values())
+            if not total:
                 return patterns
             
             # Find peak hours (hours with most activity)
-            from collections import Counter
-            hour_counts = Counter(hours)
             peak_hours = [h for h, c in hour_counts.most_common(3)]
             
             if peak_hours:
                 pattern = Pattern(
                     type="temporal",
                     description=f"Peak activity hours: {', '.join([f'{h}:00' for h in sorted(peak_hours)])}",
-                    confidence=min(0.5 + (len(hours) / 100), 0.95),
+                    confidence=min(0.5 + (total / 100), 0.95),
                     data={
                         "peak_hours": peak_hours,
-                        "total_entries": len(hours),
+                        "total_entries": total,
                         "hour_distribution": dict(hour_counts)
                     }
                 )
@@ -409,7 +2356,7 @@ class ArcaneaKnowledgeBase:
         min_samples: int = 3
     ) -> List[Pattern]:
         """
-        Extract topical patterns using DBSCAN clustering on embeddings.
+        Extract topical patterns by clustering embeddings.
         
         Groups similar knowledge entries into topic clusters.
         
@@ -420,8 +2367,6 @@ class ArcaneaKnowledgeBase:
         Returns:
             List of topical Pattern objects
         """
-        patterns = []
-        
         try:
             # Extract embeddings
             embeddings = []
@@ -429,26 +2374,56 @@ class ArcaneaKnowledgeBase:
             
             for entry in entries:
                 if entry.get("embedding"):
-                    embeddings.append(entry["embedding"])
+                    embeddings.append(_parse_embedding(entry["embedding"]))
                     valid_entries.append(entry)
             
             if len(embeddings) < min_samples:
-                return patterns
+                return []
             
             # Convert to numpy array
-            X = np.array(embeddings)
+            return self._topical_patterns_from_matrix(np.array(embeddings), valid_entries, min_samples)
+        
+        except Exception as e:
+            logger.error(f"Topical pattern extraction failed: {e}")
+            return []
+    
+    def _topical_patterns_from_matrix(
+        self,
+        X: np.ndarray,
+        valid_entries: List[Dict[str, Any]],
+        min_samples: int = 3
+    ) -> List[Pattern]:
+        """
+        Cluster an embedding matrix into topical patterns.
+        
+        Args:
+            X: Embedding matrix, one row per entry in `valid_entries`
+            valid_entries: Entries with `content` and `metadata` (tags, category)
+            min_samples: Minimum members for a topic cluster
+        
+        Returns:
+            List of topical Pattern objects
+        """
+        patterns = []
+        
+        try:
+            if len(valid_entries) < min_samples:
+                return patterns
             
-            # DBSCAN clustering
-            clustering = DBSCAN(eps=0.5, min_samples=min_samples, metric="cosine")
-            labels = clustering.fit_predict(X)
+            # DBSCAN for small corpora, sampled mini-batch k-means for large ones
+            labels = self._clustering.fit_predict(X, min_samples)
             
             # Analyze clusters
-            n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
+            n_clusters = int(labels.max()) + 1 if len(labels) else 0
             
             if n_clusters > 0:
+                # Group member indices per cluster in one pass
+                order = np.argsort(labels, kind="stable")
+                bounds = np.searchsorted(labels[order], np.arange(n_clusters + 1))
+                
                 # Find cluster centers and representative content
                 for cluster_id in range(n_clusters):
-                    cluster_indices = np.where(labels == cluster_id)[0]
+                    cluster_indices = order[bounds[cluster_id]:bounds[cluster_id + 1]]
                     cluster_size = len(cluster_indices)
                     
                     if cluster_size >= min_samples:
@@ -467,7 +2442,6 @@ class ArcaneaKnowledgeBase:
                                 if category:
                                     all_tags.append(category)
                         
-                        from collections import Counter
                         tag_counts = Counter(all_tags)
                         top_tags = [t for t, c in tag_counts.most_common(3)]
                         
@@ -485,7 +2459,7 @@ class ArcaneaKnowledgeBase:
                         patterns.append(pattern)
             
             # Add noise pattern if significant
-            noise_count = list(labels).count(-1)
+            noise_count = int(np.count_nonzero(labels == -1))
             if noise_count > 0:
                 pattern = Pattern(
                     type="topical",
@@ -511,7 +2485,8 @@ class ArcaneaKnowledgeBase:
         Share knowledge from one agent to others.
         
         Creates copies of the knowledge entry for each target agent
-        with attribution metadata.
+        with attribution metadata. See share_knowledge_bulk for
+        per-target results and reference rows.
         
         Args:
             from_agent: Source agent ID
@@ -521,70 +2496,159 @@ class ArcaneaKnowledgeBase:
         Returns:
             True if successful, False otherwise
         """
+        results = await self.share_knowledge_bulk(from_agent, to_agents, knowledge_id)
+        return any(results.values())
+    
+    async def share_knowledge_bulk(
+        self,
+        from_agent: str,
+        to_agents: List[str],
+        knowledge_id: str,
+        by_reference: bool = False
+    ) -> Dict[str, bool]:
+        """
+        Share knowledge to many agents with a single multi-row insert.
+        
+        With by_reference=True the shared rows store no embedding of
+        their own; `embedding_ref` points at the row holding the vector
+        and the match functions resolve it, so a broadcast adds no extra
+        vector storage. Sharing a shared row references its source, never
+        a chain.
+        
+        If the bulk insert fails, rows are retried one by one so the
+        result still says which targets succeeded.
+        
+        Args:
+            from_agent: Source agent ID
+            to_agents: List of target agent IDs
+            knowledge_id: ID of knowledge to share
+            by_reference: Point at the original embedding instead of copying it
+        
+        Returns:
+            Dict mapping each target agent to whether its row was written
+        """
+        results = {target_agent: False for target_agent in to_agents}
+        if not to_agents:
+            return results
+        
         try:
             # Fetch original knowledge
-            result = self.supabase.table("agent_memories")\
+            query = self.supabase.table("agent_memories")\
                 .select("*")\
                 .eq("id", knowledge_id)\
-                .eq("agent_id", from_agent)\
-                .execute()
+                .eq("agent_id", from_agent)
+            result = await self._execute(query)
             
             if not result.data:
                 logger.warning(f"Knowledge {knowledge_id} not found for agent {from_agent}")
-                return False
+                return results
             
             original = result.data[0]
-            
-            # Share to each agent
-            shared_count = 0
-            for target_agent in to_agents:
-                try:
-                    # Create shared copy
-                    shared_data = {
-                        "id": str(uuid.uuid4()),
-                        "agent_id": target_agent,
-                        "content": f"[Shared from {from_agent}] {original['content']}",
-                        "embedding": original["embedding"],
-                        "metadata": {
-                            **original.get("metadata", {}),
-                            "shared_from": from_agent,
-                            "original_id": knowledge_id,
-                            "shared_at": datetime.now().isoformat(),
-                            "is_shared": True
-                        },
-                        "created_at": datetime.now().isoformat()
-                    }
-                    
-                    self.supabase.table("agent_memories").insert(shared_data).execute()
-                    shared_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"Failed to share to {target_agent}: {e}")
-                    continue
-            
-            logger.info(f"✓ Knowledge shared: {knowledge_id[:8]}... to {shared_count} agents")
-            return shared_count > 0
-            
+            if not by_reference:
+                # A shared-by-reference original has no vector of its own
+                await self._resolve_embeddings([original])
+        
         except Exception as e:
             logger.error(f"Knowledge sharing failed: {e}")
-            return False
+            return results
+        
+        embedding_ref = original.get("embedding_ref") or original["id"]
+        shared_at = datetime.now().isoformat()
+        rows = []
+        content = f"[Shared from {from_agent}] {original['content']}"
+        for target_agent in results:
+            row = {
+                "id": str(uuid.uuid4()),
+                "agent_id": target_agent,
+                "content": content,
+                "metadata": {
+                    **original.get("metadata", {}),
+                    "content_hash": content_hash(content),
+                    "shared_from": from_agent,
+                    "original_id": knowledge_id,
+                    "shared_at": shared_at,
+                    "is_shared": True
+                },
+                "created_at": shared_at
+            }
+            if by_reference or original.get("embedding") is None:
+                row["embedding_ref"] = embedding_ref
+            else:
+                row["embedding"] = original["embedding"]
+            rows.append(row)
+        
+        try:
+            await self._execute(self.supabase.table("agent_memories").insert(rows))
+            written = rows
+        except Exception as e:
+            logger.warning(f"Bulk share failed ({e}); retrying per target")
+            written = []
+            for row in rows:
+                try:
+                    await self._execute(self.supabase.table("agent_memories").insert(row))
+                    written.append(row)
+                except Exception as e:
+                    logger.error(f"Failed to share to {row['agent_id']}: {e}")
+        
+        if written and self._vector_index is not None:
+            embedding = original.get("embedding")
+            if embedding is None:
+                embedding = (await self._resolve_embeddings([original]))[0].get("embedding")
+            for row in written:
+                self._index_row(row, embedding)
+        
+        for row in written:
+            results[row["agent_id"]] = True
+            self._invalidate_stats(row["agent_id"])
+        
+        logger.info(f"✓ Knowledge shared: {knowledge_id[:8]}... to {len(written)} agents")
+        return results
+    
+    async def _resolve_embeddings(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fill in embeddings for reference rows from the rows they point at.
+        
+        Rows are updated in place with one lookup for the whole batch.
+        """
+        refs = {row["embedding_ref"] for row in rows if row.get("embedding") is None and row.get("embedding_ref")}
+        if not refs:
+            return rows
+        
+        query = self.supabase.table("agent_memories")\
+            .select("id, embedding")\
+            .in_("id", list(refs))
+        result = await self._execute(query)
+        embeddings = {source["id"]: source.get("embedding") for source in result.data or []}
+        
+        for row in rows:
+            if row.get("embedding") is None and row.get("embedding_ref"):
+                row["embedding"] = embeddings.get(row["embedding_ref"])
+        return rows
     
     async def get_agent_stats(self, agent_id: str) -> Dict[str, Any]:
         """
         Get comprehensive statistics for an agent's knowledge.
         
+        Counts are aggregated server-side by the `agent_memory_stats`
+        RPC when it is installed, otherwise from a narrow projection of
+        category, is_shared and created_at. Embeddings are never
+        transferred. Results are cached for `stats_cache_ttl` seconds
+        and invalidated when the agent's knowledge changes.
+        
         Returns:
             Dict with memory count, categories, temporal distribution, etc.
         """
+        cached = self._stats_cache.get(agent_id)
+        if cached and cached[0] > time.monotonic():
+            return copy.deepcopy(cached[1])
+        
         try:
-            # Get all entries for agent
-            result = self.supabase.table("agent_memories")\
-                .select("*")\
-                .eq("agent_id", agent_id)\
-                .execute()
+            aggregate = await self._aggregate_stats_rpc(agent_id)
+            if aggregate is None:
+                aggregate = await self._aggregate_stats_projection(agent_id)
             
-            if not result.data:
-                return {
+            if not aggregate["total_memories"]:
+                stats = {
                     "agent_id": agent_id,
                     "total_memories": 0,
                     "knowledge_categories": [],
@@ -592,44 +2656,97 @@ class ArcaneaKnowledgeBase:
                     "latest_memory": None,
                     "first_memory": None
                 }
+            else:
+                first = aggregate["first_memory"]
+                latest = aggregate["latest_memory"]
+                stats = {
+                    "agent_id": agent_id,
+                    "total_memories": aggregate["total_memories"],
+                    "knowledge_categories": aggregate["knowledge_categories"],
+                    "shared_memories": aggregate["shared_memories"],
+                    "latest_memory": latest,
+                    "first_memory": first,
+                    "activity_span_days": self._calculate_days_between(
+                        first, latest
+                    ) if aggregate["total_memories"] > 1 else 0
+                }
             
-            entries = result.data
-            
-            # Count categories
-            categories = {}
-            shared_count = 0
-            timestamps = []
-            
-            for entry in entries:
-                metadata = entry.get("metadata", {})
-                if isinstance(metadata, dict):
-                    category = metadata.get("category", "uncategorized")
-                    categories[category] = categories.get(category, 0) + 1
-                    
-                    if metadata.get("is_shared"):
-                        shared_count += 1
-                
-                timestamps.append(entry.get("created_at"))
-            
-            # Sort timestamps
-            timestamps.sort()
-            
-            return {
-                "agent_id": agent_id,
-                "total_memories": len(entries),
-                "knowledge_categories": categories,
-                "shared_memories": shared_count,
-                "latest_memory": timestamps[-1] if timestamps else None,
-                "first_memory": timestamps[0] if timestamps else None,
-                "activity_span_days": self._calculate_days_between(
-                    timestamps[0], timestamps[-1]
-                ) if len(timestamps) > 1 else 0
-            }
+            if self.stats_cache_ttl > 0:
+                self._stats_cache[agent_id] = (time.monotonic() + self.stats_cache_ttl, stats)
+            # Callers get their own copy; nested dicts must not alias the cache
+            return copy.deepcopy(stats)
             
         except Exception as e:
             logger.error(f"Failed to get agent stats: {e}")
             return {"agent_id": agent_id, "error": str(e)}
     
+    async def _aggregate_stats_rpc(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Aggregate stats in Postgres; None if the RPC is unavailable."""
+        if not self._stats_rpc_available:
+            return None
+        
+        try:
+            result = await self._execute(self.supabase.rpc("agent_memory_stats", {"agent_filter": agent_id}))
+            return result.data
+        except Exception as e:
+            if _is_missing_function(e):
+                # Not installed on this database; stop asking
+                logger.warning(f"agent_memory_stats RPC unavailable, using projection: {e}")
+                self._stats_rpc_available = False
+            else:
+                # Transient failure; fall back this once and retry the RPC next time
+                logger.warning(f"agent_memory_stats RPC failed, using projection: {e}")
+            return None
+    
+    async def _aggregate_stats_projection(self, agent_id: str, page_size: int = 1000) -> Dict[str, Any]:
+        """Aggregate stats client-side from a narrow, keyset-paginated projection."""
+        categories: Dict[str, int] = {}
+        shared_count = 0
+        total = 0
+        first = latest = None
+        last_id = None
+        
+        while True:
+            query = self.supabase.table("agent_memories")\
+                .select("id, created_at, category:metadata->>category, is_shared:metadata->is_shared")\
+                .eq("agent_id", agent_id)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = (await self._execute(query.order("id").limit(page_size))).data or []
+            
+            for row in rows:
+                total += 1
+                category = row.get("category") or "uncategorized"
+                categories[category] = categories.get(category, 0) + 1
+                if row.get("is_shared"):
+                    shared_count += 1
+                
+                created_at = row.get("created_at")
+                if created_at:
+                    if first is None or created_at < first:
+                        first = created_at
+                    if latest is None or created_at > latest:
+                        latest = created_at
+            
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1]["id"]
+        
+        return {
+            "total_memories": total,
+            "knowledge_categories": categories,
+            "shared_memories": shared_count,
+            "first_memory": first,
+            "latest_memory": latest
+        }
+    
+    def _invalidate_stats(self, agent_id: Optional[str] = None) -> None:
+        """Drop cached stats for an agent, or for every agent."""
+        if agent_id is None:
+            self._stats_cache.clear()
+        else:
+            self._stats_cache.pop(agent_id, None)
+    
     def _calculate_days_between(self, start: str, end: str) -> int:
         """Calculate days between two ISO timestamps"""
         try:
@@ -657,21 +2774,33 @@ class ArcaneaKnowledgeBase:
             List of similar knowledge entries
         """
         try:
+            # Answer locally when the reference row's partition is loaded
+            if self._vector_index:
+                record = self._vector_index.get_record(knowledge_id)
+                if record and self._vector_index.covers(record["agent_id"]):
+                    similar = self._vector_index.search(
+                        self._vector_index.get_vector(knowledge_id),
+                        record["agent_id"],
+                        limit + 1,
+                        threshold
+                    )
+                    return [s for s in similar if s.get("id") != knowledge_id][:limit]
+            
             # Get reference embedding
-            result = self.supabase.table("agent_memories")\
-                .select("embedding, agent_id")\
-                .eq("id", knowledge_id)\
-                .execute()
+            query = self.supabase.table("agent_memories")\
+                .select("embedding, embedding_ref, agent_id")\
+                .eq("id", knowledge_id)
+            result = await self._execute(query)
             
             if not result.data:
                 return []
             
-            reference = result.data[0]
+            reference = (await self._resolve_embeddings(result.data))[0]
             query_embedding = reference["embedding"]
             agent_id = reference.get("agent_id")
             
             # Find similar entries
-            similar = self.supabase.rpc(
+            similar = await self._execute(self.supabase.rpc(
                 "match_agent_memories",
                 {
                     "query_embedding": query_embedding,
@@ -679,7 +2808,7 @@ class ArcaneaKnowledgeBase:
                     "match_count": limit + 1,  # +1 to exclude self
                     "agent_filter": agent_id
                 }
-            ).execute()
+            ))
             
             if similar.data:
                 # Filter out the reference entry
@@ -695,6 +2824,10 @@ class ArcaneaKnowledgeBase:
         """
         Delete a knowledge entry.
         
+        Rows shared by reference to this entry get a copy of its embedding
+        first, so deleting an original never takes its shares with it. If
+        that copy fails the entry is not deleted.
+        
         Args:
             knowledge_id: ID of knowledge to delete
             
@@ -702,10 +2835,17 @@ class ArcaneaKnowledgeBase:
             True if successful
         """
         try:
-            self.supabase.table("agent_memories")\
+            await self._materialize_references(knowledge_id)
+            
+            query = self.supabase.table("agent_memories")\
                 .delete()\
-                .eq("id", knowledge_id)\
-                .execute()
+                .eq("id", knowledge_id)
+            await self._execute(query)
+            
+            if self._vector_index:
+                self._vector_index.remove(knowledge_id)
+            # The owning agent isn't known here
+            self._invalidate_stats()
             
             logger.info(f"✓ Knowledge deleted: {knowledge_id[:8]}...")
             return True
@@ -714,6 +2854,19 @@ class ArcaneaKnowledgeBase:
             logger.error(f"Failed to delete knowledge: {e}")
             return False
     
+    async def _materialize_references(self, knowledge_id: str) -> None:
+        """Copy an entry's embedding into the rows that reference it."""
+        result = await self._execute(
+            self.supabase.table("agent_memories").select("embedding").eq("id", knowledge_id)
+        )
+        if not result.data or result.data[0].get("embedding") is None:
+            return
+        
+        query = self.supabase.table("agent_memories")\
+            .update({"embedding": result.data[0]["embedding"], "embedding_ref": None})\
+            .eq("embedding_ref", knowledge_id)
+        await self._execute(query)
+    
     async def update_knowledge_metadata(
         self, 
         knowledge_id: str, 
@@ -731,10 +2884,10 @@ class ArcaneaKnowledgeBase:
         """
         try:
             # Get current metadata
-            result = self.supabase.table("agent_memories")\
+            query = self.supabase.table("agent_memories")\
                 .select("metadata")\
-                .eq("id", knowledge_id)\
-                .execute()
+                .eq("id", knowledge_id)
+            result = await self._execute(query)
             
             if not result.data:
                 return False
@@ -747,10 +2900,10 @@ class ArcaneaKnowledgeBase:
             updated_metadata = {**current_metadata, **metadata_updates}
             
             # Update
-            self.supabase.table("agent_memories")\
+            query = self.supabase.table("agent_memories")\
                 .update({"metadata": updated_metadata})\
-                .eq("id", knowledge_id)\
-                .execute()
+                .eq("id", knowledge_id)
+            await self._execute(query)
             
             logger.info(f"✓ Knowledge metadata updated: {knowledge_id[:8]}...")
             return True
@@ -776,15 +2929,43 @@ CREATE TABLE IF NOT EXISTS agent_memories (
     agent_id VARCHAR(255) NOT NULL,
     content TEXT NOT NULL,
     embedding VECTOR(1536),
+    embedding_ref UUID,
     metadata JSONB DEFAULT '{}',
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Shared rows may point at the original's embedding instead of copying it.
+-- Deleting the original never deletes its shares: the trigger below copies
+-- the vector into them first, and SET NULL covers anything it misses.
+ALTER TABLE agent_memories ADD COLUMN IF NOT EXISTS embedding_ref UUID;
+ALTER TABLE agent_memories DROP CONSTRAINT IF EXISTS agent_memories_embedding_ref_fkey;
+ALTER TABLE agent_memories ADD CONSTRAINT agent_memories_embedding_ref_fkey
+    FOREIGN KEY (embedding_ref) REFERENCES agent_memories(id) ON DELETE SET NULL;
+
+CREATE OR REPLACE FUNCTION materialize_embedding_refs()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE agent_memories
+    SET embedding = OLD.embedding, embedding_ref = NULL
+    WHERE embedding_ref = OLD.id;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS agent_memories_materialize_refs ON agent_memories;
+CREATE TRIGGER agent_memories_materialize_refs
+    BEFORE DELETE ON agent_memories
+    FOR EACH ROW EXECUTE FUNCTION materialize_embedding_refs();
+
 -- Create indexes for performance
 CREATE INDEX IF NOT EXISTS idx_agent_memories_agent_id ON agent_memories(agent_id);
 CREATE INDEX IF NOT EXISTS idx_agent_memories_user_id ON agent_memories(user_id);
 CREATE INDEX IF NOT EXISTS idx_agent_memories_created_at ON agent_memories(created_at);
 CREATE INDEX IF NOT EXISTS idx_agent_memories_metadata ON agent_memories USING GIN(metadata);
+CREATE INDEX IF NOT EXISTS idx_agent_memories_embedding_ref ON agent_memories(embedding_ref);
+CREATE INDEX IF NOT EXISTS idx_agent_memories_content_hash ON agent_memories(agent_id, (metadata->>'content_hash'));
 
 -- Create vector similarity search function (agent-specific)
 CREATE OR REPLACE FUNCTION match_agent_memories(
@@ -804,17 +2985,18 @@ RETURNS TABLE(
 LANGUAGE SQL STABLE
 AS $$
     SELECT
-        id,
-        agent_id,
-        content,
-        metadata,
-        created_at,
-        1 - (embedding <=> query_embedding) AS similarity
-    FROM agent_memories
+        m.id,
+        m.agent_id,
+        m.content,
+        m.metadata,
+        m.created_at,
+        1 - (COALESCE(m.embedding, src.embedding) <=> query_embedding) AS similarity
+    FROM agent_memories m
+    LEFT JOIN agent_memories src ON src.id = m.embedding_ref
     WHERE 
-        agent_id = agent_filter
-        AND 1 - (embedding <=> query_embedding) > match_threshold
-    ORDER BY embedding <=> query_embedding
+        m.agent_id = agent_filter
+        AND 1 - (COALESCE(m.embedding, src.embedding) <=> query_embedding) > match_threshold
+    ORDER BY COALESCE(m.embedding, src.embedding) <=> query_embedding
     LIMIT match_count;
 $$;
 
@@ -835,18 +3017,52 @@ RETURNS TABLE(
 LANGUAGE SQL STABLE
 AS $$
     SELECT
-        id,
-        agent_id,
-        content,
-        metadata,
-        created_at,
-        1 - (embedding <=> query_embedding) AS similarity
-    FROM agent_memories
-    WHERE 1 - (embedding <=> query_embedding) > match_threshold
-    ORDER BY embedding <=> query_embedding
+        m.id,
+        m.agent_id,
+        m.content,
+        m.metadata,
+        m.created_at,
+        1 - (COALESCE(m.embedding, src.embedding) <=> query_embedding) AS similarity
+    FROM agent_memories m
+    LEFT JOIN agent_memories src ON src.id = m.embedding_ref
+    WHERE 1 - (COALESCE(m.embedding, src.embedding) <=> query_embedding) > match_threshold
+    ORDER BY COALESCE(m.embedding, src.embedding) <=> query_embedding
     LIMIT match_count;
 $$;
 
+-- Aggregated per-agent stats (no embeddings leave the database)
+CREATE OR REPLACE FUNCTION agent_memory_stats(
+    agent_filter VARCHAR(255)
+)
+RETURNS JSONB
+LANGUAGE SQL STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'total_memories', COUNT(*),
+        'knowledge_categories', COALESCE((
+            SELECT jsonb_object_agg(category, n)
+            FROM (
+                SELECT COALESCE(metadata->>'category', 'uncategorized') AS category, COUNT(*) AS n
+                FROM agent_memories
+                WHERE agent_id = agent_filter
+                GROUP BY 1
+            ) c
+        ), '{}'::jsonb),
+        'shared_memories', COUNT(*) FILTER (WHERE (metadata->>'is_shared')::boolean),
+        'first_memory', MIN(created_at),
+        'latest_memory', MAX(created_at)
+    )
+    FROM agent_memories
+    WHERE agent_id = agent_filter;
+$$;
+
+-- Incremental pattern state (one row per agent, '*' for all agents)
+CREATE TABLE IF NOT EXISTS agent_pattern_state (
+    scope VARCHAR(255) PRIMARY KEY,
+    state JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Enable Row Level Security
 ALTER TABLE agent_memories ENABLE ROW LEVEL SECURITY;
 
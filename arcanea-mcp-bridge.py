@@ -197,19 +197,19 @@ class ArcaneaAgentMCP:
         self.invocation_count = 0
         
     async def invoke_with_mcp(self, task: str, tools: List[str]) -> Dict[str, Any]:
-        """Invoke agent with MCP tool augmentation"""
-        results = {}
-        
-        for tool in tools:
-            request = MCPRequest(
+        """Invoke agent with MCP tool augmentation (tools run concurrently)"""
+        requests = [
+            MCPRequest(
                 tool=tool,
                 parameters={"task": task, "agent_id": self.agent_id},
                 context={"source": "arcanea_agent", "agent": self.agent_id}
             )
-            
-            response = await self.bridge.invoke_tool(request)
-            results[tool] = asdict(response)
-            self.invocation_count += 1
+            for tool in tools
+        ]
+        
+        responses = await asyncio.gather(*(self.bridge.invoke_tool(request) for request in requests))
+        results = {tool: asdict(response) for tool, response in zip(tools, responses)}
+        self.invocation_count += len(requests)
         
         return {
             "agent": self.agent_id,
@@ -13,9 +13,13 @@ License: MIT
 Features:
     - Async HTTP client with httpx
     - Connection pooling for optimal performance
-    - Circuit breaker pattern (5 failures = open circuit)
-    - Exponential backoff retry (3 attempts, 4-10s delays)
-    - Request caching for idempotent operations
+    - Per-tool circuit breakers on sliding-window failure and slow-call rates
+    - Per-tool bulkheads with priority queues
+    - Concurrent or batched multi-tool invocation (invoke_many)
+    - Opt-in hedged requests for read-only, latency-critical tools
+    - Exponential backoff retry (configurable, bounded by per-call deadlines)
+    - Bounded LRU request caching for idempotent operations
+    - Single-flight coalescing of identical concurrent requests
     - Health check monitoring
     - Graceful degradation with fallbacks
     - Comprehensive logging with structured output
@@ -39,19 +43,21 @@ Usage:
 """
 
 import asyncio
+import heapq
 import json
 import logging
 import time
+from collections import OrderedDict, deque
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Set, TypeVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, TypeVar
 from functools import wraps
 
 import httpx
 from tenacity import (
-    retry,
+    AsyncRetrying,
     retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
@@ -77,6 +83,13 @@ class CircuitState(Enum):
     HALF_OPEN = "half_open"  # Testing if service recovered
 
 
+class RequestPriority(Enum):
+    """Queue order for tool calls waiting on a bulkhead (lower goes first)."""
+    INTERACTIVE = 0  # A user is waiting on the result
+    NORMAL = 1
+    BATCH = 2        # Background work that can wait
+
+
 @dataclass
 class MCPConfig:
     """
@@ -90,21 +103,77 @@ class MCPConfig:
         api_key: Authentication key for MCP server
         timeout: HTTP request timeout in seconds (default: 30)
         max_retries: Number of retry attempts (default: 3)
+        retry_wait_multiplier: Exponential backoff multiplier (default: 2)
+        retry_wait_min: Shortest wait between attempts in seconds (default: 4)
+        retry_wait_max: Longest wait between attempts in seconds (default: 10)
+        default_timeout_budget: Overall seconds per tool call, including
+            queueing and retries; None for no deadline (default: None)
+        deadline_header: Header carrying the remaining budget in ms
         cache_ttl: Cache time-to-live in seconds (default: 3600)
-        circuit_breaker_threshold: Failures before opening circuit (default: 5)
+        cache_max_entries: Most responses kept in the cache (default: 1024)
+        cache_max_bytes: Most serialized response bytes kept (default: 32 MiB)
+        cache_sweep_interval: Seconds between expired-entry sweeps (default: 60)
+        circuit_breaker_threshold: Calls in the window before a circuit
+            may open (default: 5)
         circuit_breaker_recovery: Seconds before half-open test (default: 30)
+        circuit_breaker_window: Recent calls per circuit the rates cover (default: 20)
+        circuit_breaker_failure_rate: Failure fraction that opens a circuit (default: 0.5)
+        circuit_breaker_slow_call_rate: Slow-call fraction that opens a circuit (default: 1.0)
+        circuit_breaker_slow_call_duration: Seconds after which a call is slow (default: 10)
+        circuit_breaker_half_open_probes: Probe calls admitted while half-open (default: 1)
         max_connections: Connection pool size (default: 10)
         keepalive_expiry: Keep-alive connection expiry in seconds (default: 5)
+        tool_concurrency: Per-tool concurrent call limits, overriding the default
+        default_tool_concurrency: Concurrent calls allowed per tool (default: 4)
+        batch_endpoint: Server endpoint accepting batched tool calls, if any
+            (e.g. "/tools/batch"); invoke_many falls back to concurrent calls
+        max_batch_concurrency: Concurrent calls per invoke_many (default: 8)
+        hedged_tools: Read-only tools whose slow calls get a second, racing copy
+        hedge_percentile: Recent-latency percentile after which to hedge (default: 95)
+        hedge_budget_percent: Most extra requests hedging may add, as a
+            percentage of hedged-tool calls (default: 5)
+        hedge_burst: Most hedges that budget saved up while calls were fast
+            may release back to back (default: 5)
+        latency_window: Latency samples kept per endpoint (default: 200)
+        hedge_min_samples: Samples needed before hedging starts (default: 20)
+        coalesce_requests: Share one in-flight call between identical
+            concurrent requests (default: True)
+        idempotent_tools: Tools whose invocations may be coalesced like GETs
     """
     base_url: str
     api_key: str
     timeout: float = 30.0
     max_retries: int = 3
+    retry_wait_multiplier: float = 2.0
+    retry_wait_min: float = 4.0
+    retry_wait_max: float = 10.0
+    default_timeout_budget: Optional[float] = None
+    deadline_header: str = "X-Request-Deadline-Ms"
     cache_ttl: int = 3600
+    cache_max_entries: int = 1024
+    cache_max_bytes: int = 32 * 1024 * 1024
+    cache_sweep_interval: float = 60.0
     circuit_breaker_threshold: int = 5
     circuit_breaker_recovery: int = 30
+    circuit_breaker_window: int = 20
+    circuit_breaker_failure_rate: float = 0.5
+    circuit_breaker_slow_call_rate: float = 1.0
+    circuit_breaker_slow_call_duration: float = 10.0
+    circuit_breaker_half_open_probes: int = 1
     max_connections: int = 10
     keepalive_expiry: float = 5.0
+    tool_concurrency: Dict[str, int] = field(default_factory=dict)
+    default_tool_concurrency: int = 4
+    batch_endpoint: Optional[str] = None
+    max_batch_concurrency: int = 8
+    hedged_tools: Set[str] = field(default_factory=set)
+    hedge_percentile: float = 95.0
+    hedge_budget_percent: float = 5.0
+    hedge_burst: int = 5
+    latency_window: int = 200
+    hedge_min_samples: int = 20
+    coalesce_requests: bool = True
+    idempotent_tools: Set[str] = field(default_factory=set)
     
     def __post_init__(self):
         """Validate configuration on initialization."""
@@ -116,14 +185,21 @@ class MCPConfig:
             raise ValueError("timeout must be positive")
         if self.max_retries < 0:
             raise ValueError("max_retries must be non-negative")
+        if self.retry_wait_min < 0 or self.retry_wait_max < self.retry_wait_min:
+            raise ValueError("retry waits must satisfy 0 <= retry_wait_min <= retry_wait_max")
+        if self.default_timeout_budget is not None and self.default_timeout_budget <= 0:
+            raise ValueError("default_timeout_budget must be positive")
+        if self.hedge_burst < 1:
+            raise ValueError("hedge_burst must be at least 1")
 
 
 @dataclass
 class CacheEntry:
     """Cache entry with metadata for TTL management."""
     data: Any
-    timestamp: datetime
+    expires_at: float  # time.monotonic() deadline
     hits: int = 0
+    size: int = 0
 
 
 # ============================================================================
@@ -134,27 +210,50 @@ class CircuitBreaker:
     """
     Production-grade circuit breaker pattern implementation.
     
-    Automatically opens after threshold failures, rejects requests while open,
-    and periodically tests recovery in half-open state.
+    Tracks the outcome of the last `window_size` calls and opens when,
+    with at least `threshold` calls recorded, the failure rate or the
+    slow-call rate reaches its limit. While open it rejects requests;
+    after `recovery_time` it goes HALF_OPEN and admits at most
+    `half_open_probes` concurrent probe calls. The circuit closes once
+    that many probes succeed, and reopens on a failed or slow probe.
     
     Args:
-        threshold: Number of failures before opening circuit
+        threshold: Minimum calls in the window before rates are evaluated
         recovery_time: Seconds to wait before testing recovery
         name: Identifier for logging
+        window_size: Number of recent calls the rates are computed over
+        failure_rate_threshold: Failure fraction that opens the circuit
+        slow_call_rate_threshold: Slow-call fraction that opens the circuit
+        slow_call_duration: Seconds after which a call counts as slow
+        half_open_probes: Probe calls admitted while HALF_OPEN
     """
     
     def __init__(
         self,
         threshold: int = 5,
         recovery_time: int = 30,
-        name: str = "default"
+        name: str = "default",
+        window_size: int = 20,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 1.0,
+        slow_call_duration: float = 10.0,
+        half_open_probes: int = 1
     ):
         self.threshold = threshold
         self.recovery_time = recovery_time
         self.name = name
+        self.window_size = window_size
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.half_open_probes = half_open_probes
         self.state = CircuitState.CLOSED
         self.failure_count = 0
         self.last_failure_time: Optional[float] = None
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)  # (failed, slow)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._rejected = 0
         self._lock = asyncio.Lock()
         
     async def call(self, func: Callable, *args, **kwargs) -> Any:
@@ -169,52 +268,120 @@ class CircuitBreaker:
             Function result
             
         Raises:
-            CircuitBreakerOpenError: If circuit is open
+            CircuitBreakerOpenError: If circuit is open, or HALF_OPEN with
+                every probe slot taken
+            DeadlineExceededError: Passed through without being recorded;
+                the caller's budget ran out, not the service
             Exception: Original exception from function
         """
         async with self._lock:
             if self.state == CircuitState.OPEN:
                 if await self._should_attempt_reset():
                     self.state = CircuitState.HALF_OPEN
+                    self._probes_in_flight = 0
+                    self._probe_successes = 0
                     logger.info(f"Circuit {self.name}: Entering HALF_OPEN state")
                 else:
+                    self._rejected += 1
                     raise CircuitBreakerOpenError(
                         f"Circuit {self.name} is OPEN - rejecting request"
                     )
+            
+            probe = self.state == CircuitState.HALF_OPEN
+            if probe:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self._rejected += 1
+                    raise CircuitBreakerOpenError(
+                        f"Circuit {self.name} is HALF_OPEN - probe limit reached"
+                    )
+                self._probes_in_flight += 1
         
+        start = time.monotonic()
+        recorded = False
         try:
             result = await func(*args, **kwargs)
-            await self._on_success()
+            recorded = True
+            await self._on_success(time.monotonic() - start, probe)
             return result
+        except DeadlineExceededError:
+            raise
         except Exception as e:
-            await self._on_failure()
+            recorded = True
+            await self._on_failure(probe)
             raise
+        finally:
+            if probe and not recorded:
+                # Cancelled or out-of-budget probe: free the slot without judging the service
+                self._probes_in_flight -= 1
+    
+    async def record(self, success: bool, duration: float) -> None:
+        """Record an outcome observed outside `call` (e.g. one item of a batch) that took `duration` seconds."""
+        if success:
+            await self._on_success(duration)
+        else:
+            await self._on_failure()
     
-    async def _on_success(self) -> None:
+    async def _on_success(self, duration: float, probe: bool = False) -> None:
         """Handle successful execution."""
+        slow = duration >= self.slow_call_duration
         async with self._lock:
-            if self.state == CircuitState.HALF_OPEN:
-                logger.info(f"Circuit {self.name}: Service recovered, CLOSING circuit")
-                self.state = CircuitState.CLOSED
-                self.failure_count = 0
+            if probe:
+                self._probes_in_flight -= 1
+            
+            if self.state == CircuitState.HALF_OPEN and probe:
+                if slow:
+                    logger.warning(f"Circuit {self.name}: Probe was slow ({duration:.1f}s), OPENING circuit")
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    logger.info(f"Circuit {self.name}: Service recovered, CLOSING circuit")
+                    self.state = CircuitState.CLOSED
+                    self.failure_count = 0
+                    self._window.clear()
             else:
                 self.failure_count = 0
+                self._record(False, slow)
     
-    async def _on_failure(self) -> None:
+    async def _on_failure(self, probe: bool = False) -> None:
         """Handle failed execution."""
         async with self._lock:
+            if probe:
+                self._probes_in_flight -= 1
             self.failure_count += 1
             self.last_failure_time = time.time()
             
             if self.state == CircuitState.HALF_OPEN:
                 logger.warning(f"Circuit {self.name}: Recovery failed, OPENING circuit")
-                self.state = CircuitState.OPEN
-            elif self.failure_count >= self.threshold:
-                logger.error(
-                    f"Circuit {self.name}: Threshold reached ({self.threshold}), "
-                    f"OPENING circuit"
-                )
-                self.state = CircuitState.OPEN
+                self._open()
+            else:
+                self._record(True, False)
+    
+    def _record(self, failed: bool, slow: bool) -> None:
+        """Add an outcome to the window and open if a rate limit is hit."""
+        self._window.append((failed, slow))
+        if self.state != CircuitState.CLOSED or len(self._window) < self.threshold:
+            return
+        
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            logger.error(
+                f"Circuit {self.name}: failure rate {failure_rate:.0%}, "
+                f"slow-call rate {slow_rate:.0%} over {len(self._window)} calls, OPENING circuit"
+            )
+            self._open()
+    
+    def _rates(self) -> Tuple[float, float]:
+        if not self._window:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        return failures / len(self._window), slow / len(self._window)
+    
+    def _open(self) -> None:
+        self.state = CircuitState.OPEN
+        self.last_failure_time = time.time()
+        self._window.clear()
     
     async def _should_attempt_reset(self) -> bool:
         """Check if enough time has passed to test recovery."""
@@ -225,42 +392,261 @@ class CircuitBreaker:
     
     def get_state(self) -> Dict[str, Any]:
         """Get current circuit breaker state for monitoring."""
+        failure_rate, slow_rate = self._rates()
         return {
             "name": self.name,
             "state": self.state.value,
             "failure_count": self.failure_count,
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "window_calls": len(self._window),
+            "rejected": self._rejected,
             "last_failure": self.last_failure_time,
             "threshold": self.threshold,
             "recovery_time": self.recovery_time
         }
 
 
+class CircuitBreakerRegistry:
+    """
+    Independent circuit breakers per tool or endpoint.
+    
+    Breakers are created on first use from the client configuration, so
+    a failing tool opens only its own circuit.
+    
+    Args:
+        config: MCPConfig supplying the breaker settings
+    """
+    
+    def __init__(self, config: "MCPConfig"):
+        self.config = config
+        self._breakers: Dict[str, CircuitBreaker] = {}
+    
+    def get(self, name: str) -> CircuitBreaker:
+        """Get the breaker for `name`, creating it if needed."""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(
+                threshold=self.config.circuit_breaker_threshold,
+                recovery_time=self.config.circuit_breaker_recovery,
+                name=name,
+                window_size=self.config.circuit_breaker_window,
+                failure_rate_threshold=self.config.circuit_breaker_failure_rate,
+                slow_call_rate_threshold=self.config.circuit_breaker_slow_call_rate,
+                slow_call_duration=self.config.circuit_breaker_slow_call_duration,
+                half_open_probes=self.config.circuit_breaker_half_open_probes
+            )
+        return breaker
+    
+    def get_states(self) -> Dict[str, Dict[str, Any]]:
+        """Get the state of every breaker for monitoring."""
+        return {name: breaker.get_state() for name, breaker in self._breakers.items()}
+    
+    def open_circuits(self) -> List[str]:
+        """Names of breakers that are not CLOSED."""
+        return [name for name, breaker in self._breakers.items() if breaker.state != CircuitState.CLOSED]
+
+
 class CircuitBreakerOpenError(Exception):
     """Raised when circuit breaker is open and rejecting requests."""
     pass
 
 
+class DeadlineExceededError(Exception):
+    """Raised when a call's timeout budget runs out before or during an attempt."""
+    pass
+
+
+# ============================================================================
+# Bulkhead Implementation
+# ============================================================================
+
+class Bulkhead:
+    """
+    Concurrency limit for one tool, with a priority-ordered wait queue.
+    
+    At most `max_concurrent` calls hold a slot at once; the rest wait in
+    a heap ordered by RequestPriority, then arrival, so interactive calls
+    overtake queued batch work. Keeps a slow tool from occupying the
+    whole connection pool.
+    
+    Args:
+        name: Identifier for logging and stats
+        max_concurrent: Slots available to this tool
+    """
+    
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = 0
+        self._total_calls = 0
+        self._queued_calls = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._max_queue_depth = 0
+    
+    @asynccontextmanager
+    async def slot(self, priority: RequestPriority = RequestPriority.NORMAL):
+        """Hold one of the bulkhead's slots for the duration of the block."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+    
+    async def acquire(self, priority: RequestPriority = RequestPriority.NORMAL) -> None:
+        """Wait for a slot; higher-priority waiters are served first."""
+        self._total_calls += 1
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._waiters, (priority.value, self._sequence, waiter))
+        self._queued_calls += 1
+        self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+        
+        start = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we gave up; pass it on
+                self.release()
+            raise
+        finally:
+            waited = time.monotonic() - start
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+    
+    def release(self) -> None:
+        """Free a slot, handing it straight to the next live waiter."""
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get slot usage, queue depth and wait times for monitoring."""
+        pending = sum(1 for _, _, waiter in self._waiters if not waiter.done())
+        return {
+            "name": self.name,
+            "max_concurrent": self.max_concurrent,
+            "active": self._active,
+            "queue_depth": pending,
+            "max_queue_depth": self._max_queue_depth,
+            "total_calls": self._total_calls,
+            "queued_calls": self._queued_calls,
+            "avg_wait_ms": round(self._total_wait / self._queued_calls * 1000, 2) if self._queued_calls else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 2)
+        }
+
+
+# ============================================================================
+# Latency Tracking
+# ============================================================================
+
+class LatencyTracker:
+    """
+    Recent successful-call latencies per endpoint.
+    
+    Keeps a fixed window of samples per endpoint and answers percentile
+    queries over it; used to decide when a hedged request is due.
+    
+    Args:
+        window_size: Samples kept per endpoint
+        min_samples: Samples needed before percentiles are reported
+    """
+    
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+    
+    def record(self, endpoint: str, seconds: float) -> None:
+        """Add one latency sample for an endpoint."""
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            samples = self._samples[endpoint] = deque(maxlen=self.window_size)
+        samples.append(seconds)
+    
+    def percentile(self, endpoint: str, percentile: float) -> Optional[float]:
+        """Latency in seconds at `percentile` (0-100), or None if too few samples."""
+        samples = self._samples.get(endpoint)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-endpoint sample counts and p50/p95/p99 in ms."""
+        stats = {}
+        for endpoint, samples in self._samples.items():
+            ordered = sorted(samples)
+            
+            def at(p: float) -> float:
+                return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 1)
+            
+            stats[endpoint] = {
+                "samples": len(ordered),
+                "p50_ms": at(50),
+                "p95_ms": at(95),
+                "p99_ms": at(99)
+            }
+        return stats
+
+
 # ============================================================================
 # Cache Implementation
 # ============================================================================
 
 class RequestCache:
     """
-    LRU-style cache for idempotent MCP operations.
+    Bounded LRU cache for idempotent MCP operations.
+    
+    Entries are kept in recency order; when either the entry count or the
+    total serialized size goes over its limit, the least recently used
+    entries are evicted. Expired entries are dropped on read and by a
+    background sweeper, so keys that are never read again don't linger.
     
-    Provides thread-safe caching with automatic TTL expiration
-    and hit rate statistics for monitoring.
+    The cache takes no locks. It is only used from the event loop, and
+    no method awaits between reading and updating its state, so the loop
+    already serializes every read and write. A read is a dict lookup
+    plus a monotonic-clock comparison against the expiry computed at
+    insert.
     
     Args:
         ttl_seconds: Cache entry lifetime in seconds
+        max_entries: Maximum number of cached entries
+        max_bytes: Maximum total size of cached entries (JSON-encoded bytes)
+        sweep_interval: Seconds between background sweeps for expired entries
     """
     
-    def __init__(self, ttl_seconds: int = 3600):
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        sweep_interval: float = 60.0
+    ):
         self.ttl = ttl_seconds
-        self._cache: Dict[str, CacheEntry] = {}
-        self._lock = asyncio.Lock()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
         self._total_requests = 0
         self._cache_hits = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._rejected = 0
         
     async def get(self, key: str) -> Optional[Any]:
         """
@@ -272,36 +658,53 @@ class RequestCache:
         Returns:
             Cached data or None if expired/missing
         """
-        async with self._lock:
-            self._total_requests += 1
-            entry = self._cache.get(key)
-            
-            if entry is None:
-                return None
-            
-            age = (datetime.now() - entry.timestamp).total_seconds()
-            if age > self.ttl:
-                del self._cache[key]
-                return None
-            
-            entry.hits += 1
-            self._cache_hits += 1
-            return entry.data
+        self._total_requests += 1
+        entry = self._cache.get(key)
+        
+        if entry is None:
+            return None
+        
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self._expirations += 1
+            return None
+        
+        self._cache.move_to_end(key)
+        entry.hits += 1
+        self._cache_hits += 1
+        return entry.data
     
     async def set(self, key: str, data: Any) -> None:
         """
-        Store value in cache.
+        Store value in cache, evicting least recently used entries if needed.
+        
+        Values larger than `max_bytes` on their own are not cached.
         
         Args:
             key: Cache key
             data: Data to cache
         """
-        async with self._lock:
-            self._cache[key] = CacheEntry(
-                data=data,
-                timestamp=datetime.now(),
-                hits=0
-            )
+        size = self._estimate_size(data)
+        
+        self._remove(key)
+        if size > self.max_bytes:
+            self._rejected += 1
+            return
+        
+        self._cache[key] = CacheEntry(
+            data=data,
+            expires_at=time.monotonic() + self.ttl,
+            hits=0,
+            size=size
+        )
+        self._bytes += size
+        
+        while len(self._cache) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._cache))
+            self._remove(oldest)
+            self._evictions += 1
+        
+        self._ensure_sweeper()
     
     async def invalidate(self, key: str) -> bool:
         """
@@ -310,16 +713,64 @@ class RequestCache:
         Returns:
             True if key existed and was removed
         """
-        async with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-                return True
-            return False
+        return self._remove(key)
     
     async def clear(self) -> None:
         """Clear all cached entries."""
-        async with self._lock:
-            self._cache.clear()
+        self._cache.clear()
+        self._bytes = 0
+    
+    async def sweep(self) -> int:
+        """
+        Drop every expired entry.
+        
+        Returns:
+            Number of entries removed
+        """
+        now = time.monotonic()
+        expired = [key for key, entry in self._cache.items() if entry.expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self._expirations += len(expired)
+        return len(expired)
+    
+    async def close(self) -> None:
+        """Stop the background sweeper."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+    
+    def _remove(self, key: str) -> bool:
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        return True
+    
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.ensure_future(self._sweep_loop())
+    
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = await self.sweep()
+                if removed:
+                    logger.debug(f"Cache sweep removed {removed} expired entries")
+            except Exception as e:
+                logger.warning(f"Cache sweep failed: {e}")
+    
+    @staticmethod
+    def _estimate_size(data: Any) -> int:
+        try:
+            return len(json.dumps(data, default=str).encode("utf-8"))
+        except (TypeError, ValueError):
+            return len(repr(data).encode("utf-8"))
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics for monitoring."""
@@ -329,9 +780,15 @@ class RequestCache:
         
         return {
             "total_entries": len(self._cache),
+            "total_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
             "total_requests": self._total_requests,
             "cache_hits": self._cache_hits,
             "hit_rate_percent": round(hit_rate, 2),
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "rejected_oversize": self._rejected,
             "ttl_seconds": self.ttl
         }
 
@@ -346,7 +803,7 @@ class ArcaneaMCPClient:
     
     Features enterprise-grade resilience patterns:
     - Connection pooling with httpx
-    - Circuit breaker for cascading failure prevention
+    - Per-tool circuit breakers for cascading failure prevention
     - Exponential backoff retry for transient failures
     - Request caching for idempotent operations
     - Comprehensive error handling and logging
@@ -379,12 +836,27 @@ class ArcaneaMCPClient:
         """Initialize MCP client with configuration."""
         self.config = config
         self._client: Optional[httpx.AsyncClient] = None
-        self._circuit_breaker = CircuitBreaker(
-            threshold=config.circuit_breaker_threshold,
-            recovery_time=config.circuit_breaker_recovery,
-            name="mcp-server"
+        self._circuit_breakers = CircuitBreakerRegistry(config)
+        self._bulkheads: Dict[str, Bulkhead] = {}
+        self._batch_supported = True
+        self._latency = LatencyTracker(
+            window_size=config.latency_window,
+            min_samples=config.hedge_min_samples
         )
-        self._cache = RequestCache(ttl_seconds=config.cache_ttl)
+        self._hedged_endpoints = {f"/tools/{tool}/invoke" for tool in config.hedged_tools}
+        self._hedge_candidates = 0
+        self._hedge_tokens = 0.0
+        self._hedges_sent = 0
+        self._hedge_wins = 0
+        self._cache = RequestCache(
+            ttl_seconds=config.cache_ttl,
+            max_entries=config.cache_max_entries,
+            max_bytes=config.cache_max_bytes,
+            sweep_interval=config.cache_sweep_interval
+        )
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._flight_callers: Dict[asyncio.Future, int] = {}
+        self._coalesced_requests = 0
         self._connected = False
         self._available_tools: List[str] = []
         
@@ -484,6 +956,7 @@ class ArcaneaMCPClient:
         
         if self._client and not self._client.is_closed:
             await self._client.aclose()
+        await self._cache.close()
         
         self._connected = False
         self._available_tools = []
@@ -504,22 +977,37 @@ class ArcaneaMCPClient:
         method: str,
         endpoint: str,
         data: Optional[Dict] = None,
-        use_cache: bool = True
+        use_cache: bool = True,
+        coalesce_key: Optional[str] = None,
+        tool: Optional[str] = None,
+        priority: RequestPriority = RequestPriority.NORMAL,
+        deadline: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Make HTTP request with retry, circuit breaker, and caching.
         
         This is the core method that implements all resilience patterns:
         1. Check cache for GET requests (if enabled)
-        2. Apply circuit breaker protection
-        3. Execute with exponential backoff retry
-        4. Cache successful GET responses
+        2. Join an identical request already in flight (single-flight)
+        3. Wait for a slot in the tool's bulkhead (tool calls only)
+        4. Execute with exponential backoff retry
+        5. Pass each attempt through the endpoint's circuit breaker (one per tool)
+        6. Cache successful GET responses
         
         Args:
             method: HTTP method (GET, POST, etc.)
             endpoint: API endpoint path
             data: Request payload for POST/PUT
             use_cache: Whether to use caching for this request
+            coalesce_key: Identity for coalescing a non-GET request; GETs
+                are keyed by method and endpoint automatically
+            tool: Tool whose bulkhead limits this request, if any
+            priority: Queue priority within the tool's bulkhead
+            deadline: time.monotonic() by which the call must finish;
+                bounds each attempt's timeout and the retries. Not applied
+                to a coalesced flight, which is shared by callers with
+                different budgets; each caller bounds its own wait instead,
+                and the flight is cancelled once no caller is left
             
         Returns:
             Parsed JSON response
@@ -529,6 +1017,7 @@ class ArcaneaMCPClient:
             httpx.ConnectError: On connection failure (will be retried)
             httpx.HTTPStatusError: On HTTP error status (triggers circuit breaker)
             CircuitBreakerOpenError: When circuit breaker is open
+            DeadlineExceededError: When the deadline passes before an attempt
         """
         # Build cache key for idempotent operations
         cache_key = None
@@ -539,64 +1028,162 @@ class ArcaneaMCPClient:
                 logger.debug(f"Cache hit for {endpoint}")
                 return cached
         
-        # Execute with circuit breaker protection
-        return await self._circuit_breaker.call(
-            self._execute_request,
-            method,
-            endpoint,
-            data,
-            cache_key
-        )
+        if coalesce_key is None and method.upper() == "GET":
+            coalesce_key = f"{method.upper()}:{endpoint}"
+        
+        if coalesce_key is None or not self.config.coalesce_requests:
+            return await self._send(method, endpoint, data, cache_key, tool, priority, deadline)
+        
+        # Single-flight: identical concurrent requests share one call
+        flight = self._in_flight.get(coalesce_key)
+        if flight is None:
+            # No deadline: followers must not inherit the leader's budget
+            flight = asyncio.ensure_future(
+                self._send(method, endpoint, data, cache_key, tool, priority, None)
+            )
+            self._in_flight[coalesce_key] = flight
+            flight.add_done_callback(lambda f: self._land_flight(coalesce_key, f))
+        else:
+            self._coalesced_requests += 1
+            logger.debug(f"Coalesced {method} {endpoint} into in-flight request")
+        
+        self._flight_callers[flight] = self._flight_callers.get(flight, 0) + 1
+        try:
+            # Shielded so one caller cancelling doesn't fail the others
+            return await asyncio.shield(flight)
+        finally:
+            self._leave_flight(coalesce_key, flight)
+    
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict],
+        cache_key: Optional[str],
+        tool: Optional[str],
+        priority: RequestPriority,
+        deadline: Optional[float]
+    ) -> Dict[str, Any]:
+        """Execute through the tool's bulkhead, if any."""
+        if tool is None:
+            return await self._execute_request(method, endpoint, data, cache_key, deadline)
+        
+        async with self._get_bulkhead(tool).slot(priority):
+            return await self._execute_request(method, endpoint, data, cache_key, deadline)
+    
+    def _get_bulkhead(self, tool: str) -> Bulkhead:
+        bulkhead = self._bulkheads.get(tool)
+        if bulkhead is None:
+            limit = self.config.tool_concurrency.get(tool, self.config.default_tool_concurrency)
+            bulkhead = self._bulkheads[tool] = Bulkhead(tool, limit)
+        return bulkhead
+    
+    def _leave_flight(self, key: str, flight: asyncio.Future) -> None:
+        """Drop a caller from a flight; cancel it once nobody is waiting for it."""
+        callers = self._flight_callers.get(flight)
+        if callers is None:
+            return
+        if callers > 1:
+            self._flight_callers[flight] = callers - 1
+            return
+        del self._flight_callers[flight]
+        if not flight.done():
+            # Every caller gave up: free the bulkhead slot instead of finishing for no one
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+            flight.cancel()
+    
+    def _land_flight(self, key: str, flight: asyncio.Future) -> None:
+        """Forget a finished in-flight request."""
+        self._flight_callers.pop(flight, None)
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        if not flight.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            flight.exception()
     
-    @retry(
-        retry=retry_if_exception_type((httpx.TimeoutException, httpx.ConnectError)),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=2, min=4, max=10),
-        before_sleep=before_sleep_log(logger, logging.WARNING)
-    )
     async def _execute_request(
         self,
         method: str,
         endpoint: str,
         data: Optional[Dict],
-        cache_key: Optional[str]
+        cache_key: Optional[str],
+        deadline: Optional[float] = None,
+        timings: Optional[List[float]] = None
     ) -> Dict[str, Any]:
         """
         Execute HTTP request with retry logic.
         
-        This method is decorated with tenacity retry for transient failures.
+        Timeouts and connection errors are retried up to
+        `config.max_retries` times with exponential backoff. With a
+        deadline, no retry is started whose backoff would run past it.
+        Each attempt passes the endpoint's circuit breaker on its own, so
+        the breaker times single attempts, never the backoff between them.
         
         Args:
             method: HTTP method
             endpoint: API endpoint
             data: Request data
             cache_key: Key for caching (if applicable)
+            deadline: time.monotonic() by which the call must finish
+            timings: If given, receives the seconds the successful attempt took
             
         Returns:
             JSON response data
         """
-        client = self._get_client()
+        breaker = self._circuit_breakers.get(endpoint)
+        wait = wait_exponential(
+            multiplier=self.config.retry_wait_multiplier,
+            min=self.config.retry_wait_min,
+            max=self.config.retry_wait_max
+        )
+        
+        def out_of_budget(retry_state) -> bool:
+            return deadline is not None and time.monotonic() + wait(retry_state) >= deadline
+        
+        retrying = AsyncRetrying(
+            retry=retry_if_exception_type((httpx.TimeoutException, httpx.ConnectError)),
+            stop=stop_after_attempt(self.config.max_retries + 1) | out_of_budget,
+            wait=wait,
+            before_sleep=before_sleep_log(logger, logging.WARNING),
+            reraise=True
+        )
+        async for attempt in retrying:
+            with attempt:
+                return await breaker.call(
+                    self._attempt_request, method, endpoint, data, cache_key, deadline, timings
+                )
+    
+    async def _attempt_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict],
+        cache_key: Optional[str],
+        deadline: Optional[float],
+        timings: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """Send one attempt, with its timeout cut to the remaining budget."""
         url = f"/mcp{endpoint}"
         
+        limits = self._attempt_limits(deadline)
+        if limits is None:
+            raise DeadlineExceededError(f"Deadline exceeded before {method} {url}")
+        timeout, headers = limits
+        
         logger.debug(f"{method} {url}")
         start_time = time.time()
         
         try:
-            if method.upper() == "GET":
-                response = await client.get(url)
-            elif method.upper() == "POST":
-                response = await client.post(url, json=data)
-            elif method.upper() == "PUT":
-                response = await client.put(url, json=data)
-            elif method.upper() == "DELETE":
-                response = await client.delete(url)
+            if endpoint in self._hedged_endpoints:
+                response = await self._hedged_send(endpoint, method, url, data, headers, timeout, deadline)
             else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+                response = await self._send_http(method, url, data, headers, timeout)
             
             duration = (time.time() - start_time) * 1000
-            
-            # Raise exception for 4xx/5xx status codes
-            response.raise_for_status()
+            self._latency.record(endpoint, duration / 1000)
+            if timings is not None:
+                timings.append(duration / 1000)
             
             result = response.json()
             
@@ -608,7 +1195,10 @@ class ArcaneaMCPClient:
             
             return result
             
-        except httpx.TimeoutException:
+        except httpx.TimeoutException as e:
+            if timeout < self.config.timeout:
+                # Cut short by our own budget, not a sign the service is slow
+                raise DeadlineExceededError(f"Deadline exceeded during {method} {url}") from e
             logger.warning(f"Timeout on {method} {url} - will retry")
             raise
         except httpx.ConnectError:
@@ -621,6 +1211,100 @@ class ArcaneaMCPClient:
             )
             raise
     
+    def _attempt_limits(self, deadline: Optional[float]) -> Optional[Tuple[float, Dict[str, str]]]:
+        """Timeout and headers for a request sent now; None once the deadline has passed."""
+        if deadline is None:
+            return self.config.timeout, {}
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return min(self.config.timeout, remaining), {self.config.deadline_header: str(int(remaining * 1000))}
+    
+    async def _send_http(
+        self,
+        method: str,
+        url: str,
+        data: Optional[Dict],
+        headers: Dict[str, str],
+        timeout: float
+    ) -> httpx.Response:
+        """Send one HTTP request; raises for 4xx/5xx status codes."""
+        client = self._get_client()
+        
+        if method.upper() == "GET":
+            response = await client.get(url, headers=headers, timeout=timeout)
+        elif method.upper() == "POST":
+            response = await client.post(url, json=data, headers=headers, timeout=timeout)
+        elif method.upper() == "PUT":
+            response = await client.put(url, json=data, headers=headers, timeout=timeout)
+        elif method.upper() == "DELETE":
+            response = await client.delete(url, headers=headers, timeout=timeout)
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        
+        # Raise exception for 4xx/5xx status codes
+        response.raise_for_status()
+        return response
+    
+    async def _hedged_send(
+        self,
+        endpoint: str,
+        method: str,
+        url: str,
+        data: Optional[Dict],
+        headers: Dict[str, str],
+        timeout: float,
+        deadline: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        Send a request, racing a second copy if it runs past the hedge delay.
+        
+        The delay is the endpoint's `hedge_percentile` recent latency. The
+        first successful response wins and the other request is cancelled.
+        Hedges are paid from a token bucket: each call to a hedged endpoint
+        adds `hedge_budget_percent` / 100 of a token, each hedge takes one,
+        and at most `hedge_burst` tokens are kept, so a slowdown after a
+        long fast spell can't release a flood of hedges. The hedge's
+        timeout and deadline header are recomputed when it is sent, and no
+        hedge is sent once the deadline has passed.
+        """
+        self._hedge_candidates += 1
+        self._hedge_tokens = min(
+            self._hedge_tokens + self.config.hedge_budget_percent / 100, self.config.hedge_burst
+        )
+        delay = self._latency.percentile(endpoint, self.config.hedge_percentile)
+        
+        primary = asyncio.ensure_future(self._send_http(method, url, data, headers, timeout))
+        tasks = {primary}
+        try:
+            if delay is None or self._hedge_tokens < 1:
+                return await primary
+            
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            # Re-checked: concurrent calls may have spent the tokens while this one waited
+            limits = self._attempt_limits(deadline) if not done and self._hedge_tokens >= 1 else None
+            if limits is not None:
+                self._hedge_tokens -= 1
+                self._hedges_sent += 1
+                logger.debug(f"Hedging {method} {url} after {delay * 1000:.0f}ms")
+                hedge_timeout, hedge_headers = limits
+                tasks.add(asyncio.ensure_future(self._send_http(method, url, data, hedge_headers, hedge_timeout)))
+            
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._hedge_wins += 1
+                        return task.result()
+            # Every copy failed; surface the primary's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
     # ====================================================================
     # Public API Methods
     # ====================================================================
@@ -650,7 +1334,9 @@ class ArcaneaMCPClient:
     async def invoke_tool(
         self,
         tool: str,
-        params: Dict[str, Any]
+        params: Dict[str, Any],
+        priority: RequestPriority = RequestPriority.NORMAL,
+        timeout_budget: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Generic tool invocation with fallback support.
@@ -658,6 +1344,9 @@ class ArcaneaMCPClient:
         Args:
             tool: Tool name to invoke
             params: Tool parameters
+            priority: Queue priority when the tool's bulkhead is full
+            timeout_budget: Seconds the whole call may take, including
+                queueing, retries and backoff (default: config.default_timeout_budget)
             
         Returns:
             Response with success flag and data or error
@@ -666,6 +1355,19 @@ class ArcaneaMCPClient:
             logger.error("Client not connected - attempting fallback")
             return await self._fallback_response(tool, params)
         
+        budget = timeout_budget if timeout_budget is not None else self.config.default_timeout_budget
+        deadline = time.monotonic() + budget if budget is not None else None
+        return await self._invoke_tool(tool, params, priority, budget, deadline)
+    
+    async def _invoke_tool(
+        self,
+        tool: str,
+        params: Dict[str, Any],
+        priority: RequestPriority,
+        budget: Optional[float],
+        deadline: Optional[float]
+    ) -> Dict[str, Any]:
+        """Invoke a tool until `deadline`; `budget` is the seconds it was given, for messages."""
         try:
             request_data = {
                 "tool": tool,
@@ -673,12 +1375,27 @@ class ArcaneaMCPClient:
                 "timestamp": datetime.now().isoformat()
             }
             
-            response = await self._make_request(
+            coalesce_key = None
+            if tool in self.config.idempotent_tools:
+                # Same tool and parameters; the timestamp doesn't matter
+                coalesce_key = "POST:/tools/{}/invoke:{}".format(
+                    tool, json.dumps(params, sort_keys=True, default=str)
+                )
+            
+            request = self._make_request(
                 "POST",
                 f"/tools/{tool}/invoke",
                 data=request_data,
-                use_cache=False
+                use_cache=False,
+                coalesce_key=coalesce_key,
+                tool=tool,
+                priority=priority,
+                deadline=deadline
             )
+            # The outer bound also covers time queued in the bulkhead
+            if deadline is not None:
+                request = asyncio.wait_for(request, deadline - time.monotonic())
+            response = await request
             
             return {
                 "success": True,
@@ -693,15 +1410,164 @@ class ArcaneaMCPClient:
             logger.warning(f"Circuit breaker open for {tool} - using fallback")
             return await self._fallback_response(tool, params)
             
+        except (asyncio.TimeoutError, DeadlineExceededError):
+            logger.warning(f"Timeout budget of {budget}s exceeded for {tool} - using fallback")
+            return await self._fallback_response(
+                tool, params, error=f"Timeout budget of {budget}s exceeded"
+            )
+        
         except Exception as e:
             logger.error(f"Error invoking tool {tool}: {e}")
             return await self._fallback_response(tool, params, error=str(e))
     
+    async def invoke_many(
+        self,
+        calls: List[Tuple[str, Dict[str, Any]]],
+        max_concurrency: Optional[int] = None,
+        priority: RequestPriority = RequestPriority.NORMAL,
+        timeout_budget: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Invoke several independent tools at once.
+        
+        If `config.batch_endpoint` is set and the server accepts it, the
+        calls go out as one batched request; otherwise they run
+        concurrently through `invoke_tool`, at most `max_concurrency` at a
+        time. Calls to a tool whose circuit is not CLOSED are kept out of
+        the batch and made singly, so they get the fallback while the
+        circuit is OPEN and act as its probe once it may recover. Calls
+        made singly after a failed batch keep the batch's deadline. Either
+        way each call gets the same response shape as `invoke_tool`,
+        including its own fallback on error.
+        
+        Args:
+            calls: (tool, params) pairs
+            max_concurrency: Concurrent calls (default: config.max_batch_concurrency)
+            priority: Queue priority for the calls within their bulkheads
+            timeout_budget: Seconds each call (or the batch) may take
+        
+        Returns:
+            One response per call, in the same order as `calls`
+        """
+        if not calls:
+            return []
+        
+        results: Dict[int, Dict[str, Any]] = {}
+        batching = bool(self._connected and self.config.batch_endpoint and self._batch_supported)
+        budget = timeout_budget if timeout_budget is not None else self.config.default_timeout_budget
+        deadline = time.monotonic() + budget if batching and budget is not None else None
+        if batching:
+            batched = [
+                i for i, (tool, _) in enumerate(calls)
+                if self._circuit_breakers.get(f"/tools/{tool}/invoke").state == CircuitState.CLOSED
+            ]
+            if batched:
+                answers = await self._invoke_batch([calls[i] for i in batched], budget, deadline)
+                if answers is not None:
+                    results.update(zip(batched, answers))
+        
+        semaphore = asyncio.Semaphore(max_concurrency or self.config.max_batch_concurrency)
+        
+        async def invoke(tool: str, params: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                if batching:
+                    return await self._invoke_tool(tool, params, priority, budget, deadline)
+                return await self.invoke_tool(
+                    tool, params, priority=priority, timeout_budget=timeout_budget
+                )
+        
+        single = [i for i in range(len(calls)) if i not in results]
+        results.update(zip(single, await asyncio.gather(*(invoke(*calls[i]) for i in single))))
+        return [results[i] for i in range(len(calls))]
+    
+    async def _invoke_batch(
+        self,
+        calls: List[Tuple[str, Dict[str, Any]]],
+        budget: Optional[float],
+        deadline: Optional[float]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Send calls as one batched request.
+        
+        Each item's outcome is recorded on its tool's circuit breaker, timed
+        as the batch attempt that carried it. Returns None when the server
+        has no batch endpoint (and batching stops) or when the batch
+        request itself fails with a transport error or a 5xx, so the
+        caller falls back to concurrent single calls.
+        """
+        request_data = {
+            "requests": [
+                {"id": i, "tool": tool, "parameters": params}
+                for i, (tool, params) in enumerate(calls)
+            ],
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        timings: List[float] = []
+        try:
+            # A POST batch is neither cached nor coalesced; only retries and the breaker apply
+            response = await self._execute_request(
+                "POST",
+                self.config.batch_endpoint,
+                request_data,
+                None,
+                deadline,
+                timings
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (404, 405, 501):
+                logger.info(f"Batch endpoint {self.config.batch_endpoint} unsupported - using concurrent calls")
+                self._batch_supported = False
+                return None
+            if e.response.status_code >= 500:
+                logger.warning(f"Tool batch failed ({e.response.status_code}) - using concurrent calls")
+                return None
+            error = str(e)
+        except httpx.TransportError as e:
+            logger.warning(f"Tool batch failed ({e}) - using concurrent calls")
+            return None
+        except CircuitBreakerOpenError:
+            logger.warning("Circuit breaker open for batch endpoint - using fallbacks")
+            error = None
+        except DeadlineExceededError:
+            logger.warning(f"Timeout budget of {budget}s exceeded for tool batch - using fallbacks")
+            error = f"Timeout budget of {budget}s exceeded"
+        except Exception as e:
+            logger.error(f"Error invoking tool batch: {e}")
+            error = str(e)
+        else:
+            by_id = {item.get("id"): item for item in response.get("results", [])}
+            results = []
+            for i, (tool, params) in enumerate(calls):
+                item = by_id.get(i)
+                failed = item is None or bool(item.get("error"))
+                await self._circuit_breakers.get(f"/tools/{tool}/invoke").record(not failed, timings[-1])
+                if failed:
+                    message = item.get("error") if item else "Missing from batch response"
+                    results.append(await self._fallback_response(tool, params, error=message))
+                else:
+                    results.append({
+                        "success": True,
+                        "data": item.get("result"),
+                        "metadata": {
+                            "tool": tool,
+                            "timestamp": datetime.now().isoformat(),
+                            "batched": True
+                        }
+                    })
+            return results
+        
+        return [
+            await self._fallback_response(tool, params, error=error)
+            for tool, params in calls
+        ]
+    
     async def generate_image(
         self,
         prompt: str,
         style: Optional[str] = "fantasy",
         size: Optional[str] = "1024x1024",
+        priority: RequestPriority = RequestPriority.NORMAL,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -711,6 +1577,7 @@ class ArcaneaMCPClient:
             prompt: Text description of desired image
             style: Visual style (fantasy, realistic, abstract, etc.)
             size: Image dimensions (e.g., "1024x1024")
+            priority: Queue priority when the tool's bulkhead is full
             **kwargs: Additional parameters for the tool
             
         Returns:
@@ -723,12 +1590,13 @@ class ArcaneaMCPClient:
             **kwargs
         }
         
-        return await self.invoke_tool("image_generation", params)
+        return await self.invoke_tool("image_generation", params, priority=priority)
     
     async def analyze_code(
         self,
         code: str,
         language: Optional[str] = "javascript",
+        priority: RequestPriority = RequestPriority.NORMAL,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -737,6 +1605,7 @@ class ArcaneaMCPClient:
         Args:
             code: Source code to analyze
             language: Programming language
+            priority: Queue priority when the tool's bulkhead is full
             **kwargs: Additional parameters for the tool
             
         Returns:
@@ -748,12 +1617,13 @@ class ArcaneaMCPClient:
             **kwargs
         }
         
-        return await self.invoke_tool("code_analysis", params)
+        return await self.invoke_tool("code_analysis", params, priority=priority)
     
     async def search_docs(
         self,
         query: str,
         source: Optional[str] = "all",
+        priority: RequestPriority = RequestPriority.NORMAL,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -762,6 +1632,7 @@ class ArcaneaMCPClient:
         Args:
             query: Search query string
             source: Documentation source to search
+            priority: Queue priority when the tool's bulkhead is full
             **kwargs: Additional parameters for the tool
             
         Returns:
@@ -773,12 +1644,13 @@ class ArcaneaMCPClient:
             **kwargs
         }
         
-        return await self.invoke_tool("documentation_search", params)
+        return await self.invoke_tool("documentation_search", params, priority=priority)
     
     async def process_data(
         self,
         data: Any,
         operation: str = "filter",
+        priority: RequestPriority = RequestPriority.NORMAL,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -787,6 +1659,7 @@ class ArcaneaMCPClient:
         Args:
             data: Data to process
             operation: Processing operation (filter, transform, aggregate)
+            priority: Queue priority when the tool's bulkhead is full
             **kwargs: Additional parameters for the tool
             
         Returns:
@@ -798,7 +1671,7 @@ class ArcaneaMCPClient:
             **kwargs
         }
         
-        return await self.invoke_tool("data_processing", params)
+        return await self.invoke_tool("data_processing", params, priority=priority)
     
     # ====================================================================
     # Fallback & Monitoring
@@ -892,8 +1765,23 @@ class ArcaneaMCPClient:
         return {
             "connected": self._connected,
             "available_tools": self._available_tools,
-            "circuit_breaker": self._circuit_breaker.get_state(),
+            "circuit_breakers": self._circuit_breakers.get_states(),
+            "open_circuits": self._circuit_breakers.open_circuits(),
+            "bulkheads": {tool: bulkhead.get_stats() for tool, bulkhead in self._bulkheads.items()},
+            "latency": self._latency.get_stats(),
+            "hedging": {
+                "hedged_tools": sorted(self.config.hedged_tools),
+                "candidate_requests": self._hedge_candidates,
+                "hedges_sent": self._hedges_sent,
+                "hedge_wins": self._hedge_wins,
+                "budget_percent": self.config.hedge_budget_percent,
+                "tokens": round(self._hedge_tokens, 2)
+            },
             "cache": self._cache.get_stats(),
+            "single_flight": {
+                "in_flight": len(self._in_flight),
+                "coalesced_requests": self._coalesced_requests
+            },
             "config": {
                 "base_url": self.config.base_url,
                 "timeout": self.config.timeout,
@@ -1025,7 +1913,7 @@ async def demo():
         # Show statistics
         print("\n📈 Client Statistics:")
         stats = client.get_stats()
-        print(f"   Circuit Breaker State: {stats['circuit_breaker']['state']}")
+        print(f"   Open Circuits: {', '.join(stats['open_circuits']) or 'none'}")
         print(f"   Cache Hit Rate: {stats['cache']['hit_rate_percent']:.1f}%")
         print(f"   Available Tools: {len(stats['available_tools'])}")
     
@@ -304,22 +304,24 @@ class ArcaneaUnifiedHub:
         )
         results["knowledge"] = await self.execute(knowledge_cmd)
         
-        # 2. Use MCP tools if needed
+        # 2. Use MCP tools if needed (independent, so run them together)
+        mcp_cmds = {}
         if "generate" in tools:
-            mcp_cmd = ArcaneaCommand(
+            mcp_cmds["generation"] = ArcaneaCommand(
                 system="mcp",
                 action="generate_image",
                 parameters={"prompt": task}
             )
-            results["generation"] = await self.execute(mcp_cmd)
         
         if "analyze" in tools:
-            mcp_cmd = ArcaneaCommand(
+            mcp_cmds["analysis"] = ArcaneaCommand(
                 system="mcp",
                 action="analyze_code",
                 parameters={"code": task}
             )
-            results["analysis"] = await self.execute(mcp_cmd)
+        
+        mcp_results = await asyncio.gather(*(self.execute(cmd) for cmd in mcp_cmds.values()))
+        results.update(zip(mcp_cmds, mcp_results))
         
         # 3. Save results
         storage_cmd = ArcaneaCommand(
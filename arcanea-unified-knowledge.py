@@ -7,29 +7,355 @@ InfoGeniusArcaneaBridge and the new ArcaneaKnowledgeBase v2.
 """
 
 import asyncio
+import json
 import logging
-from typing import Dict, List, Any, Optional
+import os
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 
+import numpy as np
+
 # Import both systems
-from arcanea_infogenius_bridge import InfoGeniusArcaneaBridge, KnowledgeNode, KnowledgeableAgent
-from arcanea_knowledge_base_v2 import ArcaneaKnowledgeBase, KnowledgeEntry
+from arcanea_infogenius_bridge import InfoGeniusArcaneaBridge, KnowledgeNode, KnowledgeableAgent, to_plain
+from arcanea_knowledge_base_v2 import ArcaneaKnowledgeBase, KnowledgeEntry, content_hash
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class UnifiedKnowledgeEntry:
     """Unified entry that works with both systems"""
     id: str
     agent_id: str
     content: str
     source: str  # 'memory' or 'persistent'
-    embedding: Optional[List[float]] = None
+    embedding: Optional[np.ndarray] = None  # float32
     metadata: Optional[Dict[str, Any]] = None
     timestamp: Optional[str] = None
 
 
+class WriteBehindQueue:
+    """
+    Durable, batched background persistence from the bridge to ArcaneaKnowledgeBase.
+    
+    Each write is appended to a JSONL journal before it is acknowledged.
+    Journal appends are group-committed: records arriving while a write
+    and fsync is in flight (on the default executor, off the event loop)
+    are written together by the next one, so one fsync covers many
+    writes. A background worker drains the queue in batches: writes are
+    grouped per agent and stored with `store_knowledge_batch`, so one
+    batch costs a few embedding requests and one multi-row insert.
+    
+    The in-memory queue is bounded; `submit()` waits when it is full,
+    which pushes back on writers while the database is slow. When the
+    database is down, batches are spilled (left on disk in the journal,
+    dropped from memory) and retried with exponential backoff, so an
+    outage never blocks writers. Spilled and unfinished writes are
+    replayed once the database answers again, or on the next `start()`.
+    If the journal itself cannot be written (e.g. a full disk), the
+    worker keeps running: `submit()` raises OSError so the caller can
+    store synchronously, and batches already journaled are spilled.
+    """
+    
+    def __init__(
+        self,
+        kb: ArcaneaKnowledgeBase,
+        journal_path: str,
+        max_queue: int = 1000,
+        batch_size: int = 64,
+        linger_ms: float = 20.0,
+        retry_base_delay: float = 1.0,
+        retry_max_delay: float = 60.0
+    ):
+        self.kb = kb
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.linger_ms = linger_ms
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        self._worker: Optional[asyncio.Task] = None
+        self._spilled: Set[str] = set()
+        self._retry_delay = retry_base_delay
+        self._next_retry = 0.0
+        self._journal_dirty = False
+        self._journal_buffer: List[Dict[str, Any]] = []
+        self._journal_commit: Optional[asyncio.Future] = None
+        self._journal_lock = asyncio.Lock()
+        # Stored writes whose "done" record could not be journaled yet
+        self._unjournaled_done: List[str] = []
+        
+        self.persisted = 0
+        self.failed = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+    
+    async def start(self):
+        """Pick up unfinished journal entries and start the worker."""
+        if self._worker is not None:
+            return
+        
+        pending = self._pending_jobs()
+        if pending:
+            # Replayed by the worker on its first pass
+            self._spilled.update(job["job_id"] for job in pending)
+            logger.info(f"↻ Replaying {len(pending)} pending writes")
+        
+        self._worker = asyncio.ensure_future(self._run())
+    
+    async def submit(self, agent_id: str, content: str, metadata: Dict[str, Any]) -> str:
+        """
+        Journal a write and queue it; returns once it is durable locally.
+        
+        Raises:
+            OSError: If the journal cannot be written; nothing is queued
+        """
+        if self._worker is None:
+            await self.start()
+        
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "agent_id": agent_id,
+            "content": content,
+            "metadata": metadata
+        }
+        await self._journal({"op": "write", **job})
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put(job)
+        return job["job_id"]
+    
+    async def flush(self):
+        """
+        Wait until every queued write has been stored or spilled.
+        
+        Spilled writes stay in the journal and are retried in the background.
+        """
+        await self._queue.join()
+    
+    async def close(self):
+        """Flush, make one last attempt at spilled writes and stop the worker."""
+        if self._worker is None:
+            return
+        await self.flush()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        
+        if self._spilled:
+            try:
+                await self._replay_spilled()
+            except OSError as e:
+                logger.warning(f"Could not replay spilled writes: {e}")
+            await self._compact()
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._spilled and loop.time() >= self._next_retry:
+                try:
+                    await self._replay_spilled()
+                except OSError as e:
+                    logger.warning(f"Could not replay spilled writes: {e}")
+                    self._back_off()
+                await self._compact()
+            
+            timeout = max(0.0, self._next_retry - loop.time()) if self._spilled else None
+            try:
+                job = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                continue
+            batch = await self._collect_batch(job)
+            
+            try:
+                if self._spilled and loop.time() < self._next_retry:
+                    # Still in an outage: keep writers moving, retry later
+                    self._spill(batch)
+                else:
+                    self._spill(await self._store(batch))
+            except Exception as e:
+                # Never let one batch end the worker; its writes are journaled
+                logger.warning(f"Background persist failed ({len(batch)} writes): {e}")
+                self._spill(batch)
+                self._back_off()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            await self._compact()
+    
+    async def _collect_batch(self, first: Dict[str, Any]) -> List[Dict[str, Any]]:
+        batch = [first]
+        deadline = asyncio.get_running_loop().time() + self.linger_ms / 1000.0
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _store(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store a batch grouped by agent; returns the jobs that failed."""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for job in batch:
+            groups.setdefault(job["agent_id"], []).append(job)
+        
+        done: List[str] = []
+        failed: List[Dict[str, Any]] = []
+        for agent_id, jobs in groups.items():
+            try:
+                await self.kb.store_knowledge_batch(
+                    agent_id=agent_id,
+                    contents=[job["content"] for job in jobs],
+                    metadata=[job["metadata"] for job in jobs]
+                )
+                done.extend(job["job_id"] for job in jobs)
+            except Exception as e:
+                failed.extend(jobs)
+                logger.warning(f"Background persist failed for {agent_id} ({len(jobs)} writes): {e}")
+        
+        self.batches += 1
+        if done:
+            self.persisted += len(done)
+            self._spilled.difference_update(done)
+            job_ids, self._unjournaled_done = self._unjournaled_done + done, []
+            try:
+                await self._journal({"op": "done", "job_ids": job_ids})
+            except OSError as e:
+                # Stored, so not retried here; recorded with the next done record
+                self._unjournaled_done = job_ids
+                logger.warning(f"Could not journal {len(job_ids)} completed writes: {e}")
+        if failed:
+            self.failed += len(failed)
+            self._back_off()
+        else:
+            self._retry_delay = self.retry_base_delay
+        return failed
+    
+    def _back_off(self):
+        """Schedule the next retry of spilled writes with exponential backoff."""
+        self._next_retry = asyncio.get_running_loop().time() + self._retry_delay
+        self._retry_delay = min(self._retry_delay * 2, self.retry_max_delay)
+    
+    async def _replay_spilled(self):
+        pending = await asyncio.get_running_loop().run_in_executor(None, self._pending_jobs)
+        jobs = [job for job in pending if job["job_id"] in self._spilled]
+        # Ids no longer in the journal were completed elsewhere
+        self._spilled.intersection_update(job["job_id"] for job in jobs)
+        
+        replayed = 0
+        for start in range(0, len(jobs), self.batch_size):
+            chunk = jobs[start:start + self.batch_size]
+            failed = await self._store(chunk)
+            replayed += len(chunk) - len(failed)
+            if failed:
+                break
+        if replayed:
+            logger.info(f"✓ Replayed {replayed} spilled writes")
+    
+    async def _compact(self):
+        # Drop completed writes from the journal once the queue drains
+        if self._queue.empty() and self._journal_dirty:
+            async with self._journal_lock:
+                try:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, lambda: self._rewrite(self._pending_jobs())
+                    )
+                except OSError as e:
+                    logger.warning(f"Could not compact persist journal: {e}")
+    
+    def _spill(self, jobs: List[Dict[str, Any]]):
+        # Already journaled; only the ids are kept in memory
+        self._spilled.update(job["job_id"] for job in jobs)
+    
+    async def _journal(self, record: Dict[str, Any]):
+        """Append a record; returns once its group has been fsynced."""
+        self._journal_buffer.append(record)
+        if self._journal_commit is None:
+            self._journal_commit = asyncio.ensure_future(self._commit_journal())
+        # Shielded: a cancelled writer must not cancel its group's commit
+        await asyncio.shield(self._journal_commit)
+    
+    async def _commit_journal(self):
+        # One group at a time; the next group gathers while this one syncs
+        async with self._journal_lock:
+            records, self._journal_buffer = self._journal_buffer, []
+            self._journal_commit = None
+            await asyncio.get_running_loop().run_in_executor(None, self._append, records)
+    
+    def _append(self, records: List[Dict[str, Any]]):
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        if any(record["op"] == "done" for record in records):
+            self._journal_dirty = True
+    
+    def _pending_jobs(self) -> List[Dict[str, Any]]:
+        pending: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("op") == "write":
+                        pending[record["job_id"]] = {k: v for k, v in record.items() if k != "op"}
+                    elif record.get("op") == "done":
+                        for job_id in record.get("job_ids") or [record.get("job_id")]:
+                            pending.pop(job_id, None)
+        except FileNotFoundError:
+            pass
+        return list(pending.values())
+    
+    def _rewrite(self, jobs: List[Dict[str, Any]]):
+        """Atomically replace the journal with just these open writes."""
+        tmp = self.journal_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for job in jobs:
+                    f.write(json.dumps({"op": "write", **job}, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.journal_path)
+            self._journal_dirty = False
+        except OSError as e:
+            logger.warning(f"Could not compact persist journal: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self._spilled and self._worker is not None:
+            retry_in = max(0.0, self._next_retry - asyncio.get_running_loop().time())
+        return {
+            "queued": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "spilled": len(self._spilled),
+            "persisted": self.persisted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "backpressure_waits": self.backpressure_waits,
+            "retry_in_seconds": round(retry_in, 1)
+        }
+
+
 class ArcaneaUnifiedKnowledgeSystem:
     """
     Unified knowledge system combining v1 (in-memory) and v2 (persistent).
@@ -42,6 +368,8 @@ class ArcaneaUnifiedKnowledgeSystem:
     - Semantic search: Vector-based similarity when available
     - Pattern extraction: Temporal and topical analysis
     - Knowledge sharing: Between all 38 Arcanean agents
+    - Concurrent mode: learn acks after the memory write (persisting in
+      the background); recall races both stores under a latency budget
     
     Usage:
         system = ArcaneaUnifiedKnowledgeSystem(
@@ -69,7 +397,12 @@ class ArcaneaUnifiedKnowledgeSystem:
         supabase_client=None,
         openai_api_key: Optional[str] = None,
         enable_persistent: bool = True,
-        storage_path: str = "./arcanea-knowledge"
+        storage_path: str = "./arcanea-knowledge",
+        persist_memory: bool = False,
+        execution_mode: str = "sequential",
+        latency_budget_ms: float = 250.0,
+        write_behind: bool = False,
+        write_queue_size: int = 1000
     ):
         """
         Initialize unified knowledge system.
@@ -79,9 +412,23 @@ class ArcaneaUnifiedKnowledgeSystem:
             openai_api_key: OpenAI API key (required for persistent mode)
             enable_persistent: Enable Supabase vector storage
             storage_path: Path for in-memory bridge storage
+            persist_memory: Keep the bridge's memories on disk under storage_path
+            execution_mode: "sequential" (persist inline, fall back on recall)
+                or "concurrent" (background persist, raced recall)
+            latency_budget_ms: How long a concurrent recall waits for the
+                persistent store before answering from memory alone
+            write_behind: Persist learned knowledge through the batched
+                background queue (always on in concurrent mode)
+            write_queue_size: Writes held in memory before learn() waits
         """
+        if execution_mode not in ("sequential", "concurrent"):
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
+        self.execution_mode = execution_mode
+        self.latency_budget_ms = latency_budget_ms
+        self.storage_path = storage_path
+        
         # Initialize v1 (in-memory bridge)
-        self.bridge = InfoGeniusArcaneaBridge(storage_path=storage_path)
+        self.bridge = InfoGeniusArcaneaBridge(storage_path=storage_path, persist=persist_memory)
         
         # Initialize v2 (persistent KB)
         self.kb: Optional[ArcaneaKnowledgeBase] = None
@@ -96,12 +443,31 @@ class ArcaneaUnifiedKnowledgeSystem:
                 self.enable_persistent = False
         else:
             logger.info("ℹ Running in memory-only mode")
+        
+        self.write_queue: Optional[WriteBehindQueue] = None
+        if self.kb and (write_behind or execution_mode == "concurrent"):
+            self.write_queue = WriteBehindQueue(
+                self.kb,
+                journal_path=os.path.join(storage_path, "persist-journal.jsonl"),
+                max_queue=write_queue_size
+            )
     
     async def initialize(self):
         """Initialize both systems"""
         await self.bridge.initialize()
+        if self.write_queue:
+            await self.write_queue.start()
         logger.info("🔮 Arcanea Unified Knowledge System: ACTIVE")
     
+    async def close(self):
+        """Finish background writes and release resources"""
+        if self.write_queue:
+            await self.write_queue.close()
+        if self.kb:
+            # After the queue drains: its last batches use the kb's thread pool
+            self.kb.close()
+        await self.bridge.close()
+    
     async def learn(
         self,
         agent_id: str,
@@ -129,6 +495,24 @@ class ArcaneaUnifiedKnowledgeSystem:
         }
         
         v1_node = await self.bridge.agent_learn(agent_id, v1_knowledge)
+        # Lets sync_to_persistent recognise this memory as already stored
+        persisted_metadata = {**(metadata or {}), "source_created_at": v1_node.created_at}
+        
+        # Write-behind: ack now, persist through the durable queue
+        if self.write_queue and self.enable_persistent:
+            try:
+                await self.write_queue.submit(agent_id, content, persisted_metadata)
+                return UnifiedKnowledgeEntry(
+                    id=v1_node.id,
+                    agent_id=agent_id,
+                    content=content,
+                    source="memory",
+                    metadata=metadata,
+                    timestamp=v1_node.created_at
+                )
+            except OSError as e:
+                # Journal unwritable (e.g. disk full): persist synchronously instead
+                logger.warning(f"Persist journal unavailable, storing directly: {e}")
         
         # Store in v2 (persistent) - if enabled
         v2_entry = None
@@ -137,7 +521,7 @@ class ArcaneaUnifiedKnowledgeSystem:
                 v2_entry = await self.kb.store_knowledge(
                     agent_id=agent_id,
                     content=content,
-                    metadata=metadata or {}
+                    metadata=persisted_metadata
                 )
             except Exception as e:
                 logger.warning(f"Failed to persist to KB: {e}")
@@ -172,6 +556,9 @@ class ArcaneaUnifiedKnowledgeSystem:
         Returns:
             List of UnifiedKnowledgeEntry
         """
+        if self.execution_mode == "concurrent" and use_semantic and self.enable_persistent and self.kb:
+            return await self._recall_concurrent(agent_id, query, limit)
+        
         results = []
         
         # Try semantic search first (if enabled)
@@ -209,7 +596,7 @@ class ArcaneaUnifiedKnowledgeSystem:
                     agent_id=node.source,
                     content=node.content,
                     source="memory",
-                    metadata=node.metadata,
+                    metadata=to_plain(node.metadata),
                     timestamp=node.created_at
                 ))
                 
@@ -218,6 +605,83 @@ class ArcaneaUnifiedKnowledgeSystem:
         
         return results
     
+    async def _recall_concurrent(
+        self,
+        agent_id: str,
+        query: str,
+        limit: int
+    ) -> List[UnifiedKnowledgeEntry]:
+        """
+        Race semantic and memory recall; merge whatever is ready within the budget.
+        
+        Persistent (semantic) hits rank first, then memory hits; entries
+        with the same content are kept once.
+        """
+        persistent = asyncio.ensure_future(self._recall_persistent(agent_id, query, limit))
+        local = asyncio.ensure_future(self._recall_memory(agent_id, query, limit))
+        
+        await asyncio.wait(
+            {persistent, local},
+            timeout=self.latency_budget_ms / 1000.0
+        )
+        if not local.done():
+            # Memory recall is cheap; never answer without it
+            await asyncio.wait({local})
+        # Check again: semantic recall may have finished while memory was awaited
+        sources = [local]
+        if persistent.done():
+            sources.insert(0, persistent)
+        else:
+            persistent.cancel()
+            logger.info(f"Semantic recall exceeded {self.latency_budget_ms:.0f}ms budget; using memory results")
+        
+        merged = []
+        seen = set()
+        for task in sources:
+            for entry in task.result():
+                key = " ".join((entry.content or "").lower().split())
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(entry)
+        return merged[:limit]
+    
+    async def _recall_persistent(self, agent_id: str, query: str, limit: int) -> List[UnifiedKnowledgeEntry]:
+        try:
+            kb_results = await self.kb.search_knowledge(query=query, agent_id=agent_id, limit=limit)
+        except Exception as e:
+            logger.warning(f"Semantic search failed: {e}")
+            return []
+        return [
+            UnifiedKnowledgeEntry(
+                id=r.get("id"),
+                agent_id=r.get("agent_id"),
+                content=r.get("content"),
+                source="persistent",
+                metadata=r.get("metadata"),
+                timestamp=r.get("created_at")
+            )
+            for r in kb_results
+        ]
+    
+    async def _recall_memory(self, agent_id: str, query: str, limit: int) -> List[UnifiedKnowledgeEntry]:
+        try:
+            v1_results = await self.bridge.agent_recall(agent_id, query, limit)
+        except Exception as e:
+            logger.error(f"Memory recall failed: {e}")
+            return []
+        return [
+            UnifiedKnowledgeEntry(
+                id=node.id,
+                agent_id=node.source,
+                content=node.content,
+                source="memory",
+                metadata=to_plain(node.metadata),
+                timestamp=node.created_at
+            )
+            for node in v1_results
+        ]
+    
     async def share_knowledge(
         self,
         from_agent: str,
@@ -299,7 +763,7 @@ class ArcaneaUnifiedKnowledgeSystem:
                 logger.warning(f"KB stats failed: {e}")
         
         # Combine
-        return {
+        stats = {
             "agent_id": agent_id,
             "in_memory": {
                 "memories": v1_stats.get("memories", 0),
@@ -309,15 +773,37 @@ class ArcaneaUnifiedKnowledgeSystem:
             "persistent": v2_stats if v2_stats else {"error": "Not available"},
             "total_accessible": v1_stats.get("memories", 0) + v2_stats.get("total_memories", 0)
         }
+        if self.write_queue:
+            stats["write_queue"] = self.write_queue.get_stats()
+        return stats
     
-    async def sync_to_persistent(self, agent_id: Optional[str] = None) -> int:
+    async def sync_to_persistent(
+        self,
+        agent_id: Optional[str] = None,
+        concurrency: int = 4,
+        batch_size: int = 200,
+        checkpoint_path: Optional[str] = None,
+        progress_interval: float = 5.0
+    ) -> int:
         """
-        Sync in-memory knowledge to persistent storage.
+        Migrate in-memory knowledge to persistent storage.
         
-        One-time migration helper.
+        Agents are migrated in parallel (up to `concurrency` at a time),
+        each in batches of `batch_size` through `store_knowledge_batch`.
+        Progress per agent is checkpointed after every batch, keyed by the
+        target database, as an offset plus the id of the last memory
+        handled; a rerun resumes there only if that memory is still at
+        that offset (memories may differ after a restart), otherwise it
+        rescans the agent. Memories already stored for the agent, matched
+        by content hash and creation time, are skipped, so reruns never
+        duplicate rows while genuinely repeated memories are all kept.
         
         Args:
             agent_id: Specific agent to sync, or None for all
+            concurrency: Agents migrated at the same time
+            batch_size: Memories per embedding/insert batch
+            checkpoint_path: Checkpoint file (default: <storage_path>/sync-checkpoint.json)
+            progress_interval: Seconds between progress log lines
             
         Returns:
             Number of entries synced
@@ -326,40 +812,157 @@ class ArcaneaUnifiedKnowledgeSystem:
             logger.warning("Persistent storage not available")
             return 0
         
-        synced = 0
+        checkpoint_path = checkpoint_path or os.path.join(self.storage_path, "sync-checkpoint.json")
+        targets = self._load_sync_checkpoint(checkpoint_path)
+        checkpoint = targets.setdefault(self._sync_target(), {})
+        agents_to_sync = [agent_id] if agent_id else list(self.bridge.agent_memories.keys())
         
-        try:
-            # Get all v1 memories
-            if agent_id:
-                agents_to_sync = [agent_id]
-            else:
-                agents_to_sync = list(self.bridge.agent_memories.keys())
+        progress = {
+            "total": sum(
+                len(memories) - self._resume_offset(memories, checkpoint.get(aid))
+                for aid in agents_to_sync
+                for memories in [self.bridge.agent_memories.get(aid, [])]
+            ),
+            "processed": 0,
+            "synced": 0,
+            "skipped": 0,
+            "failed_agents": 0,
+            "started": time.monotonic(),
+            "last_report": time.monotonic()
+        }
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def sync_agent(aid: str):
+            async with semaphore:
+                try:
+                    await self._sync_agent(aid, batch_size, checkpoint, targets, checkpoint_path, progress, progress_interval)
+                except Exception as e:
+                    progress["failed_agents"] += 1
+                    offset = self._resume_offset(self.bridge.agent_memories.get(aid, []), checkpoint.get(aid))
+                    logger.error(f"Sync failed for {aid} at memory {offset}: {e}")
+        
+        await asyncio.gather(*(sync_agent(aid) for aid in agents_to_sync))
+        
+        elapsed = time.monotonic() - progress["started"]
+        logger.info(
+            f"✓ Synced {progress['synced']} entries to persistent storage in {elapsed:.1f}s "
+            f"({progress['synced'] / elapsed if elapsed else 0:.0f}/s), "
+            f"{progress['skipped']} already present, {progress['failed_agents']} agents failed"
+        )
+        return progress["synced"]
+    
+    async def _sync_agent(
+        self,
+        aid: str,
+        batch_size: int,
+        checkpoint: Dict[str, Dict[str, Any]],
+        targets: Dict[str, Dict[str, Dict[str, Any]]],
+        checkpoint_path: str,
+        progress: Dict[str, Any],
+        progress_interval: float
+    ):
+        """Migrate one agent from its checkpoint, batch by batch."""
+        memories = self.bridge.agent_memories.get(aid, [])
+        offset = self._resume_offset(memories, checkpoint.get(aid))
+        if offset >= len(memories):
+            return
+        
+        stored, legacy = await self._stored_memory_keys(aid)
+        
+        while offset < len(memories):
+            batch = memories[offset:offset + batch_size]
+            contents = []
+            metadata = []
+            for memory in batch:
+                digest = content_hash(memory.content)
+                if (digest, memory.created_at) in stored:
+                    progress["skipped"] += 1
+                    continue
+                if legacy[digest] > 0:
+                    legacy[digest] -= 1
+                    progress["skipped"] += 1
+                    continue
+                stored.add((digest, memory.created_at))
+                contents.append(memory.content)
+                metadata.append({
+                    **to_plain(memory.metadata or {}),
+                    "migrated_from_v1": True,
+                    "original_tags": list(memory.tags),
+                    "original_type": memory.type.value,
+                    "source_created_at": memory.created_at
+                })
             
-            for aid in agents_to_sync:
-                memories = self.bridge.agent_memories.get(aid, [])
-                
-                for memory in memories:
-                    try:
-                        await self.kb.store_knowledge(
-                            agent_id=aid,
-                            content=memory.content,
-                            metadata={
-                                **(memory.metadata or {}),
-                                "migrated_from_v1": True,
-                                "original_tags": memory.tags,
-                                "original_type": memory.type.value
-                            }
-                        )
-                        synced += 1
-                    except Exception as e:
-                        logger.error(f"Failed to sync memory {memory.id}: {e}")
+            if contents:
+                await self.kb.store_knowledge_batch(agent_id=aid, contents=contents, metadata=metadata)
             
-            logger.info(f"✓ Synced {synced} entries to persistent storage")
-            return synced
+            offset += len(batch)
+            checkpoint[aid] = {"offset": offset, "last_id": memories[offset - 1].id}
+            self._save_sync_checkpoint(checkpoint_path, targets)
+            progress["synced"] += len(contents)
+            progress["processed"] += len(batch)
             
-        except Exception as e:
-            logger.error(f"Sync failed: {e}")
-            return synced
+            now = time.monotonic()
+            if now - progress["last_report"] >= progress_interval:
+                progress["last_report"] = now
+                elapsed = now - progress["started"]
+                logger.info(
+                    f"↻ Sync progress: {progress['processed']}/{progress['total']} memories, "
+                    f"{progress['processed'] / elapsed:.0f}/s, {progress['skipped']} already present"
+                )
+    
+    @staticmethod
+    def _resume_offset(memories: List[KnowledgeNode], saved: Optional[Dict[str, Any]]) -> int:
+        """Checkpointed offset, or 0 when memory no longer holds what was checkpointed."""
+        if not isinstance(saved, dict):
+            return 0
+        offset = saved.get("offset", 0)
+        if 0 < offset <= len(memories) and memories[offset - 1].id == saved.get("last_id"):
+            return offset
+        return 0
+    
+    async def _stored_memory_keys(self, aid: str) -> Tuple[Set[Tuple[str, str]], Counter]:
+        """
+        (content hash, creation time) of memories already stored for an agent.
+        
+        Rows written before creation times were recorded are returned as
+        a count per content hash; each one accounts for a single memory.
+        """
+        stored: Set[Tuple[str, str]] = set()
+        legacy: Counter = Counter()
+        for row in await self.kb.get_metadata_values(aid, ["content_hash", "source_created_at"]):
+            if not row["content_hash"]:
+                continue
+            if row["source_created_at"]:
+                stored.add((row["content_hash"], row["source_created_at"]))
+            else:
+                legacy[row["content_hash"]] += 1
+        return stored, legacy
+    
+    def _sync_target(self) -> str:
+        """Identify the database a sync writes to; offsets only apply to it."""
+        client = self.kb.supabase
+        return getattr(client, "supabase_url", None) or getattr(client, "rest_url", None) or "default"
+    
+    def _load_sync_checkpoint(self, path: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Per-target, per-agent progress from a checkpoint file."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("targets", {})
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable sync checkpoint {path}: {e}")
+            return {}
+    
+    def _save_sync_checkpoint(self, path: str, targets: Dict[str, Dict[str, Dict[str, Any]]]):
+        """Atomically write per-target, per-agent progress (memories already handled)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"targets": targets}, f)
+        os.replace(tmp, path)
 
 
 class EnhancedKnowledgeableAgent(KnowledgeableAgent):
@@ -0,0 +1,280 @@
+"""
+Shared fixtures for the Python test suites
+Loads the hyphenated Arcanea modules under their import names and provides
+an in-memory stand-in for the Supabase client
+"""
+
+import importlib.util
+import re
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = {
+    "arcanea_infogenius_bridge": "arcanea-infogenius-bridge.py",
+    "arcanea_knowledge_base_v2": "arcanea-knowledge-base-v2.py",
+    "arcanea_unified_knowledge": "arcanea-unified-knowledge.py",
+    "arcanea_mcp_client_v2": "arcanea-mcp-client-v2.py",
+}
+
+
+def load_module(name: str):
+    """Import one of the hyphenated top-level modules as `name`"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, ROOT / MODULES[name])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[name]
+        raise
+    return module
+
+
+@pytest.fixture(scope="session")
+def bridge_module():
+    return load_module("arcanea_infogenius_bridge")
+
+
+@pytest.fixture(scope="session")
+def kb_module():
+    return load_module("arcanea_knowledge_base_v2")
+
+
+@pytest.fixture(scope="session")
+def unified_module(bridge_module, kb_module):
+    return load_module("arcanea_unified_knowledge")
+
+
+@pytest.fixture(scope="session")
+def mcp_module():
+    return load_module("arcanea_mcp_client_v2")
+
+
+# ============================================================================
+# Fake Supabase
+# ============================================================================
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _split_top_level(expr: str) -> List[str]:
+    """Split a PostgREST logic tree on commas outside quotes and parentheses"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in expr:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    parts.append(current)
+    return parts
+
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    if op == "eq":
+        return actual == expected
+    if op == "in":
+        return actual in expected
+    if actual is None:
+        return False
+    if op == "gt":
+        return actual > expected
+    if op == "gte":
+        return actual >= expected
+    if op == "lt":
+        return actual < expected
+    if op == "lte":
+        return actual <= expected
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def _parse_logic(expr: str, conjunction: str = "or") -> Callable[[Dict[str, Any]], bool]:
+    """Compile a PostgREST or=(...) filter such as `a.gt.1,and(a.eq.1,id.gt.x)`"""
+    terms = []
+    for part in _split_top_level(expr):
+        nested = re.fullmatch(r"(and|or)\((.*)\)", part)
+        if nested:
+            terms.append(_parse_logic(nested.group(2), nested.group(1)))
+        else:
+            column, op, value = part.split(".", 2)
+            value = _unquote(value)
+            terms.append(lambda row, c=column, o=op, v=value: _compare(o, row.get(c), v))
+    combine = any if conjunction == "or" else all
+    return lambda row: combine(term(row) for term in terms)
+
+
+def _project(row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+    """Apply a select list, including `alias:column->key` JSON paths"""
+    if columns.strip() == "*":
+        return dict(row)
+    projected = {}
+    for column in (c.strip() for c in columns.split(",")):
+        alias, _, path = column.rpartition(":")
+        path_match = re.fullmatch(r"(\w+)->>?(\w+)", path)
+        if path_match:
+            value = (row.get(path_match.group(1)) or {}).get(path_match.group(2))
+            projected[alias or path_match.group(2)] = value
+        else:
+            projected[alias or path] = row.get(path)
+    return projected
+
+
+class FakeQuery:
+    """Chainable table query mirroring the postgrest-py builder surface we use"""
+    
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.columns = "*"
+        self.count_mode: Optional[str] = None
+        self.operation = "select"
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.ordering: List[tuple] = []
+        self.row_limit: Optional[int] = None
+    
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        self.columns = columns
+        self.count_mode = count
+        return self
+    
+    def _filter(self, op: str, column: str, value: Any):
+        self.filters.append(lambda row: _compare(op, row.get(column), value))
+        return self
+    
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+    
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+    
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+    
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+    
+    def in_(self, column, values):
+        return self._filter("in", column, list(values))
+    
+    def or_(self, expr: str):
+        self.filters.append(_parse_logic(expr))
+        return self
+    
+    def order(self, column: str, desc: bool = False):
+        self.ordering.append((column, desc))
+        return self
+    
+    def limit(self, count: int):
+        self.row_limit = count
+        return self
+    
+    def insert(self, payload):
+        self.operation, self.payload = "insert", payload
+        return self
+    
+    def upsert(self, payload, on_conflict: Optional[str] = None):
+        self.operation, self.payload, self.on_conflict = "upsert", payload, on_conflict
+        return self
+    
+    def update(self, payload):
+        self.operation, self.payload = "update", payload
+        return self
+    
+    def delete(self):
+        self.operation = "delete"
+        return self
+    
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(check(row) for check in self.filters)
+    
+    def execute(self):
+        self.db.requests.append((self.table, self.operation))
+        if self.table in self.db.failing_tables:
+            raise self.db.failing_tables[self.table]
+        rows = self.db.tables.setdefault(self.table, [])
+        
+        if self.operation in ("insert", "upsert"):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            if self.operation == "upsert" and self.on_conflict:
+                keys = {item.get(self.on_conflict) for item in payload}
+                rows[:] = [row for row in rows if row.get(self.on_conflict) not in keys]
+            rows.extend(dict(item) for item in payload)
+            return SimpleNamespace(data=[dict(item) for item in payload], count=None)
+        
+        if self.operation == "update":
+            updated = []
+            for row in rows:
+                if self._matches(row):
+                    row.update(self.payload)
+                    updated.append(dict(row))
+            return SimpleNamespace(data=updated, count=None)
+        
+        if self.operation == "delete":
+            deleted = [row for row in rows if self._matches(row)]
+            rows[:] = [row for row in rows if not self._matches(row)]
+            return SimpleNamespace(data=deleted, count=None)
+        
+        selected = [row for row in rows if self._matches(row)]
+        total = len(selected) if self.count_mode else None
+        for column, desc in reversed(self.ordering):
+            selected.sort(key=lambda row: row.get(column), reverse=desc)
+        if self.row_limit is not None:
+            selected = selected[:self.row_limit]
+        return SimpleNamespace(data=[_project(row, self.columns) for row in selected], count=total)
+
+
+class FakeSupabase:
+    """
+    In-memory Supabase client
+    
+    Tables are plain lists of row dicts. RPCs are answered by callables
+    registered in `rpcs`; unregistered ones raise like a missing function.
+    """
+    
+    def __init__(self, supabase_url: str = "https://test.supabase.co"):
+        self.supabase_url = supabase_url
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.rpcs: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.failing_tables: Dict[str, Exception] = {}
+        self.requests: List[tuple] = []
+    
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+    
+    def rpc(self, name: str, params: Dict[str, Any]):
+        def execute():
+            self.requests.append((name, "rpc"))
+            handler = self.rpcs.get(name)
+            if handler is None:
+                error = Exception(f"Could not find the function public.{name}")
+                error.code = "PGRST202"
+                raise error
+            return SimpleNamespace(data=handler(params))
+        return SimpleNamespace(execute=execute)
+    
+    def count(self, table: str, operation: str = "select") -> int:
+        return sum(1 for request in self.requests if request == (table, operation))
+
+
+@pytest.fixture
+def fake_supabase():
+    """Create an empty in-memory Supabase client"""
+    return FakeSupabase()
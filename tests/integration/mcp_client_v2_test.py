@@ -0,0 +1,626 @@
+"""
+Integration Tests for MCP Client v2
+Drives ArcaneaMCPClient against an in-process MCP server (httpx.MockTransport)
+to test circuit breakers, bulkheads, deadlines, coalescing, hedging and batching
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import pytest
+
+
+class MockMCPServer:
+    """Scriptable MCP server: per-tool handlers plus request bookkeeping"""
+    
+    def __init__(self):
+        self.tools: Dict[str, Callable] = {}
+        self.batch: Optional[Callable] = None
+        self.requests: List[httpx.Request] = []
+        self.active: Dict[str, int] = {}
+        self.max_active: Dict[str, int] = {}
+    
+    def calls(self, tool: str) -> int:
+        path = f"/mcp/tools/{tool}/invoke"
+        return sum(1 for request in self.requests if request.url.path == path)
+    
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path
+        if path == "/mcp/health":
+            return httpx.Response(200, json={"status": "healthy"})
+        if path == "/mcp/mcp/tools":
+            return httpx.Response(200, json={"tools": [{"name": name} for name in self.tools]})
+        if path == "/mcp/tools/batch":
+            if self.batch is None:
+                return httpx.Response(404)
+            return await self.batch(request, json.loads(request.content))
+        
+        tool = path.split("/")[3]
+        handler = self.tools.get(tool)
+        if handler is None:
+            return httpx.Response(404)
+        self.active[tool] = self.active.get(tool, 0) + 1
+        self.max_active[tool] = max(self.max_active.get(tool, 0), self.active[tool])
+        # MockTransport ignores timeouts; enforce the read timeout like a socket would
+        read_timeout = request.extensions.get("timeout", {}).get("read")
+        try:
+            return await asyncio.wait_for(handler(request), read_timeout)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout("read timed out", request=request)
+        finally:
+            self.active[tool] -= 1
+
+
+def respond(result: Any = "ok", status: int = 200, delay: float = 0.0):
+    """Handler answering every call the same way"""
+    async def handler(request):
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(status, json={"result": result})
+    return handler
+
+
+@pytest.fixture
+def server():
+    return MockMCPServer()
+
+
+@pytest.fixture
+def make_client(mcp_module, server):
+    """Create ArcaneaMCPClient instances wired to the mock server"""
+    def _make(**overrides):
+        config = mcp_module.MCPConfig(
+            base_url="http://mcp.test",
+            api_key="test-key",
+            max_retries=0,
+            retry_wait_min=0,
+            retry_wait_max=0,
+            **overrides
+        )
+        client = mcp_module.ArcaneaMCPClient(config)
+        client._client = httpx.AsyncClient(
+            base_url=config.base_url,
+            transport=httpx.MockTransport(server.handle)
+        )
+        return client
+    return _make
+
+
+class TestCircuitBreakers:
+    """Test per-tool circuit breakers"""
+    
+    @pytest.mark.asyncio
+    async def test_failing_tool_opens_only_its_own_circuit(self, make_client, server):
+        """Test that one tool's failures do not block other tools"""
+        # Arrange
+        server.tools["code_analysis"] = respond(status=500)
+        server.tools["documentation_search"] = respond({"results": []})
+        client = make_client(circuit_breaker_threshold=3, circuit_breaker_window=3)
+        await client.connect()
+        
+        # Act
+        failures = [await client.analyze_code("print(1)") for _ in range(4)]
+        search = await client.search_docs("runes")
+        
+        # Assert
+        assert all(result["fallback"] for result in failures)
+        assert server.calls("code_analysis") == 3
+        assert client.get_stats()["open_circuits"] == ["/tools/code_analysis/invoke"]
+        assert search["success"] is True
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_half_open_probe_closes_circuit(self, mcp_module):
+        """Test that a successful probe after recovery closes the circuit"""
+        # Arrange
+        breaker = mcp_module.CircuitBreaker(threshold=2, recovery_time=0, window_size=2)
+        
+        async def fail():
+            raise RuntimeError("boom")
+        
+        async def succeed():
+            return "ok"
+        
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.call(fail)
+        assert breaker.state == mcp_module.CircuitState.OPEN
+        
+        # Act
+        result = await breaker.call(succeed)
+        
+        # Assert
+        assert result == "ok"
+        assert breaker.state == mcp_module.CircuitState.CLOSED
+    
+    
+    @pytest.mark.asyncio
+    async def test_slow_calls_are_timed_per_attempt(self, make_client, server):
+        """Test that retry backoff does not make fast attempts count as slow"""
+        # Arrange
+        attempts = {"count": 0}
+        
+        async def flaky(request):
+            attempts["count"] += 1
+            if attempts["count"] % 2:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, json={"result": "ok"})
+        
+        server.tools["documentation_search"] = flaky
+        client = make_client(
+            circuit_breaker_threshold=2,
+            circuit_breaker_window=4,
+            circuit_breaker_failure_rate=1.0,
+            circuit_breaker_slow_call_duration=0.05
+        )
+        client.config.max_retries = 1
+        client.config.retry_wait_min = client.config.retry_wait_max = 0.1
+        await client.connect()
+        
+        # Act
+        results = [await client.search_docs(f"query {i}") for i in range(2)]
+        
+        # Assert
+        assert all(result["success"] for result in results)
+        state = client.get_stats()["circuit_breakers"]["/tools/documentation_search/invoke"]
+        assert state["state"] == "closed"
+        assert state["slow_call_rate"] == 0
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_slow_batch_items_count_as_slow_calls(self, make_client, server):
+        """Test that batched items are timed by the batch that carried them"""
+        # Arrange
+        async def batch(request, body):
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json={"results": [
+                {"id": item["id"], "result": "ok"} for item in body["requests"]
+            ]})
+        
+        server.batch = batch
+        client = make_client(
+            batch_endpoint="/tools/batch",
+            circuit_breaker_threshold=2,
+            circuit_breaker_window=2,
+            circuit_breaker_slow_call_duration=0.05
+        )
+        await client.connect()
+        
+        # Act
+        for _ in range(2):
+            await client.invoke_many([("documentation_search", {})])
+        
+        # Assert
+        assert "/tools/documentation_search/invoke" in client.get_stats()["open_circuits"]
+        await client.close()
+    
+    
+    @pytest.mark.asyncio
+    async def test_batched_item_failures_open_tool_circuit(self, make_client, server):
+        """Test that batch items report to their tool's breaker"""
+        # Arrange
+        async def batch(request, body):
+            return httpx.Response(200, json={"results": [
+                {"id": item["id"], "error": "bad input"} if item["tool"] == "code_analysis"
+                else {"id": item["id"], "result": "ok"}
+                for item in body["requests"]
+            ]})
+        
+        server.batch = batch
+        client = make_client(batch_endpoint="/tools/batch", circuit_breaker_threshold=3, circuit_breaker_window=3)
+        await client.connect()
+        
+        # Act
+        for _ in range(3):
+            results = await client.invoke_many([("documentation_search", {}), ("code_analysis", {})])
+        
+        # Assert
+        assert [result["success"] for result in results] == [True, False]
+        assert client.get_stats()["open_circuits"] == ["/tools/code_analysis/invoke"]
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_open_tools_are_left_out_of_the_batch(self, make_client, server):
+        """Test that an OPEN tool gets its fallback without reaching the server"""
+        # Arrange
+        async def batch(request, body):
+            return httpx.Response(200, json={"results": [
+                {"id": item["id"], "error": "bad input"} if item["tool"] == "code_analysis"
+                else {"id": item["id"], "result": "ok"}
+                for item in body["requests"]
+            ]})
+        
+        server.batch = batch
+        client = make_client(batch_endpoint="/tools/batch", circuit_breaker_threshold=2, circuit_breaker_window=2)
+        await client.connect()
+        for _ in range(2):
+            await client.invoke_many([("documentation_search", {}), ("code_analysis", {})])
+        server.requests.clear()
+        
+        # Act
+        results = await client.invoke_many([("documentation_search", {}), ("code_analysis", {})])
+        
+        # Assert
+        assert [result["success"] for result in results] == [True, False]
+        assert results[1]["fallback"] is True
+        assert [json.loads(request.content)["requests"] for request in server.requests] == [
+            [{"id": 0, "tool": "documentation_search", "parameters": {}}]
+        ]
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_recovered_tool_is_probed_singly_and_closes(self, make_client, server):
+        """Test that a tool past its recovery time is probed outside the batch"""
+        # Arrange
+        async def batch(request, body):
+            return httpx.Response(200, json={"results": [
+                {"id": item["id"], "error": "bad input"} for item in body["requests"]
+            ]})
+        
+        server.batch = batch
+        server.tools["code_analysis"] = respond()
+        client = make_client(
+            batch_endpoint="/tools/batch",
+            circuit_breaker_threshold=2,
+            circuit_breaker_window=2,
+            circuit_breaker_recovery=0
+        )
+        await client.connect()
+        for _ in range(2):
+            await client.invoke_many([("code_analysis", {})])
+        
+        # Act
+        results = await client.invoke_many([("code_analysis", {})])
+        
+        # Assert
+        assert results[0]["success"] is True
+        assert server.calls("code_analysis") == 1
+        assert client.get_stats()["open_circuits"] == []
+        await client.close()
+
+
+class TestBulkheads:
+    """Test per-tool concurrency limits"""
+    
+    @pytest.mark.asyncio
+    async def test_tool_concurrency_is_capped(self, make_client, server):
+        """Test that a slow tool holds at most its own slots"""
+        # Arrange
+        server.tools["data_processing"] = respond(delay=0.05)
+        server.tools["documentation_search"] = respond(delay=0.05)
+        client = make_client(tool_concurrency={"data_processing": 2})
+        await client.connect()
+        
+        # Act
+        results = await asyncio.gather(
+            *(client.process_data([i], "sum") for i in range(6)),
+            *(client.search_docs(f"query {i}") for i in range(4))
+        )
+        
+        # Assert
+        assert all(result["success"] for result in results)
+        assert server.max_active["data_processing"] == 2
+        assert server.max_active["documentation_search"] == 4
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_priority_waiters_go_first(self, mcp_module):
+        """Test that interactive calls overtake queued batch work"""
+        # Arrange
+        bulkhead = mcp_module.Bulkhead("image_generation", max_concurrent=1)
+        await bulkhead.acquire()
+        order = []
+        
+        async def wait(name, priority):
+            async with bulkhead.slot(priority):
+                order.append(name)
+        
+        batch = asyncio.ensure_future(wait("batch", mcp_module.RequestPriority.BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(wait("interactive", mcp_module.RequestPriority.INTERACTIVE))
+        await asyncio.sleep(0)
+        
+        # Act
+        bulkhead.release()
+        await asyncio.gather(batch, interactive)
+        
+        # Assert
+        assert order == ["interactive", "batch"]
+        assert bulkhead.get_stats()["active"] == 0
+
+
+class TestDeadlines:
+    """Test timeout budgets and deadline propagation"""
+    
+    @pytest.mark.asyncio
+    async def test_budget_bounds_a_slow_call(self, make_client, server):
+        """Test that a slow server yields a fallback within the budget"""
+        # Arrange
+        server.tools["documentation_search"] = respond(delay=1.0)
+        client = make_client()
+        await client.connect()
+        
+        # Act
+        start = time.monotonic()
+        result = await client.invoke_tool("documentation_search", {"query": "runes"}, timeout_budget=0.1)
+        elapsed = time.monotonic() - start
+        
+        # Assert
+        assert result["fallback"] is True
+        assert "Timeout budget" in result["error"]
+        assert elapsed < 0.5
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_remaining_budget_is_sent_to_server(self, make_client, server):
+        """Test that the deadline header carries the remaining milliseconds"""
+        # Arrange
+        server.tools["documentation_search"] = respond()
+        client = make_client()
+        await client.connect()
+        
+        # Act
+        await client.invoke_tool("documentation_search", {"query": "runes"}, timeout_budget=5)
+        
+        # Assert
+        remaining = int(server.requests[-1].headers["X-Request-Deadline-Ms"])
+        assert 4000 < remaining <= 5000
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_coalesced_follower_keeps_its_own_budget(self, make_client, server):
+        """Test that a follower outlives a leader with a tighter budget"""
+        # Arrange
+        server.tools["documentation_search"] = respond({"results": ["rune"]}, delay=0.2)
+        client = make_client(idempotent_tools={"documentation_search"})
+        await client.connect()
+        params = {"query": "runes"}
+        
+        # Act
+        leader = asyncio.ensure_future(client.invoke_tool("documentation_search", params, timeout_budget=0.05))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(client.invoke_tool("documentation_search", params, timeout_budget=2))
+        leader_result, follower_result = await asyncio.gather(leader, follower)
+        
+        # Assert
+        assert leader_result["fallback"] is True
+        assert follower_result["success"] is True
+        assert follower_result["data"] == {"results": ["rune"]}
+        assert server.calls("documentation_search") == 1
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_flight_is_cancelled_when_every_caller_gives_up(self, make_client, server):
+        """Test that an abandoned coalesced flight frees its bulkhead slot"""
+        # Arrange
+        server.tools["documentation_search"] = respond(delay=1.0)
+        client = make_client(idempotent_tools={"documentation_search"})
+        await client.connect()
+        params = {"query": "runes"}
+        
+        # Act
+        results = await asyncio.gather(
+            client.invoke_tool("documentation_search", params, timeout_budget=0.05),
+            client.invoke_tool("documentation_search", params, timeout_budget=0.1)
+        )
+        await asyncio.sleep(0.05)
+        
+        # Assert
+        assert all(result["fallback"] for result in results)
+        assert server.calls("documentation_search") == 1
+        assert server.active["documentation_search"] == 0
+        assert client._get_bulkhead("documentation_search").get_stats()["active"] == 0
+        assert client.get_stats()["single_flight"]["in_flight"] == 0
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_exceeded_budget_is_not_a_tool_failure(self, mcp_module, make_client, server):
+        """Test that running out of our own budget leaves the circuit closed"""
+        # Arrange
+        server.tools["documentation_search"] = respond(delay=1.0)
+        client = make_client(circuit_breaker_threshold=1, circuit_breaker_window=1)
+        await client.connect()
+        endpoint = "/tools/documentation_search/invoke"
+        
+        # Act
+        with pytest.raises(mcp_module.DeadlineExceededError):
+            await client._make_request("POST", endpoint, data={}, use_cache=False, deadline=time.monotonic() - 1)
+        with pytest.raises(mcp_module.DeadlineExceededError):
+            await client._make_request("POST", endpoint, data={}, use_cache=False, deadline=time.monotonic() + 0.05)
+        
+        # Assert
+        assert client.get_stats()["open_circuits"] == []
+        await client.close()
+
+
+class TestHedging:
+    """Test hedged requests for slow read-only tools"""
+    
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged(self, make_client, server):
+        """Test that a straggler is raced by a second copy that wins"""
+        # Arrange
+        slow = {"next": False}
+        
+        async def handler(request):
+            if slow["next"]:
+                slow["next"] = False
+                await asyncio.sleep(1.0)
+            else:
+                await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"result": "ok"})
+        
+        server.tools["documentation_search"] = handler
+        client = make_client(hedged_tools={"documentation_search"}, hedge_min_samples=5, hedge_budget_percent=50)
+        await client.connect()
+        for i in range(5):
+            await client.search_docs(f"warm up {i}")
+        
+        # Act
+        slow["next"] = True
+        start = time.monotonic()
+        result = await client.search_docs("straggler")
+        elapsed = time.monotonic() - start
+        
+        # Assert
+        hedging = client.get_stats()["hedging"]
+        assert result["success"] is True
+        assert elapsed < 0.5
+        assert hedging["hedges_sent"] == 1
+        assert hedging["hedge_wins"] == 1
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_hedge_gets_fresh_budget_or_is_skipped(self, make_client, server, monkeypatch):
+        """Test that the hedge recomputes its deadline header and needs budget left"""
+        # Arrange
+        server.tools["documentation_search"] = respond(delay=0.2)
+        client = make_client(hedged_tools={"documentation_search"}, hedge_budget_percent=100)
+        client._client.headers.clear()
+        monkeypatch.setattr(client._latency, "percentile", lambda endpoint, percentile: 0.05)
+        endpoint = "/tools/documentation_search/invoke"
+        url = "/mcp" + endpoint
+        
+        # Act
+        deadline = time.monotonic() + 1.0
+        await client._hedged_send(endpoint, "POST", url, {}, {"X-Request-Deadline-Ms": "1000"}, 1.0, deadline)
+        hedged = [request.headers["X-Request-Deadline-Ms"] for request in server.requests]
+        server.requests.clear()
+        
+        deadline = time.monotonic() + 0.03
+        await client._hedged_send(endpoint, "POST", url, {}, {"X-Request-Deadline-Ms": "30"}, 1.0, deadline)
+        
+        # Assert
+        assert hedged[0] == "1000"
+        assert int(hedged[1]) < 1000
+        assert len(server.requests) == 1
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_unused_hedge_budget_is_capped(self, make_client, server, monkeypatch):
+        """Test that a long fast spell saves up at most hedge_burst hedges"""
+        # Arrange
+        server.tools["documentation_search"] = respond()
+        client = make_client(hedged_tools={"documentation_search"}, hedge_budget_percent=50, hedge_burst=2)
+        endpoint = "/tools/documentation_search/invoke"
+        url = "/mcp" + endpoint
+        monkeypatch.setattr(client._latency, "percentile", lambda endpoint, percentile: None)
+        for _ in range(100):
+            await client._hedged_send(endpoint, "POST", url, {}, {}, 1.0)
+        server.tools["documentation_search"] = respond(delay=0.05)
+        monkeypatch.setattr(client._latency, "percentile", lambda endpoint, percentile: 0.01)
+        
+        # Act
+        await asyncio.gather(*(client._hedged_send(endpoint, "POST", url, {}, {}, 1.0) for _ in range(10)))
+        
+        # Assert
+        assert client.get_stats()["hedging"]["hedges_sent"] == 2
+        await client.close()
+
+
+class TestBatching:
+    """Test batched invocation and its fallbacks"""
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_to_single_calls(self, make_client, server):
+        """Test that a 5xx batch is retried as concurrent invoke_tool calls"""
+        # Arrange
+        async def batch(request, body):
+            return httpx.Response(503)
+        
+        server.batch = batch
+        server.tools["documentation_search"] = respond()
+        server.tools["data_processing"] = respond()
+        client = make_client(batch_endpoint="/tools/batch")
+        await client.connect()
+        
+        # Act
+        results = await client.invoke_many([("documentation_search", {}), ("data_processing", {})])
+        
+        # Assert
+        assert [result["success"] for result in results] == [True, True]
+        assert server.calls("documentation_search") == 1
+        assert client._batch_supported is True
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_missing_batch_endpoint_disables_batching(self, make_client, server):
+        """Test that a 404 switches invoke_many to single calls for good"""
+        # Arrange
+        server.tools["documentation_search"] = respond()
+        client = make_client(batch_endpoint="/tools/batch")
+        await client.connect()
+        
+        # Act
+        await client.invoke_many([("documentation_search", {})])
+        await client.invoke_many([("documentation_search", {})])
+        
+        # Assert
+        batch_requests = [r for r in server.requests if r.url.path == "/mcp/tools/batch"]
+        assert len(batch_requests) == 1
+        assert client._batch_supported is False
+        assert server.calls("documentation_search") == 2
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_single_calls_after_failed_batch_keep_its_deadline(self, make_client, server):
+        """Test that retrying a failed batch singly does not restart the budget"""
+        # Arrange
+        async def batch(request, body):
+            await asyncio.sleep(0.2)
+            return httpx.Response(503)
+        
+        server.batch = batch
+        server.tools["documentation_search"] = respond(delay=1.0)
+        client = make_client(batch_endpoint="/tools/batch")
+        await client.connect()
+        
+        # Act
+        start = time.monotonic()
+        results = await client.invoke_many([("documentation_search", {})], timeout_budget=0.3)
+        elapsed = time.monotonic() - start
+        
+        # Assert
+        assert results[0]["fallback"] is True
+        assert "Timeout budget" in results[0]["error"]
+        assert elapsed < 0.45
+        await client.close()
+
+
+class TestRequestCache:
+    """Test the bounded response cache"""
+    
+    @pytest.mark.asyncio
+    async def test_least_recently_used_entry_is_evicted(self, mcp_module):
+        """Test LRU eviction by entry count"""
+        # Arrange
+        cache = mcp_module.RequestCache(max_entries=2)
+        await cache.set("a", {"v": 1})
+        await cache.set("b", {"v": 2})
+        await cache.get("a")
+        
+        # Act
+        await cache.set("c", {"v": 3})
+        
+        # Assert
+        assert await cache.get("a") == {"v": 1}
+        assert await cache.get("b") is None
+        assert cache.get_stats()["evictions"] == 1
+        await cache.close()
+    
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_dropped(self, mcp_module):
+        """Test TTL expiry on read"""
+        # Arrange
+        cache = mcp_module.RequestCache(ttl_seconds=0)
+        
+        # Act
+        await cache.set("a", {"v": 1})
+        
+        # Assert
+        assert await cache.get("a") is None
+        await cache.close()
@@ -0,0 +1,3 @@
+"""
+Python behaviour tests for the Arcanea knowledge modules
+"""
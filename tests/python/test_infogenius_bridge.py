@@ -0,0 +1,426 @@
+"""
+Behaviour Tests for the InfoGenius Bridge
+Tests the columnar memory stores, their recall and search indexes, and
+opt-in persistence
+"""
+
+import asyncio
+import hashlib
+import os
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def bridge(bridge_module, tmp_path):
+    """Create an in-memory bridge"""
+    return bridge_module.InfoGeniusArcaneaBridge(storage_path=str(tmp_path))
+
+
+def persistent_bridge(bridge_module, path, **kwargs):
+    return bridge_module.InfoGeniusArcaneaBridge(storage_path=str(path), persist=True, **kwargs)
+
+
+def make_node(bridge_module, node_id: str, content: str, tags=("fire",)):
+    return bridge_module.KnowledgeNode(
+        id=node_id,
+        type=bridge_module.KnowledgeType.INSIGHT,
+        content=content,
+        tags=list(tags),
+        source="dragon-forge",
+        metadata={"confidence": 0.9}
+    )
+
+
+class TestAgentMemoryStore:
+    """Test the columnar per-agent store"""
+    
+    def test_nodes_are_read_only(self, bridge_module):
+        """Test that in-place edits fail instead of being silently lost"""
+        # Arrange
+        store = bridge_module.AgentMemoryStore([make_node(bridge_module, "n1", "dragons breathe fire")])
+        node = store[0]
+        
+        # Act / Assert
+        with pytest.raises(AttributeError):
+            node.tags.append("lost")
+        with pytest.raises(TypeError):
+            node.metadata["verified"] = True
+        assert store[0].tags == ("fire",)
+    
+    def test_replacement_bumps_revision(self, bridge_module):
+        """Test that writing a node back is visible and versioned"""
+        # Arrange
+        store = bridge_module.AgentMemoryStore([make_node(bridge_module, "n1", "dragons breathe fire")])
+        node = store[0]
+        
+        # Act
+        store[0] = bridge_module.KnowledgeNode(
+            id=node.id, type=node.type, content=node.content, tags=[*node.tags, "verified"],
+            source=node.source, metadata={**node.metadata, "verified": True}
+        )
+        
+        # Assert
+        assert store.revision == 1
+        assert store[0].tags == ("fire", "verified")
+        assert store[0].metadata["verified"] is True
+        assert store.get("n1").content == "dragons breathe fire"
+    
+    def test_intern_tables_are_per_store(self, bridge_module):
+        """Test that one agent's tags are not retained by another store"""
+        # Arrange
+        first = bridge_module.AgentMemoryStore([make_node(bridge_module, "n1", "a", tags=("only-here",))])
+        second = bridge_module.AgentMemoryStore()
+        
+        # Assert
+        assert ("only-here",) in first._interned_tags
+        assert second._interned_tags == {}
+    
+    @pytest.mark.asyncio
+    async def test_replacement_refreshes_recall_and_search(self, bridge_module, bridge):
+        """Test that both indexes pick up a replaced memory"""
+        # Arrange
+        node = await bridge.agent_learn("dragon-forge", {"content": "embers glow", "tags": ["fire"]})
+        await bridge.agent_learn("dragon-forge", {"content": "rivers flow", "tags": ["water"]})
+        await bridge.agent_learn("dragon-forge", {"content": "embers fade", "tags": ["fire"]})
+        assert (await bridge.agent_recall("dragon-forge", "embers", limit=1))[0].content == "embers glow"
+        
+        # Act
+        bridge.agent_memories["dragon-forge"][0] = make_node(bridge_module, node.id, "frost settles", tags=("ice",))
+        
+        # Assert - recall ranks every memory (ties by age), so check the top hit
+        assert (await bridge.agent_recall("dragon-forge", "embers", limit=1))[0].content == "embers fade"
+        assert (await bridge.agent_recall("dragon-forge", "ice", limit=1))[0].content == "frost settles"
+        assert [n.content for n in await bridge.semantic_search("embers")] == ["embers fade"]
+        assert [n.content for n in await bridge.semantic_search("frost")] == ["frost settles"]
+        assert [n.content for n in await bridge.semantic_search("rivers")] == ["rivers flow"]
+
+
+class TestAgentMemoryStore:
+    """Test the columnar per-agent store"""
+    
+    def test_nodes_are_read_only(self, bridge_module):
+        """Test that in-place edits fail instead of being silently lost"""
+        # Arrange
+        store = bridge_module.AgentMemoryStore([make_node(bridge_module, "n1", "dragons breathe fire")])
+        node = store[0]
+        
+        # Act / Assert
+        with pytest.raises(AttributeError):
+            node.tags.append("lost")
+        with pytest.raises(TypeError):
+            node.metadata["verified"] = True
+        assert store[0].tags == ("fire",)
+    
+    def test_replacement_bumps_revision(self, bridge_module):
+        """Test that writing a node back is visible and versioned"""
+        # Arrange
+        store = bridge_module.AgentMemoryStore([make_node(bridge_module, "n1", "dragons breathe fire")])
+        node = store[0]
+        
+        # Act
+        store[0] = bridge_module.KnowledgeNode(
+            id=node.id, type=node.type, content=node.content, tags=[*node.tags, "verified"],
+            source=node.source, metadata={**node.metadata, "verified": True}
+        )
+        
+        # Assert
+        assert store.revision == 1
+        assert store[0].tags == ("fire", "verified")
+        assert store[0].metadata["verified"] is True
+        assert store.get("n1").content == "dragons breathe fire"
+    
+    def test_intern_tables_are_per_store(self, bridge_module):
+        """Test that one agent's tags are not retained by another store"""
+        # Arrange
+        first = bridge_module.AgentMemoryStore([make_node(bridge_module, "n1", "a", tags=("only-here",))])
+        second = bridge_module.AgentMemoryStore()
+        
+        # Assert
+        assert ("only-here",) in first._interned_tags
+        assert second._interned_tags == {}
+    
+    def test_nested_metadata_is_frozen(self, bridge_module):
+        """Test that nested metadata is neither editable nor shared with the store"""
+        # Arrange
+        node = make_node(bridge_module, "n1", "dragons breathe fire")
+        node.metadata["learning_context"] = {"runes": ["fire"]}
+        store = bridge_module.AgentMemoryStore([node])
+        
+        # Act
+        plain = bridge_module.to_plain(store[0].metadata)
+        plain["learning_context"]["runes"].append("ice")
+        
+        # Assert
+        with pytest.raises(TypeError):
+            store[0].metadata["learning_context"]["runes"] = ["ice"]
+        with pytest.raises(AttributeError):
+            store[0].metadata["learning_context"]["runes"].append("ice")
+        assert store[0].metadata["learning_context"]["runes"] == ("fire",)
+        assert plain == {"confidence": 0.9, "learning_context": {"runes": ["fire", "ice"]}}
+    
+    def test_lowercased_content_is_shared(self, bridge_module):
+        """Test that indexes reuse one lowercased copy of each content"""
+        # Arrange
+        store = bridge_module.AgentMemoryStore([
+            make_node(bridge_module, "n1", "embers glow"),
+            make_node(bridge_module, "n2", "Embers Glow")
+        ])
+        recall = bridge_module.AgentRecallIndex()
+        search = bridge_module.KnowledgeSearchIndex()
+        
+        # Act
+        for row in range(len(store)):
+            recall.add(store[row], content_lower=store.content_lower_at(row))
+        search.sync("dragon-forge", store)
+        
+        # Assert
+        assert store.content_lower_at(0) is store[0].content
+        assert store.content_lower_at(1) == "embers glow"
+        for row in range(2):
+            assert recall._contents[row] is store.content_lower_at(row)
+            assert search._content_lower[row] is store.content_lower_at(row)
+    
+    def test_replacement_reindexes_one_row(self, bridge_module):
+        """Test that an edit re-indexes only the replaced memory"""
+        # Arrange
+        store = bridge_module.AgentMemoryStore(
+            [make_node(bridge_module, f"n{i}", f"memory {i}") for i in range(10)]
+        )
+        index = bridge_module.KnowledgeSearchIndex()
+        index.sync("dragon-forge", store)
+        
+        # Act
+        store[3] = make_node(bridge_module, "n3", "frost settles", tags=("ice",))
+        index.sync("dragon-forge", store)
+        
+        # Assert
+        assert len(index._owners) == 11
+        assert index._dead == {3}
+        assert [n.content for n in index.search("frost")] == ["frost settles"]
+        assert index.search("memory 3") == []
+    
+    def test_retired_positions_are_compacted(self, bridge_module):
+        """Test that repeated edits do not grow the index without bound"""
+        # Arrange
+        store = bridge_module.AgentMemoryStore(
+            [make_node(bridge_module, f"n{i}", f"memory {i}") for i in range(10)]
+        )
+        index = bridge_module.KnowledgeSearchIndex()
+        index.sync("dragon-forge", store)
+        
+        # Act
+        for edit in range(100):
+            store[edit % 10] = make_node(bridge_module, f"n{edit % 10}", f"memory {edit % 10} edit {edit}")
+            index.sync("dragon-forge", store)
+        
+        # Assert
+        assert len(index) == 10
+        assert len(index._owners) <= 21
+        assert len(index._dead) <= 10
+        assert "80" not in index._content_postings
+        assert [n.content for n in index.search("edit 99")] == ["memory 9 edit 99"]
+        assert [n.content for n in index.search("memory")][:1] == ["memory 0 edit 90"]
+    
+    @pytest.mark.asyncio
+    async def test_replacement_refreshes_recall_and_search(self, bridge_module, bridge):
+        """Test that both indexes pick up a replaced memory"""
+        # Arrange
+        node = await bridge.agent_learn("dragon-forge", {"content": "embers glow", "tags": ["fire"]})
+        await bridge.agent_learn("dragon-forge", {"content": "rivers flow", "tags": ["water"]})
+        await bridge.agent_learn("dragon-forge", {"content": "embers fade", "tags": ["fire"]})
+        assert (await bridge.agent_recall("dragon-forge", "embers", limit=1))[0].content == "embers glow"
+        
+        # Act
+        bridge.agent_memories["dragon-forge"][0] = make_node(bridge_module, node.id, "frost settles", tags=("ice",))
+        
+        # Assert - recall ranks every memory (ties by age), so check the top hit
+        assert (await bridge.agent_recall("dragon-forge", "embers", limit=1))[0].content == "embers fade"
+        assert (await bridge.agent_recall("dragon-forge", "ice", limit=1))[0].content == "frost settles"
+        assert [n.content for n in await bridge.semantic_search("embers")] == ["embers fade"]
+        assert [n.content for n in await bridge.semantic_search("frost")] == ["frost settles"]
+        assert [n.content for n in await bridge.semantic_search("rivers")] == ["rivers flow"]
+
+
+class TestMemoryLog:
+    """Test opt-in, log-structured persistence"""
+    
+    @pytest.mark.asyncio
+    async def test_persistence_is_off_by_default(self, bridge, tmp_path):
+        """Test that the default bridge writes nothing to disk"""
+        # Act
+        await bridge.initialize()
+        await bridge.agent_learn("dragon-forge", {"content": "embers glow"})
+        await bridge.close()
+        
+        # Assert
+        assert os.listdir(tmp_path) == []
+    
+    @pytest.mark.asyncio
+    async def test_memories_survive_restart(self, bridge_module, tmp_path):
+        """Test that learned, shared and pattern data reload lazily"""
+        # Arrange
+        bridge = persistent_bridge(bridge_module, tmp_path)
+        await bridge.initialize()
+        node = await bridge.agent_learn("dragon/forge", {"content": "embers glow", "tags": ["fire"]})
+        await bridge.share_knowledge("dragon/forge", ["crystal-arch"], node.id)
+        await bridge.close()
+        
+        # Act
+        reloaded = persistent_bridge(bridge_module, tmp_path)
+        await reloaded.initialize()
+        
+        # Assert
+        assert reloaded.agent_memories.loaded_agents() == []
+        assert sorted(reloaded.agent_memories) == ["crystal-arch", "dragon/forge"]
+        assert reloaded.agent_memories["dragon/forge"][0] == bridge.agent_memories["dragon/forge"][0]
+        assert reloaded.agent_memories["crystal-arch"][0].tags == ("fire", "shared")
+        assert reloaded.patterns == bridge.patterns
+    
+    @pytest.mark.asyncio
+    async def test_compaction_during_appends_is_lossless(self, bridge_module, tmp_path):
+        """Test that background compaction neither drops nor duplicates nodes"""
+        # Arrange
+        bridge = persistent_bridge(bridge_module, tmp_path, compact_min_entries=50)
+        await bridge.initialize()
+        
+        # Act
+        for i in range(400):
+            await bridge.agent_learn("dragon-forge", {"content": f"memory {i}"})
+        await bridge.close()
+        reloaded = persistent_bridge(bridge_module, tmp_path)
+        
+        # Assert
+        agent_dir = os.path.join(tmp_path, "agents", "dragon-forge")
+        assert "snapshot.jsonl" in os.listdir(agent_dir)
+        assert len([name for name in os.listdir(agent_dir) if name.startswith("log.")]) <= 1
+        assert [n.content for n in reloaded.agent_memories["dragon-forge"]] == [f"memory {i}" for i in range(400)]
+    
+    @pytest.mark.asyncio
+    async def test_explicit_compact_then_append(self, bridge_module, tmp_path):
+        """Test that appends after compact() land in the new generation"""
+        # Arrange
+        bridge = persistent_bridge(bridge_module, tmp_path)
+        await bridge.initialize()
+        for i in range(5):
+            await bridge.agent_learn("dragon-forge", {"content": f"memory {i}"})
+        
+        # Act
+        await bridge.compact()
+        await bridge.agent_learn("dragon-forge", {"content": "after compaction"})
+        await bridge.close()
+        reloaded = persistent_bridge(bridge_module, tmp_path)
+        
+        # Assert
+        assert len(reloaded.agent_memories["dragon-forge"]) == 6
+        assert reloaded.agent_memories["dragon-forge"][-1].content == "after compaction"
+    
+    @pytest.mark.asyncio
+    async def test_torn_tail_is_ignored_and_sealed(self, bridge_module, tmp_path):
+        """Test that a partial last line neither breaks loading nor the next append"""
+        # Arrange
+        bridge = persistent_bridge(bridge_module, tmp_path)
+        await bridge.agent_learn("dragon-forge", {"content": "embers glow"})
+        await bridge.close()
+        with open(os.path.join(tmp_path, "agents", "dragon-forge", "log.0.jsonl"), "a") as f:
+            f.write('{"id": "torn')
+        
+        # Act
+        restarted = persistent_bridge(bridge_module, tmp_path)
+        loaded = len(restarted.agent_memories["dragon-forge"])
+        await restarted.agent_learn("dragon-forge", {"content": "after the crash"})
+        await restarted.close()
+        reloaded = persistent_bridge(bridge_module, tmp_path)
+        
+        # Assert
+        assert loaded == 1
+        assert [n.content for n in reloaded.agent_memories["dragon-forge"]] == ["embers glow", "after the crash"]
+    
+    
+    @pytest.mark.asyncio
+    async def test_non_json_context_is_persisted(self, bridge_module, tmp_path):
+        """Test that odd context values neither fail learning nor desync the log"""
+        # Arrange
+        bridge = persistent_bridge(bridge_module, tmp_path)
+        
+        # Act
+        await bridge.agent_learn("dragon-forge", {"content": "embers glow", "context": {"at": datetime(2026, 1, 1)}})
+        await bridge.close()
+        reloaded = persistent_bridge(bridge_module, tmp_path)
+        
+        # Assert
+        node = reloaded.agent_memories["dragon-forge"][0]
+        assert len(reloaded.agent_memories["dragon-forge"]) == 1
+        assert node.metadata["learning_context"]["at"] == "2026-01-01 00:00:00"
+    
+    @pytest.mark.asyncio
+    async def test_replacements_survive_restart(self, bridge_module, tmp_path):
+        """Test that editing a memory in place is logged"""
+        # Arrange
+        bridge = persistent_bridge(bridge_module, tmp_path)
+        for i in range(3):
+            await bridge.agent_learn("dragon-forge", {"content": f"memory {i}"})
+        
+        # Act
+        bridge.agent_memories["dragon-forge"][1] = make_node(bridge_module, "edited", "memory 1 verified")
+        await bridge.close()
+        reloaded = persistent_bridge(bridge_module, tmp_path)
+        
+        # Assert
+        memories = reloaded.agent_memories["dragon-forge"]
+        assert [n.content for n in memories] == ["memory 0", "memory 1 verified", "memory 2"]
+        assert memories.get("edited").tags == ("fire",)
+    
+    @pytest.mark.asyncio
+    async def test_replacement_during_compaction_survives(self, bridge_module, tmp_path):
+        """Test that an edit made after the snapshot copy reaches the new generation"""
+        # Arrange
+        bridge = persistent_bridge(bridge_module, tmp_path)
+        for i in range(3):
+            await bridge.agent_learn("dragon-forge", {"content": f"memory {i}"})
+        compaction = asyncio.ensure_future(bridge.compact())
+        await asyncio.sleep(0)  # the snapshot copy is taken; the write is in flight
+        
+        # Act
+        bridge.agent_memories["dragon-forge"][0] = make_node(bridge_module, "edited", "memory 0 verified")
+        await bridge.agent_learn("dragon-forge", {"content": "memory 3"})
+        await compaction
+        await bridge.close()
+        reloaded = persistent_bridge(bridge_module, tmp_path)
+        
+        # Assert
+        with open(os.path.join(tmp_path, "agents", "dragon-forge", "log.1.jsonl")) as f:
+            new_log = f.read()
+        assert '"replace": 0' in new_log
+        assert [n.content for n in reloaded.agent_memories["dragon-forge"]] == [
+            "memory 0 verified", "memory 1", "memory 2", "memory 3"
+        ]
+    
+    def test_snapshot_is_detached(self, bridge_module):
+        """Test that a snapshot does not see later writes"""
+        # Arrange
+        store = bridge_module.AgentMemoryStore([make_node(bridge_module, "n1", "embers glow")])
+        
+        # Act
+        copy, revision = store.snapshot()
+        store[0] = make_node(bridge_module, "n1", "frost settles")
+        store.append(make_node(bridge_module, "n2", "rivers flow"))
+        
+        # Assert
+        assert revision == 0
+        assert [n.content for n in copy] == ["embers glow"]
+        assert store.replaced_since(revision) == [0]
+
+
+class TestPatterns:
+    """Test pattern extraction"""
+    
+    @pytest.mark.asyncio
+    async def test_signature_is_stable_across_processes(self, bridge):
+        """Test that signatures do not depend on hash randomization"""
+        # Act
+        await bridge.agent_learn("dragon-forge", {"content": "embers glow"})
+        
+        # Assert
+        assert bridge.patterns[0]["signature"] == hashlib.sha256(b"embers glow").hexdigest()[:16]
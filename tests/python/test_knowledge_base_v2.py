@@ -0,0 +1,556 @@
+"""
+Behaviour Tests for Knowledge Base v2
+Runs ArcaneaKnowledgeBase against an in-memory Supabase with local,
+deterministic embeddings
+"""
+
+import asyncio
+import hashlib
+import uuid
+import warnings
+
+import numpy as np
+import pytest
+
+
+DIMENSIONS = 8
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    """Deterministic unit vector for a text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    vector = np.random.default_rng(seed).normal(size=DIMENSIONS).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def pgvector(vector) -> str:
+    return "[" + ",".join(str(float(x)) for x in vector) + "]"
+
+
+def memory_row(index: int, created_at: str, agent_id: str = "dragon-forge", embedding=None, **extra):
+    """agent_memories row with a sortable uuid id"""
+    return {
+        "id": str(uuid.UUID(int=index)),
+        "agent_id": agent_id,
+        "content": f"memory {index}",
+        "metadata": {"tags": ["fire"], "category": "lore"},
+        "embedding": embedding,
+        "created_at": created_at,
+        **extra
+    }
+
+
+@pytest.fixture
+def knowledge_base(kb_module, fake_supabase, monkeypatch):
+    """Create ArcaneaKnowledgeBase on the fake client with local embeddings"""
+    kb = kb_module.ArcaneaKnowledgeBase(
+        fake_supabase,
+        "sk-test",
+        embedding_dimensions=DIMENSIONS,
+        embedding_cache_size=0,
+        vector_index_backend="exact"
+    )
+    
+    async def generate(text):
+        return fake_embedding(text)
+    
+    monkeypatch.setattr(kb, "_generate_embedding", generate)
+    yield kb
+    kb.close()
+
+
+class TestEmbeddingEncoding:
+    """Test compact embedding formats"""
+    
+    def test_pgvector_text_round_trips(self, kb_module):
+        """Test that pgvector text parses back to the same float32 vector"""
+        # Arrange
+        vector = fake_embedding("runes")
+        
+        # Act
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            parsed = kb_module._parse_embedding(kb_module.to_pgvector(vector))
+            empty = kb_module._parse_embedding("[]")
+        
+        # Assert
+        assert parsed.dtype == np.float32
+        np.testing.assert_allclose(parsed, vector, rtol=1e-6)
+        assert empty.shape == (0,)
+    
+    def test_base64_round_trips(self, kb_module):
+        """Test base64 float32 and float16 packing"""
+        # Arrange
+        vector = fake_embedding("runes")
+        
+        # Act
+        full = kb_module.decode_embedding(kb_module.encode_embedding(vector))
+        half = kb_module.decode_embedding(kb_module.encode_embedding(vector, "float16"), "float16")
+        
+        # Assert
+        np.testing.assert_array_equal(full, vector)
+        np.testing.assert_allclose(half, vector, atol=1e-3)
+        assert kb_module._parse_embedding(kb_module.encode_embedding(vector)).tolist() == vector.tolist()
+
+
+class TestVectorIndex:
+    """Test the local vector index backends"""
+    
+    def test_vector_index_is_abstract(self, kb_module):
+        """Test that the base class cannot be instantiated"""
+        with pytest.raises(TypeError):
+            kb_module.VectorIndex(DIMENSIONS)
+    
+    def test_exact_search_and_remove(self, kb_module):
+        """Test exact top-k search and swap-remove"""
+        # Arrange
+        index = kb_module.ExactVectorIndex(DIMENSIONS, initial_capacity=2)
+        for i in range(10):
+            index.add(f"m{i}", fake_embedding(f"text {i}"))
+        
+        # Act
+        hits = index.search(fake_embedding("text 3"), k=1)
+        removed = index.remove("m3")
+        after = index.search(fake_embedding("text 3"), k=1)
+        
+        # Assert
+        assert hits[0][0] == "m3"
+        assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+        assert removed is True
+        assert after[0][0] != "m3"
+        assert len(index) == 9
+    
+    def test_hnsw_matches_exact_top_hit(self, kb_module):
+        """Test that HNSW finds the same nearest neighbour as exact search"""
+        # Arrange
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(300, DIMENSIONS)).astype(np.float32)
+        exact = kb_module.ExactVectorIndex(DIMENSIONS)
+        hnsw = kb_module.HNSWVectorIndex(DIMENSIONS, seed=7)
+        for i, vector in enumerate(vectors):
+            exact.add(f"m{i}", vector)
+            hnsw.add(f"m{i}", vector)
+        
+        # Act / Assert
+        for i in range(0, 300, 30):
+            assert hnsw.search(vectors[i], k=1)[0][0] == exact.search(vectors[i], k=1)[0][0]
+    
+    def test_hnsw_rebuild_keeps_seed(self, kb_module):
+        """Test that dropping tombstones rebuilds with the configured seed"""
+        # Arrange
+        hnsw = kb_module.HNSWVectorIndex(DIMENSIONS, seed=11)
+        for i in range(20):
+            hnsw.add(f"m{i}", fake_embedding(f"text {i}"))
+        
+        # Act - more tombstones than live nodes triggers _rebuild
+        for i in range(11):
+            hnsw.remove(f"m{i}")
+        
+        # Assert
+        assert hnsw.seed == 11
+        assert len(hnsw) == 9
+        assert hnsw.search(fake_embedding("text 15"), k=1)[0][0] == "m15"
+    
+    @pytest.mark.asyncio
+    async def test_auto_upgrade_builds_off_loop_and_replays_changes(self, kb_module):
+        """Test that the HNSW upgrade keeps serving and catches up with writes"""
+        # Arrange
+        index = kb_module.PartitionedVectorIndex(
+            DIMENSIONS, backend="auto", hnsw_threshold=50, hnsw_options={"seed": 3}
+        )
+        record = lambda i: {"id": f"m{i}", "agent_id": "dragon-forge", "content": str(i)}
+        
+        # Act - reaching the threshold starts a background build
+        for i in range(50):
+            index.add(record(i), fake_embedding(f"text {i}"))
+        upgrading = index.get_stats()["partitions"]["dragon-forge"]["upgrading"]
+        for i in range(50, 60):
+            index.add(record(i), fake_embedding(f"text {i}"))
+        index.remove("m0")
+        
+        while index.get_stats()["partitions"]["dragon-forge"]["upgrading"]:
+            await asyncio.sleep(0.01)
+        
+        # Assert
+        stats = index.get_stats()["partitions"]["dragon-forge"]
+        assert upgrading is True
+        assert stats["type"] == "HNSWVectorIndex"
+        assert stats["vectors"] == 59
+        assert index.search(fake_embedding("text 55"), "dragon-forge", 1, 0.5)[0]["id"] == "m55"
+        assert index.search(fake_embedding("text 0"), "dragon-forge", 1, 0.99) == []
+    
+    @pytest.mark.asyncio
+    async def test_tombstone_rebuild_runs_off_loop(self, kb_module):
+        """Test that deletes never rebuild an HNSW partition on the loop"""
+        # Arrange
+        index = kb_module.PartitionedVectorIndex(DIMENSIONS, backend="hnsw", hnsw_options={"seed": 5})
+        record = lambda i: {"id": f"m{i}", "agent_id": "dragon-forge", "content": str(i)}
+        for i in range(40):
+            index.add(record(i), fake_embedding(f"text {i}"))
+        partition = index._partitions["dragon-forge"]
+        
+        # Act - the 21st delete tips tombstones over live nodes
+        for i in range(21):
+            index.remove(f"m{i}")
+        rebuilding = index.get_stats()["partitions"]["dragon-forge"]["upgrading"]
+        index.remove("m21")
+        
+        while index.get_stats()["partitions"]["dragon-forge"]["upgrading"]:
+            await asyncio.sleep(0.01)
+        
+        # Assert
+        rebuilt = index._partitions["dragon-forge"]
+        assert rebuilding is True
+        assert partition.tombstones == 22
+        assert rebuilt is not partition
+        assert rebuilt.tombstones == 1
+        assert len(rebuilt) == 18
+        assert index.search(fake_embedding("text 30"), "dragon-forge", 1, 0.5)[0]["id"] == "m30"
+    
+    @pytest.mark.asyncio
+    async def test_search_served_from_loaded_index(self, knowledge_base, fake_supabase):
+        """Test that a loaded partition answers searches without the RPC"""
+        # Arrange
+        fake_supabase.tables["agent_memories"] = [
+            {**memory_row(i, "2026-01-01T00:00:00"), "content": f"text {i}",
+             "embedding": pgvector(fake_embedding(f"text {i}"))}
+            for i in range(5)
+        ]
+        
+        # Act
+        loaded = await knowledge_base.load_vector_index("dragon-forge")
+        results = await knowledge_base.search_knowledge("text 2", agent_id="dragon-forge", limit=1)
+        
+        # Assert
+        assert loaded == 5
+        assert results[0]["content"] == "text 2"
+        assert fake_supabase.count("match_agent_memories", "rpc") == 0
+
+
+class TestPatternWatermark:
+    """Test incremental pattern maintenance"""
+    
+    async def _seed_state(self, knowledge_base, fake_supabase):
+        """Build the initial state from three rows and pin it as fresh"""
+        base = fake_embedding("topic")
+        fake_supabase.tables["agent_memories"] = [
+            memory_row(i, "2026-01-01T00:00:00", embedding=pgvector(base)) for i in range(3)
+        ]
+        await knowledge_base.refresh_patterns("dragon-forge", page_size=4)
+        state = knowledge_base._pattern_states["dragon-forge"]
+        state.corpus_at_full = 10000
+        return state, base
+    
+    @pytest.mark.asyncio
+    async def test_rows_sharing_a_timestamp_do_not_stall(self, knowledge_base, fake_supabase):
+        """Test that more tied rows than a page are all consumed once"""
+        # Arrange
+        state, base = await self._seed_state(knowledge_base, fake_supabase)
+        fake_supabase.tables["agent_memories"] += [
+            memory_row(100 + i, "2026-01-02T00:00:00", embedding=pgvector(base)) for i in range(10)
+        ]
+        
+        # Act
+        await knowledge_base.refresh_patterns("dragon-forge", page_size=4)
+        await knowledge_base.refresh_patterns("dragon-forge", page_size=4)
+        
+        # Assert
+        assert state.rows_since_full == 10
+        assert state.total_entries == 13
+        assert sum(state.member_counts) == 13
+        assert state.watermark == "2026-01-02T00:00:00"
+        assert len(state.watermark_ids) == 10
+    
+    @pytest.mark.asyncio
+    async def test_rows_without_embeddings_are_not_noise(self, knowledge_base, fake_supabase):
+        """Test that unclusterable rows count towards hours only"""
+        # Arrange
+        state, _ = await self._seed_state(knowledge_base, fake_supabase)
+        fake_supabase.tables["agent_memories"].append(memory_row(200, "2026-01-03T00:00:00"))
+        
+        # Act
+        await knowledge_base.refresh_patterns("dragon-forge")
+        
+        # Assert
+        assert state.rows_since_full == 1
+        assert state.noise_count == 0
+        assert state.total_entries == 4
+    
+    @pytest.mark.asyncio
+    async def test_reference_rows_cluster_with_their_source(self, knowledge_base, fake_supabase):
+        """Test that rows shared by reference resolve their embedding"""
+        # Arrange
+        state, _ = await self._seed_state(knowledge_base, fake_supabase)
+        source_id = fake_supabase.tables["agent_memories"][0]["id"]
+        fake_supabase.tables["agent_memories"].append(
+            memory_row(300, "2026-01-03T00:00:00", embedding_ref=source_id)
+        )
+        
+        # Act
+        await knowledge_base.refresh_patterns("dragon-forge")
+        
+        # Assert
+        assert state.member_counts == [4]
+        assert state.noise_count == 0
+
+
+class TestKnowledgeSharing:
+    """Test sharing copies and references"""
+    
+    @pytest.fixture
+    def original(self, fake_supabase):
+        row = memory_row(1, "2026-01-01T00:00:00", embedding=pgvector(fake_embedding("original")))
+        fake_supabase.tables["agent_memories"] = [row]
+        return row
+    
+    def _rows_for(self, fake_supabase, agent_id):
+        return [row for row in fake_supabase.tables["agent_memories"] if row["agent_id"] == agent_id]
+    
+    @pytest.mark.asyncio
+    async def test_share_by_reference_stores_no_vector(self, knowledge_base, fake_supabase, original):
+        """Test that a broadcast points at the original embedding"""
+        # Act
+        results = await knowledge_base.share_knowledge_bulk(
+            "dragon-forge", ["crystal-arch", "shadow-weave"], original["id"], by_reference=True
+        )
+        
+        # Assert
+        assert results == {"crystal-arch": True, "shadow-weave": True}
+        for agent_id in ("crystal-arch", "shadow-weave"):
+            shared = self._rows_for(fake_supabase, agent_id)[0]
+            assert "embedding" not in shared
+            assert shared["embedding_ref"] == original["id"]
+    
+    @pytest.mark.asyncio
+    async def test_sharing_a_reference_points_at_the_source(self, knowledge_base, fake_supabase, original):
+        """Test that references never chain"""
+        # Arrange
+        await knowledge_base.share_knowledge_bulk("dragon-forge", ["crystal-arch"], original["id"], by_reference=True)
+        reference = self._rows_for(fake_supabase, "crystal-arch")[0]
+        
+        # Act
+        await knowledge_base.share_knowledge_bulk("crystal-arch", ["shadow-weave"], reference["id"], by_reference=True)
+        
+        # Assert
+        assert self._rows_for(fake_supabase, "shadow-weave")[0]["embedding_ref"] == original["id"]
+    
+    @pytest.mark.asyncio
+    async def test_copying_a_reference_copies_the_vector(self, knowledge_base, fake_supabase, original):
+        """Test that copying a ref-of-ref original resolves its embedding"""
+        # Arrange
+        await knowledge_base.share_knowledge_bulk("dragon-forge", ["crystal-arch"], original["id"], by_reference=True)
+        reference = self._rows_for(fake_supabase, "crystal-arch")[0]
+        
+        # Act
+        shared = await knowledge_base.share_knowledge("crystal-arch", ["shadow-weave"], reference["id"])
+        
+        # Assert
+        copy = self._rows_for(fake_supabase, "shadow-weave")[0]
+        assert shared is True
+        assert copy["embedding"] == original["embedding"]
+        assert "embedding_ref" not in copy
+    
+    @pytest.mark.asyncio
+    async def test_index_resolves_references(self, knowledge_base, fake_supabase, original):
+        """Test that loading the index gives reference rows their vector"""
+        # Arrange
+        await knowledge_base.share_knowledge_bulk("dragon-forge", ["crystal-arch"], original["id"], by_reference=True)
+        
+        # Act
+        loaded = await knowledge_base.load_vector_index()
+        results = await knowledge_base.search_knowledge("original", agent_id="crystal-arch", limit=1)
+        
+        # Assert
+        assert loaded == 2
+        assert results[0]["agent_id"] == "crystal-arch"
+        assert results[0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+    
+    @pytest.mark.asyncio
+    async def test_shared_rows_hash_their_own_content(self, knowledge_base, kb_module, fake_supabase, original):
+        """Test that shared rows do not inherit the original's content_hash"""
+        # Arrange
+        original["metadata"]["content_hash"] = kb_module.content_hash(original["content"])
+        
+        # Act
+        await knowledge_base.share_knowledge_bulk("dragon-forge", ["crystal-arch"], original["id"], by_reference=True)
+        
+        # Assert
+        shared = self._rows_for(fake_supabase, "crystal-arch")[0]
+        assert shared["metadata"]["content_hash"] == kb_module.content_hash(shared["content"])
+        assert shared["metadata"]["content_hash"] != original["metadata"]["content_hash"]
+    
+    @pytest.mark.asyncio
+    async def test_deleting_the_original_keeps_references(self, knowledge_base, fake_supabase, original):
+        """Test that shares survive with a copy of the deleted vector"""
+        # Arrange
+        await knowledge_base.share_knowledge_bulk(
+            "dragon-forge", ["crystal-arch", "shadow-weave"], original["id"], by_reference=True
+        )
+        await knowledge_base.load_vector_index()
+        
+        # Act
+        deleted = await knowledge_base.delete_knowledge(original["id"])
+        results = await knowledge_base.search_knowledge("original", agent_id="crystal-arch", limit=1)
+        
+        # Assert
+        assert deleted is True
+        assert [row["agent_id"] for row in fake_supabase.tables["agent_memories"]] == ["crystal-arch", "shadow-weave"]
+        for row in fake_supabase.tables["agent_memories"]:
+            assert row["embedding"] == original["embedding"]
+            assert row["embedding_ref"] is None
+        assert results[0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+    
+    @pytest.mark.asyncio
+    async def test_delete_is_blocked_when_references_cannot_be_copied(self, knowledge_base, fake_supabase, original, monkeypatch):
+        """Test that a failed vector copy leaves the original in place"""
+        # Arrange
+        await knowledge_base.share_knowledge_bulk("dragon-forge", ["crystal-arch"], original["id"], by_reference=True)
+        table = fake_supabase.table
+        
+        def failing_table(name):
+            query = table(name)
+            def fail(payload):
+                raise Exception("connection reset")
+            
+            query.update = fail
+            return query
+        
+        monkeypatch.setattr(fake_supabase, "table", failing_table)
+        
+        # Act
+        deleted = await knowledge_base.delete_knowledge(original["id"])
+        
+        # Assert
+        assert deleted is False
+        assert len(fake_supabase.tables["agent_memories"]) == 2
+
+
+class TestAgentStats:
+    """Test aggregated, cached agent statistics"""
+    
+    @pytest.mark.asyncio
+    async def test_every_store_path_stamps_content_hash(self, knowledge_base, kb_module, fake_supabase):
+        """Test that single and batch stores both record content_hash"""
+        # Act
+        await knowledge_base.store_knowledge("dragon-forge", "single", {"category": "lore"})
+        await knowledge_base.store_knowledge_batch("dragon-forge", ["first", "second"])
+        
+        # Assert
+        assert await knowledge_base.get_content_hashes("dragon-forge") == {
+            kb_module.content_hash(text) for text in ("single", "first", "second")
+        }
+    
+    @pytest.mark.asyncio
+    async def test_missing_stats_rpc_falls_back_once(self, knowledge_base, fake_supabase):
+        """Test that PGRST202 disables the RPC and the projection answers"""
+        # Arrange
+        fake_supabase.tables["agent_memories"] = [memory_row(i, f"2026-01-0{i + 1}T00:00:00") for i in range(3)]
+        
+        # Act
+        stats = await knowledge_base.get_agent_stats("dragon-forge")
+        knowledge_base._invalidate_stats()
+        await knowledge_base.get_agent_stats("dragon-forge")
+        
+        # Assert
+        assert stats["total_memories"] == 3
+        assert stats["knowledge_categories"] == {"lore": 3}
+        assert stats["activity_span_days"] == 2
+        assert fake_supabase.count("agent_memory_stats", "rpc") == 1
+    
+    @pytest.mark.asyncio
+    async def test_transient_stats_rpc_failure_keeps_rpc(self, knowledge_base, fake_supabase):
+        """Test that other RPC errors fall back without disabling the RPC"""
+        # Arrange
+        def flaky(params):
+            raise Exception("connection reset")
+        
+        fake_supabase.rpcs["agent_memory_stats"] = flaky
+        
+        # Act
+        await knowledge_base.get_agent_stats("dragon-forge")
+        
+        # Assert
+        assert knowledge_base._stats_rpc_available is True
+    
+    @pytest.mark.asyncio
+    async def test_cached_stats_are_not_aliased(self, knowledge_base, fake_supabase):
+        """Test that mutating returned stats leaves the cache intact"""
+        # Arrange
+        fake_supabase.tables["agent_memories"] = [memory_row(1, "2026-01-01T00:00:00")]
+        first = await knowledge_base.get_agent_stats("dragon-forge")
+        
+        # Act
+        first["knowledge_categories"]["lore"] = 99
+        second = await knowledge_base.get_agent_stats("dragon-forge")
+        
+        # Assert
+        assert second["knowledge_categories"] == {"lore": 1}
+        assert fake_supabase.count("agent_memories") == 1
+
+
+class TestBatchStorage:
+    """Test batched knowledge storage"""
+    
+    @pytest.fixture
+    def failing_insert(self, fake_supabase, monkeypatch):
+        """Make the n-th insert into any table fail"""
+        inserts = []
+        table = fake_supabase.table
+        
+        def arm(n: int):
+            def failing_table(name):
+                query = table(name)
+                execute = query.execute
+                
+                def run():
+                    if query.operation == "insert":
+                        inserts.append(name)
+                        if len(inserts) == n:
+                            raise Exception("connection reset")
+                    return execute()
+                
+                query.execute = run
+                return query
+            
+            monkeypatch.setattr(fake_supabase, "table", failing_table)
+        return arm
+    
+    @pytest.mark.asyncio
+    async def test_batch_is_chunked_and_ordered(self, knowledge_base, fake_supabase):
+        """Test that rows are written in insert_batch_size chunks, in order"""
+        # Act
+        entries = await knowledge_base.store_knowledge_batch(
+            "dragon-forge", [f"memory {i}" for i in range(5)], insert_batch_size=2
+        )
+        
+        # Assert
+        assert [entry.content for entry in entries] == [f"memory {i}" for i in range(5)]
+        assert [row["id"] for row in fake_supabase.tables["agent_memories"]] == [entry.id for entry in entries]
+        assert fake_supabase.count("agent_memories", "insert") == 3
+    
+    @pytest.mark.asyncio
+    async def test_later_chunk_failure_reports_stored_entries(self, knowledge_base, kb_module, fake_supabase, failing_insert):
+        """Test that a partial batch says which entries were written"""
+        # Arrange
+        failing_insert(2)
+        
+        # Act
+        with pytest.raises(kb_module.PartialBatchError) as raised:
+            await knowledge_base.store_knowledge_batch(
+                "dragon-forge", [f"memory {i}" for i in range(5)], insert_batch_size=2
+            )
+        
+        # Assert
+        assert [entry.content for entry in raised.value.stored] == ["memory 0", "memory 1"]
+        assert [row["content"] for row in fake_supabase.tables["agent_memories"]] == ["memory 0", "memory 1"]
+    
+    @pytest.mark.asyncio
+    async def test_first_chunk_failure_raises_original_error(self, knowledge_base, kb_module, failing_insert):
+        """Test that nothing-stored failures are not reported as partial"""
+        # Arrange
+        failing_insert(1)
+        
+        # Act / Assert
+        with pytest.raises(Exception, match="connection reset") as raised:
+            await knowledge_base.store_knowledge_batch("dragon-forge", ["memory 0", "memory 1"], insert_batch_size=1)
+        assert not isinstance(raised.value, kb_module.PartialBatchError)
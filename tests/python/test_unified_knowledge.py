@@ -0,0 +1,384 @@
+"""
+Behaviour Tests for the Unified Knowledge System
+Runs ArcaneaUnifiedKnowledgeSystem on an in-memory Supabase with local,
+deterministic embeddings
+"""
+
+import asyncio
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+from conftest import FakeSupabase
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    """Deterministic vector for a text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    return np.random.default_rng(seed).normal(size=8).astype(np.float32)
+
+
+@pytest.fixture
+def unified_system(unified_module, fake_supabase, tmp_path, monkeypatch):
+    """Create a sequential unified system on the fake client"""
+    system = unified_module.ArcaneaUnifiedKnowledgeSystem(
+        supabase_client=fake_supabase,
+        openai_api_key="sk-test",
+        storage_path=str(tmp_path)
+    )
+    
+    async def generate(text):
+        return fake_embedding(text)
+    
+    kb = system.kb
+    monkeypatch.setattr(kb, "_generate_embedding", generate)
+    yield system
+    kb.close()
+
+
+async def learn_in_memory(system, agent_id: str, count: int, prefix: str = "memory"):
+    """Fill the bridge only, as a v1 deployment would have"""
+    for i in range(count):
+        await system.bridge.agent_learn(agent_id, {"content": f"{prefix} {i}", "type": "insight"})
+
+
+def stored_contents(client: FakeSupabase, agent_id: str):
+    return sorted(row["content"] for row in client.tables.get("agent_memories", []) if row["agent_id"] == agent_id)
+
+
+class RecordingKB:
+    """Knowledge base stub that records batches or fails like an outage"""
+    
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.stored = []
+    
+    async def store_knowledge_batch(self, agent_id, contents, metadata=None):
+        if not self.available:
+            raise ConnectionError("database unavailable")
+        self.stored.extend((agent_id, content) for content in contents)
+    
+    def close(self):
+        pass
+
+
+class TestSyncToPersistent:
+    """Test migration from the in-memory bridge"""
+    
+    @pytest.mark.asyncio
+    async def test_rerun_does_not_duplicate(self, unified_system, fake_supabase, tmp_path):
+        """Test that a rerun, even without its checkpoint, writes nothing new"""
+        # Arrange
+        await learn_in_memory(unified_system, "dragon-forge", 25)
+        
+        # Act
+        first = await unified_system.sync_to_persistent(batch_size=10)
+        second = await unified_system.sync_to_persistent(batch_size=10)
+        os.remove(tmp_path / "sync-checkpoint.json")
+        third = await unified_system.sync_to_persistent(batch_size=10)
+        
+        # Assert
+        assert (first, second, third) == (25, 0, 0)
+        assert len(stored_contents(fake_supabase, "dragon-forge")) == 25
+    
+    @pytest.mark.asyncio
+    async def test_learned_entries_are_not_synced_again(self, unified_system, fake_supabase):
+        """Test that rows written by learn() carry the hash sync checks"""
+        # Arrange
+        await unified_system.learn("dragon-forge", "fire needs air", {"category": "lore"})
+        await learn_in_memory(unified_system, "dragon-forge", 3)
+        
+        # Act
+        synced = await unified_system.sync_to_persistent()
+        
+        # Assert
+        assert synced == 3
+        assert stored_contents(fake_supabase, "dragon-forge").count("fire needs air") == 1
+    
+    @pytest.mark.asyncio
+    async def test_checkpoint_is_per_target_database(self, unified_system, fake_supabase):
+        """Test that offsets recorded for one database do not skip another"""
+        # Arrange
+        await learn_in_memory(unified_system, "dragon-forge", 12)
+        await unified_system.sync_to_persistent(batch_size=5)
+        other = FakeSupabase("https://replica.supabase.co")
+        
+        # Act
+        unified_system.kb.supabase = other
+        synced = await unified_system.sync_to_persistent(batch_size=5)
+        
+        # Assert
+        assert synced == 12
+        assert stored_contents(other, "dragon-forge") == stored_contents(fake_supabase, "dragon-forge")
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_resumes_from_checkpoint(self, unified_system, fake_supabase, monkeypatch):
+        """Test that a sync interrupted mid-agent finishes on the next run"""
+        # Arrange
+        await learn_in_memory(unified_system, "dragon-forge", 20)
+        store_batch = unified_system.kb.store_knowledge_batch
+        calls = []
+        
+        async def fail_third(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise ConnectionError("database unavailable")
+            return await store_batch(*args, **kwargs)
+        
+        monkeypatch.setattr(unified_system.kb, "store_knowledge_batch", fail_third)
+        
+        # Act
+        first = await unified_system.sync_to_persistent(batch_size=5)
+        second = await unified_system.sync_to_persistent(batch_size=5)
+        
+        # Assert
+        assert (first, second) == (10, 10)
+        assert len(stored_contents(fake_supabase, "dragon-forge")) == 20
+    
+    @pytest.mark.asyncio
+    async def test_stale_checkpoint_after_restart_rescans(self, unified_module, unified_system, fake_supabase, tmp_path):
+        """Test that a checkpoint left by a previous process does not skip new memories"""
+        # Arrange
+        await learn_in_memory(unified_system, "dragon-forge", 12)
+        await unified_system.sync_to_persistent(batch_size=5)
+        unified_system.bridge = unified_module.InfoGeniusArcaneaBridge(storage_path=str(tmp_path))
+        await learn_in_memory(unified_system, "dragon-forge", 4, prefix="after restart")
+        
+        # Act
+        synced = await unified_system.sync_to_persistent(batch_size=5)
+        
+        # Assert
+        assert synced == 4
+        assert len(stored_contents(fake_supabase, "dragon-forge")) == 16
+    
+    @pytest.mark.asyncio
+    async def test_repeated_memories_are_all_migrated(self, unified_system, fake_supabase, tmp_path):
+        """Test that identical content learned at different times is not merged"""
+        # Arrange
+        for _ in range(3):
+            await learn_in_memory(unified_system, "dragon-forge", 1, prefix="the forge is hot")
+        
+        # Act
+        first = await unified_system.sync_to_persistent()
+        os.remove(tmp_path / "sync-checkpoint.json")
+        second = await unified_system.sync_to_persistent()
+        
+        # Assert
+        assert (first, second) == (3, 0)
+        assert stored_contents(fake_supabase, "dragon-forge") == ["the forge is hot 0"] * 3
+    
+    @pytest.mark.asyncio
+    async def test_rows_without_creation_time_match_once(self, unified_system, fake_supabase):
+        """Test that rows stored before creation times were recorded each cover one memory"""
+        # Arrange
+        await unified_system.kb.store_knowledge("dragon-forge", "memory 0")
+        for _ in range(2):
+            await learn_in_memory(unified_system, "dragon-forge", 1)
+        
+        # Act
+        synced = await unified_system.sync_to_persistent()
+        
+        # Assert
+        assert synced == 1
+        assert stored_contents(fake_supabase, "dragon-forge") == ["memory 0"] * 2
+
+
+class TestWriteBehindQueue:
+    """Test the durable background write queue"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_share_fsyncs(self, unified_module, tmp_path, monkeypatch):
+        """Test that concurrent submits are group-committed"""
+        # Arrange
+        kb = RecordingKB()
+        queue = unified_module.WriteBehindQueue(kb, str(tmp_path / "journal.jsonl"))
+        appends = []
+        append = queue._append
+        monkeypatch.setattr(queue, "_append", lambda records: (appends.append(len(records)), append(records)))
+        
+        # Act
+        await asyncio.gather(*(queue.submit("dragon-forge", f"memory {i}", {}) for i in range(200)))
+        await queue.close()
+        
+        # Assert
+        assert len(kb.stored) == 200
+        assert sum(appends) > 200  # write records plus done records
+        assert len(appends) < 20
+        assert queue._pending_jobs() == []
+    
+    @pytest.mark.asyncio
+    async def test_outage_spills_and_replays_after_restart(self, unified_module, tmp_path):
+        """Test that writes made during an outage survive a restart"""
+        # Arrange
+        journal = str(tmp_path / "journal.jsonl")
+        down = unified_module.WriteBehindQueue(RecordingKB(available=False), journal, retry_base_delay=60)
+        
+        # Act
+        for i in range(5):
+            await down.submit("dragon-forge", f"memory {i}", {})
+        await down.flush()
+        spilled = down.get_stats()["spilled"]
+        await down.close()
+        
+        kb = RecordingKB()
+        restarted = unified_module.WriteBehindQueue(kb, journal)
+        await restarted.start()
+        await restarted.close()
+        
+        # Assert
+        assert spilled == 5
+        assert sorted(content for _, content in kb.stored) == [f"memory {i}" for i in range(5)]
+        assert restarted._pending_jobs() == []
+    
+    @pytest.mark.asyncio
+    async def test_journal_failure_does_not_stop_worker(self, unified_module, tmp_path, monkeypatch):
+        """Test that an unwritable done record neither kills the worker nor hangs flush"""
+        # Arrange
+        kb = RecordingKB()
+        queue = unified_module.WriteBehindQueue(kb, str(tmp_path / "journal.jsonl"))
+        append = queue._append
+        disk_full = [True]
+        
+        def failing_append(records):
+            if disk_full[0] and any(record["op"] == "done" for record in records):
+                raise OSError(28, "No space left on device")
+            return append(records)
+        
+        monkeypatch.setattr(queue, "_append", failing_append)
+        
+        # Act
+        for i in range(5):
+            await queue.submit("dragon-forge", f"memory {i}", {})
+        await asyncio.wait_for(queue.flush(), 2)
+        running = not queue._worker.done()
+        disk_full[0] = False
+        await queue.submit("dragon-forge", "memory 5", {})
+        await asyncio.wait_for(queue.close(), 2)
+        
+        # Assert
+        assert running is True
+        assert len(kb.stored) == 6
+        assert queue.get_stats()["spilled"] == 0
+        assert queue._pending_jobs() == []
+    
+    @pytest.mark.asyncio
+    async def test_learn_stores_directly_when_journal_is_unwritable(self, unified_module, unified_system, monkeypatch):
+        """Test that learn() falls back to a synchronous store"""
+        # Arrange
+        kb = RecordingKB()
+        stored = []
+        
+        async def store_knowledge(agent_id, content, metadata):
+            stored.append(content)
+            return unified_module.KnowledgeEntry(
+                id="k1", agent_id=agent_id, content=content,
+                embedding=np.zeros(1536, dtype=np.float32), metadata=metadata, timestamp="2026-01-01T00:00:00"
+            )
+        
+        monkeypatch.setattr(unified_system.kb, "store_knowledge", store_knowledge)
+        unified_system.write_queue = unified_module.WriteBehindQueue(
+            kb, os.path.join(unified_system.storage_path, "persist-journal.jsonl")
+        )
+        
+        def disk_full(records):
+            raise OSError(28, "No space left on device")
+        
+        monkeypatch.setattr(unified_system.write_queue, "_append", disk_full)
+        
+        # Act
+        entry = await unified_system.learn("dragon-forge", "fire needs air")
+        await unified_system.write_queue.close()
+        
+        # Assert
+        assert entry.source == "persistent"
+        assert stored == ["fire needs air"]
+        assert kb.stored == []
+
+
+class TestShutdown:
+    """Test shutdown ordering"""
+    
+    @pytest.mark.asyncio
+    async def test_close_drains_queue_before_closing_kb(self, unified_module, unified_system, monkeypatch):
+        """Test that close() finishes queued writes, then releases the kb"""
+        # Arrange
+        order = []
+        kb = RecordingKB()
+        monkeypatch.setattr(kb, "close", lambda: order.append(("kb.close", len(kb.stored))))
+        unified_system.kb = kb
+        unified_system.write_queue = unified_module.WriteBehindQueue(
+            kb, os.path.join(unified_system.storage_path, "persist-journal.jsonl")
+        )
+        await unified_system.initialize()
+        
+        # Act
+        for i in range(10):
+            await unified_system.learn("dragon-forge", f"memory {i}")
+        await unified_system.close()
+        
+        # Assert
+        assert order == [("kb.close", 10)]
+
+
+class TestConcurrentRecall:
+    """Test raced semantic and memory recall"""
+    
+    @pytest.mark.asyncio
+    async def test_semantic_result_ready_during_memory_wait_is_merged(self, unified_module, unified_system, monkeypatch):
+        """Test that a persistent result finishing after the budget is still used"""
+        # Arrange
+        unified_system.execution_mode = "concurrent"
+        unified_system.latency_budget_ms = 20
+        entry = lambda content, source: unified_module.UnifiedKnowledgeEntry(
+            id=content, agent_id="dragon-forge", content=content, source=source
+        )
+        
+        async def persistent(agent_id, query, limit):
+            await asyncio.sleep(0.05)
+            return [entry("semantic hit", "persistent"), entry("shared hit", "persistent")]
+        
+        async def memory(agent_id, query, limit):
+            await asyncio.sleep(0.1)
+            return [entry("Shared  hit", "memory"), entry("memory hit", "memory")]
+        
+        monkeypatch.setattr(unified_system, "_recall_persistent", persistent)
+        monkeypatch.setattr(unified_system, "_recall_memory", memory)
+        
+        # Act
+        results = await unified_system.recall("dragon-forge", "hit", limit=5)
+        
+        # Assert
+        assert [r.content for r in results] == ["semantic hit", "shared hit", "memory hit"]
+    
+    @pytest.mark.asyncio
+    async def test_slow_semantic_recall_is_dropped(self, unified_module, unified_system, monkeypatch):
+        """Test that memory results answer alone once the budget is spent"""
+        # Arrange
+        unified_system.execution_mode = "concurrent"
+        unified_system.latency_budget_ms = 20
+        cancelled = []
+        
+        async def persistent(agent_id, query, limit):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        
+        async def memory(agent_id, query, limit):
+            return [unified_module.UnifiedKnowledgeEntry(
+                id="m", agent_id=agent_id, content="memory hit", source="memory"
+            )]
+        
+        monkeypatch.setattr(unified_system, "_recall_persistent", persistent)
+        monkeypatch.setattr(unified_system, "_recall_memory", memory)
+        
+        # Act
+        results = await unified_system.recall("dragon-forge", "hit")
+        await asyncio.sleep(0)
+        
+        # Assert
+        assert [r.source for r in results] == ["memory"]
+        assert cancelled == [True]